@@ -0,0 +1,225 @@
+import sys
+import threading
+
+# 输入/屏幕后端：执行引擎只通过这里读取颜色、移动和点击鼠标
+
+
+class Backend:
+    """
+    输入/屏幕后端接口，子类实现具体的读屏和鼠标操作。
+    """
+
+    def position(self):
+        raise NotImplementedError
+
+    def pixel(self, x, y):
+        raise NotImplementedError
+
+    def move_to(self, x, y, duration=0.0):
+        raise NotImplementedError
+
+    def move_step(self, x, y):
+        """
+        分段移动中的一小段：立即移动到 (x, y)，不附加输入后的停顿。
+        """
+        self.move_to(x, y)
+
+    def click(self):
+        raise NotImplementedError
+
+    def click_at(self, x, y):
+        """
+        移动并点击；支持的后端用一次输入事件完成。
+        """
+        self.move_to(x, y)
+        self.click()
+
+    def set_pause(self, seconds):
+        """
+        设置每次输入调用后的停顿时间，不支持的后端忽略。
+        """
+
+    def grab(self, bbox=None):
+        """
+        抓取屏幕（或 bbox=(left, top, right, bottom) 区域），返回 capture.Frame。
+        """
+        raise NotImplementedError
+
+    def mouse_down(self):
+        """
+        鼠标左键当前是否按下（或自上次查询以来按下过），用于录制。
+        """
+        raise NotImplementedError
+
+
+class PyAutoGUIBackend(Backend):
+    """
+    真实桌面后端：鼠标操作基于 pyautogui，抓屏基于 mss。
+    坐标为虚拟屏幕坐标（多屏幕时主屏幕左侧、上方的屏幕坐标为负数）。
+    """
+
+    def __init__(self):
+        self._gui = None
+        # mss 的设备上下文不能跨线程使用，每个线程各建一个
+        self.local = threading.local()
+        self.listener = None
+        self.pressed = False
+        self.pressed_since = False
+
+    @property
+    def gui(self):
+        # 延迟到第一次读屏或操作鼠标时导入，启动界面和命令行工具时不需要加载 pyautogui
+        if self._gui is None:
+            import pyautogui  # 确保已安装：pip install pyautogui
+            self._gui = pyautogui
+        return self._gui
+
+    def position(self):
+        x, y = self.gui.position()
+        return x, y
+
+    def pixel(self, x, y):
+        return self.grab((x, y, x + 1, y + 1)).pixel(x, y)
+
+    def move_to(self, x, y, duration=0.0):
+        self.gui.moveTo(x, y, duration=duration)
+
+    def move_step(self, x, y):
+        self.gui.moveTo(x, y, _pause=False)
+
+    def click(self):
+        self.gui.click()
+
+    def click_at(self, x, y):
+        self.gui.click(x, y)
+
+    def set_pause(self, seconds):
+        # pyautogui 默认在每次调用后停顿 0.1 秒
+        self.gui.PAUSE = seconds
+
+    @property
+    def screen_capture(self):
+        sct = getattr(self.local, "sct", None)
+        if sct is None:
+            import mss  # 确保已安装：pip install mss
+            sct = self.local.sct = mss.mss()
+        return sct
+
+    def grab(self, bbox=None):
+        """
+        只抓取 bbox 区域（不先抓整屏再裁剪）。区域裁剪到所有屏幕组成的虚拟屏幕内，
+        屏幕之间的空白在 Frame.mask 中标记，读取这些位置和屏幕外的坐标都视为出错，而不是黑色。
+        """
+        import numpy as np
+        from capture import Frame, screen_mask
+
+        sct = self.screen_capture
+        # monitors[0] 为虚拟屏幕，其后为各个屏幕
+        screens = [(m["left"], m["top"], m["left"] + m["width"], m["top"] + m["height"]) for m in sct.monitors]
+        s_left, s_top, s_right, s_bottom = screens[0]
+        left, top, right, bottom = bbox if bbox else screens[0]
+        left, top = min(max(left, s_left), s_right), min(max(top, s_top), s_bottom)
+        right, bottom = max(left, min(right, s_right)), max(top, min(bottom, s_bottom))
+        if right == left or bottom == top:
+            return Frame(np.zeros((bottom - top, right - left, 3), dtype=np.uint8), left, top)
+        shot = sct.grab({"left": left, "top": top, "width": right - left, "height": bottom - top})
+        # BGRA -> RGB
+        array = np.asarray(shot)[:, :, 2::-1]
+        return Frame(array, left, top, mask=screen_mask(screens[1:], (left, top, right, bottom)))
+
+    def mouse_down(self):
+        if sys.platform == "win32":
+            import ctypes
+            # 最高位：当前按下；最低位：自上次调用以来按下过（不会漏掉很短的点击）
+            return bool(ctypes.windll.user32.GetAsyncKeyState(0x01) & 0x8001)
+        # 其它平台通过 pynput 监听鼠标按键
+        if self.listener is None:
+            from pynput import mouse  # 确保已安装：pip install pynput
+
+            def on_click(x, y, button, pressed):
+                if button == mouse.Button.left:
+                    self.pressed = pressed
+                    if pressed:
+                        self.pressed_since = True
+
+            self.listener = mouse.Listener(on_click=on_click)
+            self.listener.start()
+        pressed = self.pressed or self.pressed_since
+        self.pressed_since = False
+        return pressed
+
+
+class VirtualScreenBackend(Backend):
+    """
+    内存中的虚拟屏幕，用于无显示环境（CI）运行脚本和测量吞吐量。
+    on_click 回调可以在点击后修改屏幕内容，模拟界面变化。
+    """
+
+    def __init__(self, width=1920, height=1080, background=(0, 0, 0), on_click=None):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(bytes(background) * (width * height))
+        self.cursor = (0, 0)
+        self.moves = 0
+        self.clicks = 0
+        self.grabs = 0
+        self.on_click = on_click
+        self.button = False  # 模拟鼠标左键状态，录制时使用
+        self.lock = threading.Lock()
+
+    def _offset(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"坐标 ({x}, {y}) 超出虚拟屏幕范围 {self.width}x{self.height}")
+        return (y * self.width + x) * 3
+
+    def set_pixel(self, x, y, color):
+        offset = self._offset(x, y)
+        with self.lock:
+            self.pixels[offset:offset + 3] = bytes(color)
+
+    def fill_rect(self, left, top, right, bottom, color):
+        # 填充 [left, right) x [top, bottom) 区域
+        row = bytes(color) * (right - left)
+        with self.lock:
+            for y in range(top, bottom):
+                offset = self._offset(left, y)
+                self.pixels[offset:offset + len(row)] = row
+
+    def position(self):
+        return self.cursor
+
+    def pixel(self, x, y):
+        offset = self._offset(x, y)
+        return tuple(self.pixels[offset:offset + 3])
+
+    def move_to(self, x, y, duration=0.0):
+        self._offset(x, y)
+        self.cursor = (x, y)
+        self.moves += 1
+
+    def grab(self, bbox=None):
+        import numpy as np
+        from capture import Frame
+
+        left, top, right, bottom = bbox if bbox else (0, 0, self.width, self.height)
+        # 完全在屏幕外的区域得到空画面（负数的切片终点会从末尾倒数，必须夹在 left/top 之后）
+        left, top = min(max(left, 0), self.width), min(max(top, 0), self.height)
+        right, bottom = max(left, min(right, self.width)), max(top, min(bottom, self.height))
+        with self.lock:
+            screen = np.frombuffer(self.pixels, dtype=np.uint8).reshape(self.height, self.width, 3)
+            region = screen[top:bottom, left:right].copy()
+        self.grabs += 1
+        return Frame(region, left, top)
+
+    def click_at(self, x, y):
+        self._offset(x, y)
+        self.cursor = (x, y)
+        self.click()
+
+    def mouse_down(self):
+        return self.button
+
+    def click(self):
+        self.clicks += 1
+        if self.on_click is not None:
+            self.on_click(self, self.cursor)
@@ -0,0 +1,317 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+# 性能基准：除 desktop 外都使用虚拟屏幕后端，不需要真实桌面。
+# 用法：python benchmarks/bench.py [--quick] [--only loop,capture,storage,treeview,desktop] [--output result.json]
+# 结果为 JSON，便于不同版本之间比较。
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backends import PyAutoGUIBackend, VirtualScreenBackend  # noqa: E402
+from plan import MOTION_TELEPORT, compile_plan  # noqa: E402
+from runner import ActionRunner, CAPTURE_FRAME, CAPTURE_PIXEL, CAPTURE_REGION  # noqa: E402
+from storage import ITEM_DEFAULTS, JournalStore, JsonStore, read_items_json, write_json_atomic  # noqa: E402
+
+SCREEN_WIDTH = 1920
+SCREEN_HEIGHT = 1080
+
+
+def make_items(count, seed=0, click=True, match=True, region=None):
+    """
+    生成 count 个列表项，坐标随机分布在 region（默认整个屏幕）内。
+    match 为 False 时颜色与虚拟屏幕不一致，只判色不点击。
+    """
+    rng = random.Random(seed)
+    left, top, right, bottom = region or (0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+    items = []
+    for index in range(count):
+        item = dict(ITEM_DEFAULTS)
+        item.update({
+            "coordinates": (rng.randrange(left, right), rng.randrange(top, bottom)),
+            "color": (0, 0, 0) if match else (255, 255, 255),
+            "click": click,
+            "remarks": f"step {index}",
+        })
+        items.append(item)
+    return items
+
+
+def timed(func, repeat=1):
+    """
+    执行 repeat 次，返回 (最短用时, 最后一次的返回值)。
+    """
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        cost = time.perf_counter() - start
+        best = cost if best is None else min(best, cost)
+    return best, result
+
+
+def run_loop(items, passes, **options):
+    backend = VirtualScreenBackend(SCREEN_WIDTH, SCREEN_HEIGHT)
+    runner = ActionRunner(backend, motion_mode=MOTION_TELEPORT, motion_value=0, **options)
+    plan = compile_plan(items)
+    stats = runner.run(plan, count=passes, interval=0)
+    return {
+        "steps": stats.steps,
+        "clicks": stats.clicks,
+        "grabs": backend.grabs,
+        "elapsed": stats.elapsed,
+        "steps_per_second": stats.steps_per_second,
+        "step_time_avg": stats.step_time_avg,
+    }
+
+
+def bench_loop(quick):
+    """
+    执行循环吞吐量：10、1k、100k 项的脚本，每项都判色并点击。
+    批量抓屏时点击后不让画面失效（每轮抓一次），否则每步都要重新抓取整屏。
+    虚拟后端的读色和点击几乎没有开销，结果反映的是执行引擎本身的开销。
+    """
+    results = []
+    sizes = (10, 1000) if quick else (10, 1000, 100000)
+    total_steps = 20000 if quick else 200000
+    for size in sizes:
+        items = make_items(size)
+        passes = max(1, total_steps // size)
+        for turbo in (False, True):
+            for capture_mode in (CAPTURE_PIXEL, CAPTURE_FRAME):
+                result = run_loop(items, passes, turbo=turbo, capture_mode=capture_mode, timing_capacity=0,
+                                  invalidate_on_click=False)
+                result.update({"items": size, "passes": passes, "turbo": turbo, "capture_mode": capture_mode})
+                results.append(result)
+        # 逐步耗时记录的额外开销
+        result = run_loop(items, passes, turbo=True, capture_mode=CAPTURE_PIXEL)
+        result.update({"items": size, "passes": passes, "turbo": True, "capture_mode": CAPTURE_PIXEL, "timings": True})
+        results.append(result)
+    return results
+
+
+def bench_capture(quick):
+    """
+    判色开销：颜色都不一致（只判色不点击），比较逐点读取、整屏抓取和按区域抓取。
+    """
+    results = []
+    sizes = (100, 1000) if quick else (100, 1000, 10000)
+    layouts = {
+        "spread": None,                      # 坐标分布在整个屏幕
+        "clustered": (100, 100, 400, 300),   # 坐标集中在一个小区域
+    }
+    for size in sizes:
+        for layout, region in layouts.items():
+            items = make_items(size, match=False, region=region)
+            passes = max(1, (5000 if quick else 50000) // size)
+            for capture_mode in (CAPTURE_PIXEL, CAPTURE_FRAME, CAPTURE_REGION):
+                result = run_loop(items, passes, capture_mode=capture_mode, timing_capacity=0)
+                result.update({"items": size, "layout": layout, "passes": passes, "capture_mode": capture_mode})
+                results.append(result)
+    return results
+
+
+def bench_storage(quick):
+    """
+    大型脚本的读写：整份 JSON 和快照 + 日志两种格式的加载、整体保存和单项修改。
+    """
+    results = []
+    sizes = (1000, 10000) if quick else (1000, 10000, 100000)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            items = make_items(size)
+            base = os.path.join(directory, f"bench{size}")
+            json_path = f"{base}.json"
+            write_seconds, _ = timed(lambda: write_json_atomic(json_path, items), repeat=3)
+            read_seconds, loaded = timed(lambda: read_items_json(json_path), repeat=3)
+            result = {"items": size, "bytes": os.path.getsize(json_path),
+                      "write_json": write_seconds, "read_json": read_seconds}
+
+            for name, store_class in (("json", JsonStore), ("journal", JournalStore)):
+                store = store_class(base)
+                load_seconds, loaded = timed(store.load)
+                loaded = list(loaded)
+
+                def replace():
+                    store.replace(loaded)
+                    store.flush()
+
+                def edit():
+                    item = dict(loaded[size // 2], remarks="edited")
+                    loaded[size // 2] = item
+                    store.record([("set", size // 2, item)], loaded)
+                    store.flush()
+
+                result[f"{name}_load"] = load_seconds
+                result[f"{name}_replace"], _ = timed(replace, repeat=3)
+                result[f"{name}_edit"], _ = timed(edit, repeat=5)
+                store.close()
+            results.append(result)
+    return results
+
+
+def bench_treeview(quick):
+    """
+    列表刷新开销（需要图形环境）：首次显示、修改一项、末尾追加、滚动。
+    """
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": f"无法创建 Tk 窗口: {e}"}
+
+    from treeview import VirtualTreeview
+
+    results = []
+    try:
+        root.withdraw()
+        sizes = (1000, 10000) if quick else (1000, 10000, 100000)
+        for size in sizes:
+            items = make_items(size)
+            tree = ttk.Treeview(root, columns=tuple(range(7)), show='headings')
+            scrollbar = tk.Scrollbar(root)
+            view = VirtualTreeview(tree, scrollbar, lambda: items)
+            view.visible = 30
+            first_seconds, _ = timed(view.reset)
+
+            def edit():
+                items[0] = dict(items[0], remarks=f"edited {time.perf_counter()}")
+                view.refresh()
+
+            def append():
+                items.append(dict(items[-1]))
+                view.see(len(items) - 1)
+
+            def scroll():
+                view.scroll(-3)
+
+            results.append({
+                "items": size,
+                "first": first_seconds,
+                "refresh_unchanged": timed(view.refresh, repeat=20)[0],
+                "refresh_edit": timed(edit, repeat=20)[0],
+                "refresh_append": timed(append, repeat=20)[0],
+                "refresh_scroll": timed(scroll, repeat=20)[0],
+            })
+            tree.destroy()
+            scrollbar.destroy()
+    finally:
+        root.destroy()
+    return results
+
+
+def bench_desktop(quick):
+    """
+    真实桌面的抓屏开销（需要图形环境和 mss，只读屏幕，不移动、不点击鼠标）：
+    整屏、200x200 区域和 3x3 区域各抓一次的用时，等待颜色（wait_for_match）轮询一次的用时，
+    以及逐点读取、整屏抓取和按区域抓取三种判色方式判断一轮坐标的用时。
+    """
+    import threading
+
+    from capture import FrameSampler, cluster_regions, wait_for_match
+
+    backend = PyAutoGUIBackend()
+    try:
+        screen = backend.grab()
+    except Exception as e:
+        return {"skipped": f"无法抓取桌面: {e}"}
+
+    repeat = 5 if quick else 20
+    left, top = screen.left, screen.top
+    right, bottom = left + screen.width, top + screen.height
+    x, y = left + screen.width // 2, top + screen.height // 2
+    result = {
+        "screen": (left, top, right, bottom),
+        "grab_full": timed(backend.grab, repeat)[0],
+        "grab_200": timed(lambda: backend.grab((x, y, x + 200, y + 200)), repeat)[0],
+        "grab_3": timed(lambda: backend.grab((x, y, x + 3, y + 3)), repeat)[0],
+        # 期望颜色不可能出现，超时为 0：只轮询一次
+        "wait_poll": timed(lambda: wait_for_match(backend, [((x, y), (300, 300, 300))], 0, 0, threading.Event()),
+                           repeat)[0],
+    }
+
+    sizes = (10, 100) if quick else (10, 100, 1000)
+    layouts = {"spread": None, "clustered": (x, y, x + 300, y + 200)}
+    checks = []
+    for size in sizes:
+        for layout, region in layouts.items():
+            items = make_items(size, region=region or (left, top, right, bottom))
+            points = [item["coordinates"] for item in items]
+            expected = [item["color"] for item in items]
+            pixel_seconds = timed(lambda: [backend.pixel(px, py) for px, py in points], repeat)[0]
+            frame_sampler = FrameSampler(backend, points, expected)
+            region_sampler = FrameSampler(backend, points, expected, regions=cluster_regions(points))
+            checks.append({
+                "items": size,
+                "layout": layout,
+                "pixel": pixel_seconds,
+                "frame": timed(frame_sampler.refresh, repeat)[0],
+                "region": timed(region_sampler.refresh, repeat)[0],
+                "regions": len(region_sampler.regions),
+            })
+    result["checks"] = checks
+    return result
+
+
+BENCHMARKS = {
+    "loop": bench_loop,
+    "capture": bench_capture,
+    "storage": bench_storage,
+    "treeview": bench_treeview,
+    "desktop": bench_desktop,
+}
+
+
+def environment():
+    import numpy as np
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="win_click_tools 性能基准")
+    parser.add_argument("--quick", action="store_true", help="使用较小的规模快速运行")
+    parser.add_argument("--only", help="只运行指定的基准，逗号分隔：" + ",".join(BENCHMARKS))
+    parser.add_argument("--output", help="结果写入文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的基准：{', '.join(unknown)}")
+
+    report = {"environment": environment(), "quick": args.quick, "results": {}}
+    for name in names:
+        start = time.perf_counter()
+        report["results"][name] = BENCHMARKS[name](args.quick)
+        print(f"{name}: {time.perf_counter() - start:.1f} 秒", file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from plan import FLOW_ANCHOR
+
+# 批量修改：根据选中项生成编辑操作（见 storage.apply_ops），由界面一次性应用，
+# 整批修改只产生一条撤销记录、一次列表刷新和一次保存。
+# 列表项不原地修改，需要修改的项替换为新的字典。
+
+
+def move_ops(indices, target):
+    """
+    把 indices（升序）对应的项目按原顺序移动到原列表第 target 项之前（target 可以等于列表长度），
+    返回编辑操作。上方的项目从下往上依次移到 target 之前，下方的项目从上往下依次移到 target 处，
+    移动完成后选中项连续排列，已在目标位置的项目不产生操作。
+    """
+    ops = []
+    above = [index for index in indices if index < target]
+    below = [index for index in indices if index >= target]
+    for offset, index in enumerate(reversed(above)):
+        destination = target - 1 - offset
+        if index != destination:
+            ops.append(("move", index, destination))
+    for offset, index in enumerate(below):
+        destination = target + offset
+        if index != destination:
+            ops.append(("move", index, destination))
+    return ops
+
+
+def moved_range(indices, target):
+    """
+    move_ops 之后选中项所在的下标范围。
+    """
+    start = target - sum(1 for index in indices if index < target)
+    return range(start, start + len(indices))
+
+
+def move_target(indices, start, total):
+    """
+    返回 move_ops 的 target，使移动后选中项从第 start 项开始（超出范围时放到列表末尾）。
+    """
+    selected = set(indices)
+    for index in range(total):
+        if index not in selected:
+            if start <= 0:
+                return index
+            start -= 1
+    return total
+
+
+def shifted_anchors(items, indices):
+    """
+    返回选中的项目中，坐标相对于一个同样被选中的锚点的项目下标。
+    平移时锚点已经移动，这些项目的偏移保持不变。
+    """
+    selected = set(indices)
+    skip = set()
+    anchor = None
+    for index, item in enumerate(items):
+        if item.get("flow") == FLOW_ANCHOR:
+            anchor = index
+        elif item.get("relative") and anchor in selected and index in selected:
+            skip.add(index)
+    return skip
+
+
+def edit_ops(items, indices, dx=0, dy=0, fields=None, find="", replace=""):
+    """
+    生成批量修改的编辑操作：坐标平移 (dx, dy)，把 fields 中的字段设为给定值，
+    把备注中的 find 替换为 replace。每个有变化的项目只产生一个 "set" 操作。
+    """
+    fields = fields or {}
+    skip = shifted_anchors(items, indices) if dx or dy else ()
+    ops = []
+    for index in indices:
+        item = items[index]
+        changes = {key: value for key, value in fields.items() if item.get(key) != value}
+        if (dx or dy) and index not in skip:
+            x, y = item["coordinates"]
+            changes["coordinates"] = (x + dx, y + dy)
+        if find:
+            remarks = item.get("remarks") or ""
+            if find in remarks:
+                changes["remarks"] = remarks.replace(find, replace)
+        if changes:
+            ops.append(("set", index, dict(item, **changes)))
+    return ops
@@ -0,0 +1,323 @@
+import time
+import zlib
+
+import numpy as np  # 确保已安装：pip install numpy
+
+
+class Frame:
+    """
+    一次抓屏得到的画面。
+    array 为 (高, 宽, 3) 的 uint8 数组，left/top 为画面左上角在屏幕上的坐标。
+    mask 为 (高, 宽) 的布尔数组时，False 的像素不在任何屏幕上（多屏幕之间的空白），读取时视为画面外。
+    """
+
+    def __init__(self, array, left=0, top=0, mask=None):
+        self.array = array
+        self.left = left
+        self.top = top
+        self.mask = mask
+        self.timestamp = time.monotonic()
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    @property
+    def age(self):
+        return time.monotonic() - self.timestamp
+
+    def pixel(self, x, y):
+        col = x - self.left
+        row = y - self.top
+        if not (0 <= col < self.width and 0 <= row < self.height):
+            raise ValueError(f"坐标 ({x}, {y}) 不在抓取的画面内")
+        if self.mask is not None and not self.mask[row, col]:
+            raise ValueError(f"坐标 ({x}, {y}) 不在任何屏幕上")
+        return tuple(int(v) for v in self.array[row, col])
+
+    def lookup(self, xs, ys):
+        """
+        批量读取坐标颜色，返回 (colors, valid)。
+        colors 为 (N, 3) 数组，valid 标记坐标是否落在画面内（画面外的颜色为 0）。
+        """
+        cols = np.asarray(xs) - self.left
+        rows = np.asarray(ys) - self.top
+        valid = (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+        if self.mask is not None:
+            valid[valid] = self.mask[rows[valid], cols[valid]]
+        colors = np.zeros((len(cols), 3), dtype=np.uint8)
+        colors[valid] = self.array[rows[valid], cols[valid]]
+        return colors, valid
+
+
+def screen_mask(screens, bbox):
+    """
+    返回 bbox 区域内被 screens（各屏幕的 (left, top, right, bottom)）覆盖的像素掩码；
+    区域完全落在某一个屏幕内时返回 None（不需要掩码）。
+    """
+    left, top, right, bottom = bbox
+    for s_left, s_top, s_right, s_bottom in screens:
+        if s_left <= left and s_top <= top and right <= s_right and bottom <= s_bottom:
+            return None
+    mask = np.zeros((max(bottom - top, 0), max(right - left, 0)), dtype=bool)
+    for s_left, s_top, s_right, s_bottom in screens:
+        x0, y0 = max(s_left, left), max(s_top, top)
+        x1, y1 = min(s_right, right), min(s_bottom, bottom)
+        if x0 < x1 and y0 < y1:
+            mask[y0 - top:y1 - top, x0 - left:x1 - left] = True
+    return mask
+
+
+def bounding_box(points, margin=0):
+    """
+    返回包含所有坐标的区域 (left, top, right, bottom)，right/bottom 不包含在内。
+    """
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs) - margin, min(ys) - margin, max(xs) + 1 + margin, max(ys) + 1 + margin
+
+
+def cluster_regions(points, gap=200, max_regions=4, margin=0):
+    """
+    按坐标间的空隙把点分成几簇，返回每簇的包围盒。
+    沿 x、y 轴交替切分，超过 gap 像素的空隙处分开；簇数超过 max_regions 时退回一个整体包围盒。
+    """
+    if not points:
+        return []
+    clusters = [list(points)]
+    changed = True
+    axis = 0
+    while changed:
+        changed = False
+        for _ in range(2):
+            result = []
+            for cluster in clusters:
+                cluster.sort(key=lambda p: p[axis])
+                part = [cluster[0]]
+                for prev, point in zip(cluster, cluster[1:]):
+                    if point[axis] - prev[axis] > gap:
+                        result.append(part)
+                        part = []
+                        changed = True
+                    part.append(point)
+                result.append(part)
+            clusters = result
+            axis = 1 - axis
+        if len(clusters) > max_regions:
+            return [bounding_box(points, margin)]
+    return [bounding_box(cluster, margin) for cluster in clusters]
+
+
+def capture_signature(backend, x, y, radius=1):
+    """
+    采集 (x, y) 周围 (2 * radius + 1) 见方的像素，返回 [[dx, dy, r, g, b], ...]，用作判色特征。
+    """
+    frame = backend.grab((x - radius, y - radius, x + radius + 1, y + radius + 1))
+    signature = []
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            try:
+                r, g, b = frame.pixel(x + dx, y + dy)
+            except ValueError:
+                # 超出屏幕的部分不采集
+                continue
+            signature.append([dx, dy, r, g, b])
+    return signature
+
+
+def wait_for_match(backend, samples, tolerance, timeout, stop_event, min_interval=0.005, max_interval=0.2, hold=None):
+    """
+    等待采样点颜色一致，返回 True（一致）、False（超时）或 None（被停止）。
+    只抓取采样点所在的小区域；轮询间隔从 min_interval 开始逐步加倍到 max_interval，
+    区域内容的校验和与上次相同时跳过颜色比较，并继续拉长间隔。
+    stop_event 置位时：没有 hold 则视为停止；否则调用 hold()，返回 None 表示停止，
+    否则为暂停的秒数，超时时间相应顺延。
+    """
+    points = [point for point, color in samples]
+    bbox = bounding_box(points)
+    xs = np.array([p[0] for p in points], dtype=np.int64)
+    ys = np.array([p[1] for p in points], dtype=np.int64)
+    expected = np.array([color for point, color in samples], dtype=np.int32)
+    limit = tolerance * tolerance
+
+    deadline = time.perf_counter() + timeout
+    interval = min_interval
+    last_checksum = None
+    while True:
+        frame = backend.grab(bbox)
+        checksum = zlib.crc32(frame.array.tobytes())
+        if checksum != last_checksum:
+            last_checksum = checksum
+            colors, valid = frame.lookup(xs, ys)
+            if valid.all() and np.square(colors.astype(np.int32) - expected).sum(axis=1).max() <= limit:
+                return True
+            # 画面刚变化，下一次尽快检查
+            interval = min_interval
+        else:
+            interval = min(interval * 2, max_interval)
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        if stop_event.wait(min(interval, remaining)):
+            if hold is None:
+                return None
+            held = hold()
+            if held is None:
+                return None
+            deadline += held
+            # 暂停期间画面可能已经变化
+            last_checksum = None
+
+
+def find_signature(frame, samples, tolerance, near=None):
+    """
+    在画面中查找颜色特征。samples 为 [((x, y), 颜色), ...]，坐标只用于确定各采样点之间的相对位置，
+    第一个采样点为参考点。返回所有采样点颜色都一致时参考点的屏幕坐标 (x, y)，找不到时返回 None；
+    有多处一致时取离 near 最近的一处。
+    """
+    (x0, y0), color = samples[0]
+    limit = tolerance * tolerance
+    array = frame.array
+
+    def distances(colors, expected):
+        return np.square(colors.astype(np.int32) - np.array(expected, dtype=np.int32)).sum(axis=-1)
+
+    # 先找参考点颜色一致的位置，再逐个采样点筛选；屏幕之间的空白不参与匹配
+    matched = distances(array, color) <= limit
+    if frame.mask is not None:
+        matched &= frame.mask
+    rows, cols = np.nonzero(matched)
+    for (x, y), color in samples[1:]:
+        if not len(rows):
+            return None
+        rows, cols = rows + (y - y0), cols + (x - x0)
+        inside = (cols >= 0) & (cols < frame.width) & (rows >= 0) & (rows < frame.height)
+        rows, cols = rows[inside], cols[inside]
+        keep = distances(array[rows, cols], color) <= limit
+        if frame.mask is not None:
+            keep &= frame.mask[rows, cols]
+        rows, cols = rows[keep] - (y - y0), cols[keep] - (x - x0)
+    if not len(rows):
+        return None
+    index = 0
+    if near is not None:
+        index = int(np.argmin(np.square(cols + frame.left - near[0]) + np.square(rows + frame.top - near[1])))
+    return int(cols[index]) + frame.left, int(rows[index]) + frame.top
+
+
+class FrameSampler:
+    """
+    批量判色：抓取画面后，用一次向量化的颜色距离计算得到所有判色步骤的结果。
+    points / expected 为所有采样点，第 k 个判色步骤的采样点从 starts[k] 开始，
+    它的所有采样点与期望颜色的欧氏距离都不超过 tolerances[k] 时判为一致。
+    regions 为抓取区域列表（None 表示整屏），每个坐标只从包含它的区域读取；cluster 为 True 时按坐标自动分簇。
+    groups 为每个坐标所相对的锚点编号，锚点的偏移量由 set_offset() 设置。
+    ttl 为 None 时每轮抓一次，否则画面超过 ttl 秒后重新抓取；invalidate() 可随时让缓存失效。
+    """
+
+    def __init__(self, backend, points, expected, starts=None, tolerances=None, ttl=None, regions=None, groups=None,
+                 cluster=False):
+        self.backend = backend
+        self.base_xs = np.array([p[0] for p in points], dtype=np.int64)
+        self.base_ys = np.array([p[1] for p in points], dtype=np.int64)
+        self.expected = np.array(expected, dtype=np.int32).reshape(-1, 3)
+        if starts is None:
+            starts = range(len(self.base_xs))
+        self.starts = np.array(starts, dtype=np.int64)
+        if tolerances is None:
+            tolerances = [0] * len(self.starts)
+        # 比较距离的平方，避免开方
+        self.limits = np.square(np.array(tolerances, dtype=np.float64))
+        self.ttl = ttl
+        # 每个坐标所相对的锚点（0 为绝对坐标）及各锚点当前的偏移量；未定位的锚点的坐标不参与抓取
+        if groups is None:
+            groups = [0] * len(self.base_xs)
+        self.groups = np.array(groups, dtype=np.int64)
+        count = int(self.groups.max()) + 1 if len(self.groups) else 1
+        self.offsets = np.zeros((count, 2), dtype=np.int64)
+        self.located = np.zeros(count, dtype=bool)
+        self.located[0] = True
+        self.fixed_regions = regions
+        self.cluster = cluster
+        self.frames = None
+        self.grabs = 0
+        self.valid = None
+        self.matches = None
+        self.place()
+
+    def place(self):
+        """
+        按锚点偏移计算实际坐标，并确定抓取区域和每个坐标所属的区域。
+        cluster 为 True 时按已定位的坐标重新分簇，否则使用固定的 regions。
+        """
+        self.xs = self.base_xs + self.offsets[self.groups, 0]
+        self.ys = self.base_ys + self.offsets[self.groups, 1]
+        if self.cluster:
+            active = self.located[self.groups]
+            self.regions = cluster_regions(list(zip(self.xs[active].tolist(), self.ys[active].tolist())))
+        else:
+            self.regions = self.fixed_regions or [None]
+        # 每个坐标所属的区域；不在任何区域内的坐标归入第 0 个区域，查找时会标记为无效
+        self.region_of = np.zeros(len(self.xs), dtype=np.int64)
+        for index, bbox in reversed(list(enumerate(self.regions))):
+            if bbox is None:
+                self.region_of[:] = index
+                continue
+            left, top, right, bottom = bbox
+            inside = (self.xs >= left) & (self.xs < right) & (self.ys >= top) & (self.ys < bottom)
+            self.region_of[inside] = index
+
+    def set_offset(self, group, dx, dy):
+        """
+        设置第 group 个锚点的偏移量；与当前相同时什么也不做，否则重新计算坐标并让缓存的画面失效。
+        """
+        if self.located[group] and self.offsets[group, 0] == dx and self.offsets[group, 1] == dy:
+            return
+        self.offsets[group] = (dx, dy)
+        self.located[group] = True
+        self.place()
+        self.invalidate()
+
+    def clear_offset(self, group):
+        """
+        第 group 个锚点找不到时调用：其坐标不再参与抓取，直到重新定位。
+        """
+        if self.located[group]:
+            self.located[group] = False
+            self.place()
+
+    @property
+    def age(self):
+        return max(frame.age for frame in self.frames) if self.frames else None
+
+    def invalidate(self):
+        self.frames = None
+
+    def begin_pass(self):
+        if self.ttl is None:
+            self.invalidate()
+
+    def refresh(self):
+        self.frames = [self.backend.grab(bbox) for bbox in self.regions]
+        self.grabs += len(self.frames)
+        colors = np.zeros((len(self.xs), 3), dtype=np.uint8)
+        valid = np.zeros(len(self.xs), dtype=bool)
+        for index, frame in enumerate(self.frames):
+            mask = self.region_of == index
+            colors[mask], valid[mask] = frame.lookup(self.xs[mask], self.ys[mask])
+        distances = np.square(colors.astype(np.int32) - self.expected).sum(axis=1)
+        # 每个判色步骤取其采样点中最大的距离
+        self.valid = np.logical_and.reduceat(valid, self.starts)
+        self.matches = self.valid & (np.maximum.reduceat(distances, self.starts) <= self.limits)
+
+    def match(self, row):
+        """
+        返回第 row 个判色步骤的 (valid, matched)：采样点是否都在画面内、颜色是否一致。
+        """
+        if self.frames is None or (self.ttl is not None and self.frames and self.age > self.ttl):
+            self.refresh()
+        return bool(self.valid[row]), bool(self.matches[row])
@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+# 命令行入口：不加载 tkinter，pyautogui、numpy 等依赖在真正用到时才导入，便于其它工具定时调用。
+#   python cli.py list
+#   python cli.py validate 脚本名
+#   python cli.py run 脚本名 [--count N | --loop] [--interval 秒] [--time-limit 秒] [--backend pyautogui|framebus|virtual]
+#   python cli.py serve [--port 端口 | --socket 路径]（本地控制接口，见 control.py）
+
+# runner 只依赖标准库（批量判色、模板查找用到 numpy 时才导入）
+from runner import ActionRunner, CAPTURE_FRAME, CAPTURE_PIXEL, CAPTURE_REGION
+from settings import DEFAULT_CONFIG_DIR, SETTINGS_FILE, ensure_control_token, read_settings
+
+BACKENDS = ("pyautogui", "framebus", "virtual")
+
+# 退出码
+EXIT_OK = 0
+EXIT_ERROR = 1       # 脚本不存在、编译失败等
+EXIT_STOPPED = 2     # 达到时间限制或被 Ctrl+C 停止
+EXIT_RUN_ERRORS = 3  # 运行完成但有步骤出错
+
+
+def resolve_config_dir(config_dir=None):
+    if config_dir:
+        return config_dir
+    try:
+        return read_settings().get("config_dir", DEFAULT_CONFIG_DIR)
+    except (OSError, ValueError):
+        return DEFAULT_CONFIG_DIR
+
+
+def load_script(config_dir, name):
+    from storage import read_script, saved_format
+
+    base = os.path.join(config_dir, name)
+    if saved_format(base) is None:
+        raise ValueError(f"脚本不存在：{name}（配置目录 {config_dir}）")
+    return read_script(base)
+
+
+def create_backend(name, frame_bus=None):
+    from backends import PyAutoGUIBackend, VirtualScreenBackend
+
+    if name == "virtual":
+        return VirtualScreenBackend()
+    backend = PyAutoGUIBackend()
+    # 提前导入 pyautogui，缺少依赖时在开始运行前报错
+    backend.gui
+    if name == "framebus":
+        from framebus import DEFAULT_BUS_NAME, FrameBusBackend
+        return FrameBusBackend(backend, name=frame_bus or DEFAULT_BUS_NAME)
+    return backend
+
+
+def create_runner(args, backend, on_event=None, timing_capacity=0):
+    return ActionRunner(backend, on_event=on_event, motion_value=args.motion_duration, pause=args.pause,
+                        turbo=args.turbo, capture_mode=args.capture, timing_capacity=timing_capacity)
+
+
+def command_list(args):
+    from library import ScriptLibrary
+
+    config_dir = resolve_config_dir(args.config_dir)
+    if not os.path.isdir(config_dir):
+        print(f"配置目录不存在：{config_dir}", file=sys.stderr)
+        return EXIT_ERROR
+    library = ScriptLibrary(config_dir)
+    library.scan()
+    if args.json:
+        print(json.dumps(library.entries, ensure_ascii=False, indent=2))
+    else:
+        for name in library.names():
+            print(f"{name}\t{library.entries[name]['steps']}")
+    return EXIT_OK
+
+
+def command_validate(args):
+    from plan import compile_plan
+
+    config_dir = resolve_config_dir(args.config_dir)
+    try:
+        items = load_script(config_dir, args.script)
+        plan = compile_plan(items, config_dir)
+    except (OSError, ValueError) as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return EXIT_ERROR
+    print(f"{args.script}：{len(items)} 项，编译为 {len(plan)} 步，判色采样点 {len(plan.points)} 个")
+    return EXIT_OK
+
+
+def command_run(args):
+    from plan import compile_plan
+
+    config_dir = resolve_config_dir(args.config_dir)
+    try:
+        items = load_script(config_dir, args.script)
+        plan = compile_plan(items, config_dir)
+    except (OSError, ValueError) as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    def on_event(kind, data):
+        if kind == "error":
+            print(f"第 {data['step'] + 1} 行：{data['message']}", file=sys.stderr)
+        elif kind == "progress" and args.verbose:
+            print(f"第 {data['iteration']} 轮，第 {data['step'] + 1} 行，{data['steps_per_second']:.1f} 步/秒",
+                  file=sys.stderr)
+
+    try:
+        backend = create_backend(args.backend, args.frame_bus)
+    except Exception as e:
+        print(f"错误：无法创建后端 {args.backend}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    runner = create_runner(args, backend, on_event, timing_capacity=50000 if args.report else 0)
+
+    # 在工作线程中运行，主线程负责时间限制和 Ctrl+C
+    result = {}
+
+    def run():
+        try:
+            result["stats"] = runner.run(plan, args.loop, args.count, args.interval)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + args.time_limit if args.time_limit else None
+    limited = False
+    try:
+        while thread.is_alive():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                limited = True
+                runner.stop()
+                break
+            thread.join(0.2 if remaining is None else min(0.2, remaining))
+    except KeyboardInterrupt:
+        runner.stop()
+    thread.join()
+
+    stats = result.get("stats")
+    if stats is None:
+        print(f"错误：运行意外退出: {result.get('error')}", file=sys.stderr)
+        return EXIT_ERROR
+    summary = stats.as_dict()
+    summary["time_limit_reached"] = limited
+    if args.report and runner.timings is not None:
+        if args.report.lower().endswith(".csv"):
+            runner.timings.export_csv(args.report)
+        else:
+            runner.timings.export_json(args.report, stats)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print(f"{stats.status}：{stats.iterations} 轮，{stats.steps} 步，点击 {stats.clicks} 次，错误 {stats.errors} 次，"
+              f"用时 {stats.elapsed:.2f} 秒")
+    if stats.status != "finished":
+        return EXIT_STOPPED
+    return EXIT_RUN_ERRORS if stats.errors else EXIT_OK
+
+
+def command_serve(args):
+    from control import ControlServer
+
+    config_dir = resolve_config_dir(args.config_dir)
+    if not os.path.isdir(config_dir):
+        print(f"配置目录不存在：{config_dir}", file=sys.stderr)
+        return EXIT_ERROR
+    try:
+        backend = create_backend(args.backend, args.frame_bus)
+    except Exception as e:
+        print(f"错误：无法创建后端 {args.backend}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    try:
+        token = ensure_control_token()
+    except (OSError, ValueError) as e:
+        print(f"错误：无法读取或生成控制接口令牌: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    runner = create_runner(args, backend)
+    server = ControlServer(runner, config_dir, port=args.port, socket_path=args.socket, token=token)
+
+    def on_event(kind, data):
+        server.publish(kind, data)
+        if kind == "error" and args.verbose:
+            print(f"第 {data['step'] + 1} 行：{data['message']}", file=sys.stderr)
+
+    runner.on_event = on_event
+    try:
+        server.start()
+    except OSError as e:
+        print(f"错误：无法监听 {server.address}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    print(f"控制接口已启动：{server.address}（令牌见 {os.path.join(DEFAULT_CONFIG_DIR, SETTINGS_FILE)} 中的 "
+          f"control_token，Ctrl+C 退出）", file=sys.stderr)
+    try:
+        while server.thread.is_alive():
+            server.thread.join(0.5)
+    except KeyboardInterrupt:
+        runner.stop()
+    server.close()
+    return EXIT_OK
+
+
+def non_negative(value):
+    value = float(value)
+    if value < 0:
+        raise argparse.ArgumentTypeError("必须是非负数字")
+    return value
+
+
+def add_runner_options(parser):
+    parser.add_argument("--backend", choices=BACKENDS, default="pyautogui", help="输入/屏幕后端")
+    parser.add_argument("--frame-bus", help="帧总线名称（--backend framebus）")
+    parser.add_argument("--capture", choices=(CAPTURE_PIXEL, CAPTURE_FRAME, CAPTURE_REGION), default=CAPTURE_PIXEL,
+                        help="判色方式")
+    parser.add_argument("--motion-duration", type=non_negative, default=0.5, help="每次移动的时长（秒）")
+    parser.add_argument("--pause", type=non_negative, help="每次输入后的停顿（秒）")
+    parser.add_argument("--turbo", action="store_true", help="极速模式：直接在目标位置点击")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="win_click_tools 命令行（不启动界面）")
+    parser.add_argument("--config-dir", help="配置目录（默认读取设置文件中的目录）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_list = subparsers.add_parser("list", help="列出脚本库中的脚本和步数")
+    parser_list.add_argument("--json", action="store_true", help="以 JSON 输出")
+    parser_list.set_defaults(func=command_list)
+
+    parser_validate = subparsers.add_parser("validate", help="读取并编译脚本，检查错误")
+    parser_validate.add_argument("script", help="脚本名")
+    parser_validate.set_defaults(func=command_validate)
+
+    parser_run = subparsers.add_parser("run", help="运行脚本")
+    parser_run.add_argument("script", help="脚本名")
+    group = parser_run.add_mutually_exclusive_group()
+    group.add_argument("--count", type=int, default=1, help="执行次数（默认 1）")
+    group.add_argument("--loop", action="store_true", help="无限循环，直到时间限制或 Ctrl+C")
+    parser_run.add_argument("--interval", type=non_negative, default=1.0, help="每轮之间的间隔秒数（默认 1）")
+    parser_run.add_argument("--time-limit", type=non_negative, help="最长运行秒数，到时停止")
+    add_runner_options(parser_run)
+    parser_run.add_argument("--report", help="运行结束后导出逐步耗时（.csv 或 .json）")
+    parser_run.add_argument("--json", action="store_true", help="以 JSON 输出运行统计")
+    parser_run.add_argument("--verbose", action="store_true", help="输出运行进度")
+    parser_run.set_defaults(func=command_run)
+
+    parser_serve = subparsers.add_parser("serve", help="启动本地控制接口，接受排队的运行请求")
+    address = parser_serve.add_mutually_exclusive_group()
+    address.add_argument("--port", type=int, help="监听 127.0.0.1 的端口（默认 8765）")
+    address.add_argument("--socket", help="监听 Unix 套接字路径")
+    add_runner_options(parser_serve)
+    parser_serve.add_argument("--verbose", action="store_true", help="输出运行中的错误")
+    parser_serve.set_defaults(func=command_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "count", 1) < 1:
+        print("错误：次数必须是正整数", file=sys.stderr)
+        return EXIT_ERROR
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,520 @@
+import asyncio
+import concurrent.futures
+import hmac
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+# 本地控制接口：HTTP/1.1 + JSON，只监听 127.0.0.1 或 Unix 套接字，界面和命令行（python cli.py serve）共用。
+# 请求需要带上设置文件中的令牌（Authorization: Bearer <control_token>），带 Origin 头或 Host 不是本机的请求
+# 一律拒绝，POST 必须是 application/json，防止本机浏览器中的网页跨站请求接口。
+# 所有连接都在一个 asyncio 事件循环里处理，不为每个请求创建线程；运行请求排队，按顺序在一个执行线程中运行。
+#   curl -H "Authorization: Bearer $TOKEN" http://127.0.0.1:8765/scripts
+#   curl -H "Authorization: Bearer $TOKEN" -H "Content-Type: application/json" \
+#        -X POST http://127.0.0.1:8765/runs -d '{"script": "items", "count": 10, "interval": 0.5}'
+#   curl -N -H "Authorization: Bearer $TOKEN" http://127.0.0.1:8765/events
+
+DEFAULT_CONTROL_PORT = 8765
+CONTROL_HOST = "127.0.0.1"
+# 允许的 Host 头（不含端口）
+LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "[::1]"}
+# 请求体上限、读取请求的超时（秒）、每个事件订阅者最多缓存的事件数、保留的已结束运行数
+MAX_BODY = 64 * 1024
+REQUEST_TIMEOUT = 10
+EVENT_BUFFER = 1000
+KEEP_FINISHED = 100
+
+# 运行请求的状态
+RUN_QUEUED = "queued"
+RUN_RUNNING = "running"
+RUN_FINISHED = "finished"
+RUN_STOPPED = "stopped"
+RUN_FAILED = "failed"
+RUN_CANCELLED = "cancelled"
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+                404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+                415: "Unsupported Media Type", 500: "Internal Server Error"}
+
+
+def load_plan(config_dir, name):
+    """
+    读取并编译脚本库中的脚本，名称无效、脚本不存在或编译失败时抛出 ValueError。
+    """
+    from plan import compile_plan
+    from storage import read_script, saved_format
+
+    base = os.path.join(config_dir, script_name(name))
+    if saved_format(base) is None:
+        raise ValueError(f"脚本不存在：{name}")
+    return compile_plan(read_script(base), config_dir)
+
+
+def script_name(name):
+    """
+    检查客户端传入的脚本名称（不能含路径分隔符、不能以 . 开头等，见 library.validate_script_name），
+    防止读取脚本库以外的文件；无效时抛出 ValueError。
+    """
+    from library import validate_script_name
+
+    if validate_script_name(name) != name:
+        raise ValueError(f"无效的脚本名称：{name}")
+    return name
+
+
+def event_payload(kind, data):
+    """
+    把执行引擎的事件转换为可以 JSON 序列化的字典：stats 转为字典，去掉逐步耗时记录。
+    """
+    payload = {"event": kind, "time": time.time()}
+    for key, value in data.items():
+        if key == "timings":
+            continue
+        payload[key] = value.as_dict() if key == "stats" and value is not None else value
+    return payload
+
+
+class RunRequest:
+    """
+    一个排队的运行请求。
+    """
+
+    def __init__(self, run_id, script, loop=False, count=1, interval=1.0):
+        self.id = run_id
+        self.script = script
+        self.loop = loop
+        self.count = count
+        self.interval = interval
+        self.status = RUN_QUEUED
+        # 取消请求：运行中（包括读取脚本期间）被取消时置位，execute() 据此不再开始或立即停止
+        self.cancel_requested = threading.Event()
+        self.progress = None
+        self.stats = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.ended = None
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "script": self.script,
+            "loop": self.loop,
+            "count": self.count,
+            "interval": self.interval,
+            "status": self.status,
+            "progress": self.progress,
+            "stats": self.stats,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "ended": self.ended,
+        }
+
+
+class ControlServer:
+    """
+    本地控制接口。接口（请求和响应都是 JSON）：
+    - GET /scripts：脚本库中的脚本 {名称: {"steps", ...}}
+    - GET /status：当前运行和排队中的运行
+    - POST /runs：{"script", "count", "loop", "interval"} 加入队列，返回运行请求（含 id）
+    - GET /runs/<id>：运行请求的状态、进度和统计
+    - DELETE /runs/<id>：取消排队中的运行，正在运行的则停止
+    - POST /stop：停止当前运行，{"clear": true} 同时取消所有排队中的运行
+    - POST /pause、POST /resume：暂停当前运行（停在当前步骤）、继续
+    - GET /events：持续推送事件，每行一个 JSON（started / progress / error / stopped / finished 以及 queued、cancelled、failed）
+    runner 的事件需要由宿主转交给 publish()（可在任意线程中调用）。界面自己发起的运行也会推送事件，
+    排队的运行会等它结束后再开始。port 和 socket_path 二选一，都不指定时使用 DEFAULT_CONTROL_PORT。
+    token 不为空时每个请求都要带 Authorization: Bearer <token>。
+    """
+
+    def __init__(self, runner, config_dir, port=None, socket_path=None, token=None):
+        self.runner = runner
+        self.config_dir = config_dir
+        self.token = token
+        self.port = DEFAULT_CONTROL_PORT if port is None and socket_path is None else port
+        self.socket_path = socket_path
+        self.runs = OrderedDict()
+        self.current = None
+        self.ids = itertools.count(1)
+        self.subscribers = set()
+        self.connections = set()
+        self.loop = None
+        self.queue = None
+        self.closing = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.start_error = None
+        # 运行只在这一个线程中进行；读取脚本库等磁盘操作使用事件循环默认的线程池
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="control-run")
+
+    @property
+    def address(self):
+        return self.socket_path if self.socket_path else f"{CONTROL_HOST}:{self.port}"
+
+    # 线程接口：界面中使用
+
+    def start(self):
+        """
+        在后台线程中启动事件循环，监听成功后返回；监听失败时抛出 OSError。
+        """
+        self.ready.clear()
+        self.start_error = None
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.serve()), name="control", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.start_error is not None:
+            self.thread.join()
+            raise self.start_error
+
+    def close(self):
+        """
+        停止监听并结束后台线程（不会停止当前运行）。
+        """
+        loop = self.loop
+        if loop is not None and self.closing is not None:
+            loop.call_soon_threadsafe(self.closing.set)
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.executor.shutdown(wait=False)
+
+    def publish(self, kind, data):
+        """
+        转交执行引擎的事件，可在执行线程中调用，不会阻塞。
+        """
+        loop = self.loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self.dispatch, event_payload(kind, data))
+        except RuntimeError:
+            # 事件循环已经关闭
+            pass
+
+    # 事件循环中运行的部分
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.closing = asyncio.Event()
+        try:
+            if self.socket_path:
+                if os.path.exists(self.socket_path):
+                    os.unlink(self.socket_path)
+                server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+                os.chmod(self.socket_path, 0o600)
+            else:
+                server = await asyncio.start_server(self.handle, CONTROL_HOST, self.port)
+                if not self.port:
+                    self.port = server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self.start_error = e
+            self.loop = None
+            self.ready.set()
+            return
+        self.ready.set()
+        worker = asyncio.create_task(self.work())
+        try:
+            await self.closing.wait()
+        finally:
+            server.close()
+            worker.cancel()
+            for task in list(self.connections):
+                task.cancel()
+            await asyncio.gather(worker, *self.connections, return_exceptions=True)
+            await server.wait_closed()
+            self.loop = None
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def dispatch(self, payload):
+        """
+        记录运行进度并推送给所有订阅者；订阅者读得太慢、缓存已满时丢弃该订阅者的这条事件。
+        """
+        run = self.current
+        if run is not None:
+            payload.setdefault("run", run.id)
+            if payload["event"] == "progress":
+                run.progress = {key: payload[key] for key in ("step", "iteration", "steps", "steps_per_second")}
+            elif payload["event"] == "error":
+                run.progress = dict(run.progress or {}, last_error=payload.get("message"))
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                pass
+
+    async def work(self):
+        """
+        按顺序执行排队的运行。执行引擎正忙（例如界面发起的运行）时等它结束。
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            run = await self.queue.get()
+            while run.status == RUN_QUEUED:
+                if not self.runner.running:
+                    await self.execute(run, loop)
+                    if run.status != RUN_QUEUED:
+                        break
+                await asyncio.sleep(0.05)
+
+    async def execute(self, run, loop):
+        """
+        执行一个运行请求。检查 runner.running 和真正开始运行之间界面可能抢先开始运行，
+        这时 run() 抛出 RunnerBusy，运行请求退回排队状态，由 work() 继续等待。
+        """
+        from runner import RunnerBusy
+
+        self.current = run
+        run.status = RUN_RUNNING
+        run.started = time.time()
+        try:
+            plan = await loop.run_in_executor(None, load_plan, self.config_dir, run.script)
+            if run.cancel_requested.is_set():
+                # 读取脚本期间被取消
+                self.mark_cancelled(run)
+                self.current = None
+                self.forget_finished()
+                return
+            stats = await loop.run_in_executor(self.executor, self.runner.run, plan, run.loop, run.count,
+                                               run.interval, run.cancel_requested)
+        except RunnerBusy:
+            self.current = None
+            if run.cancel_requested.is_set():
+                self.mark_cancelled(run)
+            else:
+                run.status = RUN_QUEUED
+                run.started = None
+            return
+        except Exception as e:
+            run.status = RUN_FAILED
+            run.error = str(e)
+            self.dispatch({"event": RUN_FAILED, "time": time.time(), "message": run.error})
+        else:
+            run.status = stats.status
+            run.stats = stats.as_dict()
+        run.ended = time.time()
+        self.current = None
+        self.forget_finished()
+
+    def forget_finished(self):
+        finished = [run_id for run_id, run in self.runs.items() if run.status not in (RUN_QUEUED, RUN_RUNNING)]
+        for run_id in finished[:-KEEP_FINISHED]:
+            del self.runs[run_id]
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            await self.handle_request(reader, writer)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # 关闭接口时取消仍在推送事件或读取请求的连接
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def handle_request(self, reader, writer):
+        request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            self.respond(writer, 400, {"error": "请求格式错误"})
+            return
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        method = method.upper()
+        error = self.check_request(method, headers)
+        if error is not None:
+            self.respond(writer, *error)
+            return
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY:
+            self.respond(writer, 413 if length > 0 else 400, {"error": "请求体长度错误"})
+            return
+        body = await asyncio.wait_for(reader.readexactly(length), REQUEST_TIMEOUT) if length else b''
+        try:
+            data = json.loads(body) if body.strip() else {}
+            if not isinstance(data, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+        except ValueError as e:
+            self.respond(writer, 400, {"error": f"请求体不是有效的 JSON: {e}"})
+            return
+
+        path = urlsplit(target).path.rstrip('/') or '/'
+        if method == 'GET' and path == '/events':
+            await self.stream_events(writer)
+            return
+        try:
+            status, payload = await self.route(method, path, data)
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        self.respond(writer, status, payload)
+        await writer.drain()
+
+    def check_request(self, method, headers):
+        """
+        拒绝浏览器发起的跨站请求和未带令牌的请求，返回 (状态码, 响应) 或 None。
+        """
+        if 'origin' in headers:
+            return 403, {"error": "不接受浏览器跨站请求"}
+        if not self.socket_path:
+            host = headers.get('host', '')
+            if host.startswith('['):
+                host = host[:host.find(']') + 1]
+            else:
+                host = host.rpartition(':')[0] if ':' in host else host
+            if host.lower() not in LOOPBACK_HOSTS:
+                return 403, {"error": "Host 必须是本机地址"}
+        if self.token:
+            expected = f"Bearer {self.token}"
+            if not hmac.compare_digest(headers.get('authorization', '').encode('utf-8'), expected.encode('utf-8')):
+                return 401, {"error": "缺少或错误的令牌（见设置文件中的 control_token）"}
+        if method == 'POST' and headers.get('content-type', '').split(';')[0].strip().lower() != 'application/json':
+            return 415, {"error": "POST 请求的 Content-Type 必须是 application/json"}
+        return None
+
+    def respond(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode('latin-1') + body)
+
+    async def stream_events(self, writer):
+        queue = asyncio.Queue(EVENT_BUFFER)
+        self.subscribers.add(queue)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson; charset=utf-8\r\n"
+                         b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            while True:
+                payload = await queue.get()
+                writer.write(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b"\n")
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
+
+    async def route(self, method, path, data):
+        parts = path.strip('/').split('/')
+        if path == '/scripts':
+            if method != 'GET':
+                return 405, {"error": "只支持 GET"}
+            return 200, await asyncio.get_running_loop().run_in_executor(None, self.list_scripts)
+        if path == '/status':
+            if method != 'GET':
+                return 405, {"error": "只支持 GET"}
+            return 200, self.status()
+        if path == '/runs':
+            if method == 'GET':
+                return 200, [run.as_dict() for run in self.runs.values()]
+            if method == 'POST':
+                return self.submit(data)
+            return 405, {"error": "只支持 GET、POST"}
+        if len(parts) == 2 and parts[0] == 'runs':
+            try:
+                run = self.runs[int(parts[1])]
+            except (ValueError, KeyError):
+                return 404, {"error": f"运行不存在：{parts[1]}"}
+            if method == 'GET':
+                return 200, run.as_dict()
+            if method == 'DELETE':
+                self.cancel(run)
+                return 200, run.as_dict()
+            return 405, {"error": "只支持 GET、DELETE"}
+        if path == '/stop':
+            if method != 'POST':
+                return 405, {"error": "只支持 POST"}
+            cancelled = 0
+            if data.get("clear"):
+                for run in list(self.runs.values()):
+                    if run.status == RUN_QUEUED:
+                        self.cancel(run)
+                        cancelled += 1
+            running = self.runner.running
+            if self.current is not None:
+                self.current.cancel_requested.set()
+                running = True
+            self.runner.stop()
+            return 200, {"stopped": running, "cancelled": cancelled}
+        if path in ('/pause', '/resume'):
+            if method != 'POST':
+                return 405, {"error": "只支持 POST"}
+            if not self.runner.running:
+                return 409, {"error": "当前没有正在运行的脚本"}
+            if path == '/pause':
+                self.runner.pause_run()
+            else:
+                self.runner.resume_run()
+            return 200, {"paused": self.runner.paused}
+        return 404, {"error": f"未知的接口：{method} {path}"}
+
+    def list_scripts(self):
+        from library import ScriptLibrary
+
+        library = ScriptLibrary(self.config_dir)
+        library.scan()
+        return library.entries
+
+    def status(self):
+        return {
+            "busy": self.runner.running,
+            "paused": self.runner.running and self.runner.paused,
+            "current": self.current.as_dict() if self.current is not None else None,
+            "queue": [run.as_dict() for run in self.runs.values() if run.status == RUN_QUEUED],
+        }
+
+    def submit(self, data):
+        script = data.get("script")
+        if not isinstance(script, str) or not script:
+            return 400, {"error": "缺少 script"}
+        loop = bool(data.get("loop", False))
+        try:
+            count = int(data.get("count", 1))
+            interval = float(data.get("interval", 1))
+            if count < 1 or interval < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return 400, {"error": "count 必须是正整数，interval 必须是非负数字"}
+        from storage import saved_format
+
+        try:
+            script_name(script)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        if saved_format(os.path.join(self.config_dir, script)) is None:
+            return 404, {"error": f"脚本不存在：{script}"}
+        run = RunRequest(next(self.ids), script, loop, count, interval)
+        self.runs[run.id] = run
+        self.queue.put_nowait(run)
+        self.dispatch({"event": RUN_QUEUED, "time": time.time(), "run": run.id, "script": script})
+        position = sum(1 for other in self.runs.values() if other.status == RUN_QUEUED)
+        return 202, dict(run.as_dict(), position=position)
+
+    def mark_cancelled(self, run):
+        run.status = RUN_CANCELLED
+        run.ended = time.time()
+        self.dispatch({"event": RUN_CANCELLED, "time": time.time(), "run": run.id})
+
+    def cancel(self, run):
+        if run.status == RUN_QUEUED:
+            self.mark_cancelled(run)
+        elif run.status == RUN_RUNNING:
+            # 先记下取消请求：还在读取脚本、runner 尚未开始时 stop() 会被 run() 清掉
+            run.cancel_requested.set()
+            self.runner.stop()
@@ -0,0 +1,244 @@
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np  # 确保已安装：pip install numpy
+
+from backends import Backend
+from capture import Frame
+
+# 共享内存帧总线：一个采集进程把屏幕画面写入共享内存环形缓冲区，
+# 多个运行脚本的进程读取最新一帧（只复制需要的区域），不再各自抓屏。
+#
+# 共享内存布局：
+#   头部（int64）：[MAGIC, 宽, 高, 槽数, 最新帧号, 左, 上, (帧号, 开始采集的时间 ns) * 槽数]
+#   之后按槽依次存放 (高, 宽, 3) 的 uint8 画面，第 n 帧写入第 n % 槽数 个槽；
+#   左、上为画面左上角在屏幕上的坐标（采集进程指定 bbox 时不为 0）
+
+DEFAULT_BUS_NAME = "win_click_tools_frames"
+MAGIC = 0x57434632  # "WCF2"，头部加入画面原点后的版本
+HEADER_FIELDS = 7
+ALIGN = 64
+
+
+def header_size(slots):
+    size = 8 * (HEADER_FIELDS + 2 * slots)
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+class FrameBusProducer:
+    """
+    采集进程：按 interval 秒的间隔用 backend 抓屏，写入共享内存环形缓冲区。
+    """
+
+    def __init__(self, backend, name=DEFAULT_BUS_NAME, interval=1 / 30, slots=4, bbox=None):
+        self.backend = backend
+        self.name = name
+        self.interval = interval
+        self.slots = slots
+        self.bbox = bbox
+        self.shm = None
+        self.header = None
+        self.data = None
+        self.frame_number = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def open(self):
+        first = self.backend.grab(self.bbox)
+        height, width = first.height, first.width
+        offset = header_size(self.slots)
+        size = offset + self.slots * height * width * 3
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self.header = np.ndarray((HEADER_FIELDS + 2 * self.slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.header[:] = 0
+        self.data = np.ndarray((self.slots, height, width, 3), dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+        self.header[1:4] = (width, height, self.slots)
+        self.header[5:7] = (first.left, first.top)
+        self.publish(first)
+        # 最后写入 MAGIC，读取方据此判断缓冲区已就绪
+        self.header[0] = MAGIC
+
+    def publish(self, frame):
+        number = self.frame_number + 1
+        slot = number % self.slots
+        base = HEADER_FIELDS + 2 * slot
+        # 写入前先把槽的帧号清零，读取方发现帧号变化即重读
+        self.header[base] = 0
+        self.data[slot] = frame.array
+        self.header[base + 1] = int(frame.timestamp * 1e9)
+        self.header[base] = number
+        self.header[4] = number
+        self.frame_number = number
+
+    def run(self):
+        # 按固定节拍采集，耗时超过间隔时立即开始下一帧
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            # 时间戳取开始抓屏的时刻：读取方据此判断画面一定是在某次输入之后才开始采集的
+            started = time.monotonic()
+            frame = self.backend.grab(self.bbox)
+            frame.timestamp = started
+            self.publish(frame)
+            next_time += self.interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                next_time = time.monotonic()
+
+    def start(self):
+        if self.shm is None:
+            self.open()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.shm is not None:
+            self.header = None
+            self.data = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class FrameBusReader:
+    """
+    读取帧总线中的最新一帧。返回的画面是从共享内存复制出来的（只复制 bbox 区域），
+    复制前后都检查槽的帧号，采集进程恰好在覆盖这个槽时重读，不会得到新旧混杂的画面。
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME):
+        # 只读取不负责清理：避免本进程退出时 resource_tracker 删除共享内存
+        if sys.version_info >= (3, 13):
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if os.name == "posix":
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        if header[0] != MAGIC:
+            raise ValueError(f"共享内存 {name} 不是有效的帧总线")
+        width, height, self.slots = (int(v) for v in header[1:4])
+        self.left, self.top = (int(v) for v in header[5:7])
+        self.header = np.ndarray((HEADER_FIELDS + 2 * self.slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((self.slots, height, width, 3), dtype=np.uint8, buffer=self.shm.buf,
+                               offset=header_size(self.slots))
+
+    def latest(self, newer_than=None, timeout=1.0, bbox=None):
+        """
+        返回最新一帧（bbox 为 (left, top, right, bottom) 屏幕坐标时只返回该区域，超出画面的部分裁掉）；
+        指定 newer_than（time.monotonic 时间）时等待采集时间晚于它的帧，超时后返回当前最新帧。
+        """
+        height, width = self.data.shape[1:3]
+        if bbox is None:
+            left, top, right, bottom = 0, 0, width, height
+        else:
+            left = min(max(bbox[0] - self.left, 0), width)
+            top = min(max(bbox[1] - self.top, 0), height)
+            right = max(left, min(bbox[2] - self.left, width))
+            bottom = max(top, min(bbox[3] - self.top, height))
+        end = time.monotonic() + timeout
+        while True:
+            number = int(self.header[4])
+            slot = number % self.slots
+            base = HEADER_FIELDS + 2 * slot
+            timestamp = int(self.header[base + 1]) / 1e9
+            if int(self.header[base]) != number:
+                # 该槽正在被覆盖，让出时间片后重读
+                time.sleep(0)
+                continue
+            if newer_than is None or timestamp > newer_than or time.monotonic() >= end:
+                array = self.data[slot, top:bottom, left:right].copy()
+                if int(self.header[base]) != number:
+                    # 复制期间该槽被覆盖，画面可能不完整
+                    time.sleep(0)
+                    continue
+                frame = Frame(array, self.left + left, self.top + top)
+                frame.timestamp = timestamp
+                frame.number = number
+                return frame
+            time.sleep(0.001)
+
+    def close(self):
+        self.header = None
+        self.data = None
+        self.shm.close()
+
+
+class FrameBusBackend(Backend):
+    """
+    输入操作交给 input_backend，读屏改为读取帧总线。
+    每次移动或点击后记录输入时间，之后的抓屏只接受在这之后才开始采集的画面，使判色一定能看到输入之后的画面；
+    最多等待 timeout 秒，总线一直没有新画面时抛出 TimeoutError。
+    还没有任何输入时，接受不超过 max_age 秒的画面。
+    """
+
+    def __init__(self, input_backend, name=DEFAULT_BUS_NAME, max_age=0.05, timeout=1.0):
+        self.input = input_backend
+        self.reader = FrameBusReader(name)
+        self.max_age = max_age
+        self.timeout = timeout
+        self.last_input = None  # 最近一次输入完成的 time.monotonic 时间
+
+    def position(self):
+        return self.input.position()
+
+    def move_to(self, x, y, duration=0.0):
+        self.input.move_to(x, y, duration)
+        self.last_input = time.monotonic()
+
+    def move_step(self, x, y):
+        self.input.move_step(x, y)
+        self.last_input = time.monotonic()
+
+    def click(self):
+        self.input.click()
+        self.last_input = time.monotonic()
+
+    def click_at(self, x, y):
+        self.input.click_at(x, y)
+        self.last_input = time.monotonic()
+
+    def set_pause(self, seconds):
+        self.input.set_pause(seconds)
+
+    def mouse_down(self):
+        return self.input.mouse_down()
+
+    def grab(self, bbox=None):
+        last_input = self.last_input
+        if last_input is None:
+            return self.reader.latest(newer_than=time.monotonic() - self.max_age, bbox=bbox)
+        frame = self.reader.latest(newer_than=last_input, timeout=self.timeout, bbox=bbox)
+        if frame.timestamp <= last_input:
+            raise TimeoutError(f"帧总线 {self.timeout} 秒内没有输入之后采集的画面，采集进程是否在运行？")
+        return frame
+
+    def pixel(self, x, y):
+        return self.grab((x, y, x + 1, y + 1)).pixel(x, y)
+
+    def close(self):
+        self.reader.close()
+
+
+if __name__ == "__main__":
+    # 作为采集进程运行：python framebus.py [间隔秒数]
+    from backends import PyAutoGUIBackend
+
+    producer = FrameBusProducer(PyAutoGUIBackend(), interval=float(sys.argv[1]) if len(sys.argv) > 1 else 1 / 30)
+    producer.start()
+    print(f"帧总线 {producer.name} 已启动，按 Ctrl+C 停止。")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        producer.close()
@@ -0,0 +1,112 @@
+from collections import deque
+
+from storage import apply_ops
+
+# 撤销/重做：每条记录只保存一次修改的编辑操作（见 storage.apply_ops）和它的逆操作，
+# 只引用被修改的列表项，与当前列表共享其它所有项，不复制整个列表。
+# 约定列表项加入列表后不再原地修改，修改时替换为新的字典，否则记录中引用的旧项也会跟着变化。
+
+DEFAULT_HISTORY_LIMIT = 500
+
+
+def invert_ops(items, ops):
+    """
+    依次把 ops 应用到 items 上，返回撤销它们的逆操作（按执行顺序排列）。
+    """
+    inverse = []
+    for op in ops:
+        kind = op[0]
+        if kind == "insert":
+            inverse.append(("delete", op[1]))
+        elif kind == "delete":
+            inverse.append(("insert", op[1], items[op[1]]))
+        elif kind == "set":
+            inverse.append(("set", op[1], items[op[1]]))
+        elif kind == "move":
+            inverse.append(("move", op[2], op[1]))
+        apply_ops(items, (op,))
+    inverse.reverse()
+    return inverse
+
+
+def first_index(ops):
+    """
+    编辑操作涉及的最小下标，用于撤销/重做后滚动到修改的位置。
+    """
+    return min(op[2] if op[0] == "move" else op[1] for op in ops)
+
+
+class Edit:
+    """
+    一次修改。ops / inverse 为编辑操作和逆操作；整体替换列表（导入）时两者为 None，
+    before / after 为替换前后的列表内容（元组，只复制引用）。
+    """
+
+    __slots__ = ("label", "ops", "inverse", "before", "after")
+
+    def __init__(self, label, ops=None, inverse=None, before=None, after=None):
+        self.label = label
+        self.ops = ops
+        self.inverse = inverse
+        self.before = before
+        self.after = after
+
+
+class History:
+    """
+    撤销/重做栈，最多保留 limit 条记录。
+    undo() / redo() 返回 (Edit, 列表, 应用的操作)：列表通常就是传入的列表（已原地修改），
+    整体替换时为新列表，此时应用的操作为 None。
+    """
+
+    def __init__(self, limit=DEFAULT_HISTORY_LIMIT):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def apply(self, items, ops, label=""):
+        """
+        把 ops 应用到 items 上并记录，清空重做栈。
+        """
+        ops = list(ops)
+        inverse = invert_ops(items, ops)
+        self.undo_stack.append(Edit(label, ops, inverse))
+        self.redo_stack.clear()
+
+    def replace(self, before, after, label=""):
+        """
+        记录列表被整体替换（after 为替换后使用的新列表）。
+        """
+        self.undo_stack.append(Edit(label, before=tuple(before), after=tuple(after)))
+        self.redo_stack.clear()
+
+    def undo(self, items):
+        if not self.undo_stack:
+            return None, items, None
+        edit = self.undo_stack.pop()
+        self.redo_stack.append(edit)
+        if edit.ops is None:
+            return edit, list(edit.before), None
+        apply_ops(items, edit.inverse)
+        return edit, items, edit.inverse
+
+    def redo(self, items):
+        if not self.redo_stack:
+            return None, items, None
+        edit = self.redo_stack.pop()
+        self.undo_stack.append(edit)
+        if edit.ops is None:
+            return edit, list(edit.after), None
+        apply_ops(items, edit.ops)
+        return edit, items, edit.ops
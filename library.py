@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+
+from storage import read_script, script_paths, write_json_atomic
+
+# 脚本库：配置目录中保存多个脚本，索引文件记录每个脚本的名称、步数、修改时间和校验和，
+# 列出脚本只读索引，脚本内容在打开或运行时才加载
+LIBRARY_FILE = "library.json"
+LIBRARY_VERSION = 1
+DEFAULT_SCRIPT = "items"
+
+# 配置目录中不属于脚本的 JSON 文件
+RESERVED_NAMES = {"settings", "library"}
+
+INVALID_NAME = re.compile(r'[\\/:*?"<>|]')
+
+
+def validate_script_name(name):
+    name = name.strip()
+    if not name or INVALID_NAME.search(name) or name.startswith(".") or name in RESERVED_NAMES \
+            or name.endswith(".snapshot"):
+        raise ValueError(f"无效的脚本名称：{name}")
+    return name
+
+
+class ScriptLibrary:
+    """
+    配置目录中的脚本库。脚本 name 的文件为 {config_dir}/{name}.json（或日志格式的快照和日志），
+    默认脚本 items 即原来的 items.json。
+    """
+
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+        self.index_path = os.path.join(config_dir, LIBRARY_FILE)
+        self.entries = {}  # name -> {"steps", "mtime", "checksum"}
+        self.load_index()
+
+    def base(self, name):
+        return os.path.join(self.config_dir, name)
+
+    def load_index(self):
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if isinstance(index, dict) and index.get("version") == LIBRARY_VERSION \
+                        and isinstance(index.get("scripts"), dict):
+                    self.entries = index["scripts"]
+            except (OSError, ValueError):
+                # 索引损坏时重新扫描目录生成
+                self.entries = {}
+
+    def save_index(self):
+        write_json_atomic(self.index_path, {"version": LIBRARY_VERSION, "scripts": self.entries})
+
+    def file_state(self, name):
+        """
+        返回脚本文件的 (最新修改时间, 校验和)，没有任何文件时返回 (None, None)。
+        """
+        digest = hashlib.sha1()
+        mtime = None
+        for path in script_paths(self.base(name)):
+            if os.path.exists(path):
+                mtime = max(mtime or 0, os.path.getmtime(path))
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        if mtime is None:
+            return None, None
+        return mtime, digest.hexdigest()
+
+    def latest_mtime(self, name):
+        mtimes = [os.path.getmtime(path) for path in script_paths(self.base(name)) if os.path.exists(path)]
+        return max(mtimes) if mtimes else None
+
+    def scan(self):
+        """
+        同步索引与目录内容：只 stat 文件，修改时间与索引不一致（或不在索引中）的脚本才读取内容。
+        """
+        names = set()
+        for filename in os.listdir(self.config_dir):
+            for suffix in (".snapshot.json", ".journal", ".json"):
+                if filename.endswith(suffix):
+                    name = filename[:-len(suffix)]
+                    if name not in RESERVED_NAMES:
+                        names.add(name)
+                    break
+        changed = False
+        for name in list(self.entries):
+            if name not in names:
+                del self.entries[name]
+                changed = True
+        for name in names:
+            entry = self.entries.get(name)
+            if entry is None or entry.get("mtime") != self.latest_mtime(name):
+                try:
+                    self.update_entry(name, save=False)
+                except (OSError, ValueError, TypeError, KeyError):
+                    # 不是脚本的 JSON 文件（例如其它程序的配置）或已损坏的脚本：跳过，不影响其它脚本
+                    continue
+                changed = True
+        if changed:
+            self.save_index()
+
+    def update_entry(self, name, steps=None, save=True):
+        """
+        更新索引中的一个脚本；已知步数时传入 steps，避免重新读取脚本内容。
+        """
+        mtime, checksum = self.file_state(name)
+        if mtime is None:
+            self.entries.pop(name, None)
+        else:
+            if steps is None:
+                steps = len(read_script(self.base(name)))
+            self.entries[name] = {"steps": steps, "mtime": mtime, "checksum": checksum}
+        if save:
+            self.save_index()
+
+    def names(self):
+        return sorted(self.entries)
+
+    def create(self, name):
+        name = validate_script_name(name)
+        if name in self.entries:
+            raise ValueError(f"脚本已存在：{name}")
+        write_json_atomic(f"{self.base(name)}.json", [])
+        self.update_entry(name, steps=0)
+        return name
+
+    def delete(self, name):
+        for path in script_paths(self.base(name)):
+            if os.path.exists(path):
+                os.remove(path)
+        self.entries.pop(name, None)
+        self.save_index()
@@ -1,35 +1,90 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog
+from tkinter import messagebox, filedialog, simpledialog
 from tkinter import ttk
+import copy
 import json
 import os
-import pyautogui  # 确保已安装：pip install pyautogui
+import queue
 import threading
 import time
-from PIL import ImageGrab  # 确保已安装：pip install pillow
 
-# 默认配置文件目录
-DEFAULT_CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".tkinter_app")
-SETTINGS_FILE = "settings.json"
-ITEMS_FILE = "items.json"
+# pyautogui、PIL、numpy 等较重的依赖都在第一次用到时才导入，界面启动不加载它们
+from backends import PyAutoGUIBackend
+from bulk import edit_ops, move_ops, move_target, moved_range
+from history import History, first_index
+from library import DEFAULT_SCRIPT, ScriptLibrary
+from plan import (DEFAULT_TEMPLATE_THRESHOLD, FLOW_ANCHOR, FLOW_END_REPEAT, FLOW_JUMP, FLOW_JUMP_IF, FLOW_JUMP_UNLESS,
+                  FLOW_LABEL, FLOW_REPEAT, MOTION_DURATION, MOTION_SPEED, MOTION_TELEPORT, compile_plan)
+from runner import ActionRunner, CAPTURE_FRAME, CAPTURE_PIXEL, CAPTURE_REGION
+from settings import DEFAULT_CONFIG_DIR, ITEMS_FILE, SETTINGS_FILE, new_control_token, read_settings
+from storage import FORMAT_JOURNAL, FORMAT_JSON, open_store, read_items_json, write_json_atomic
+from treeview import VirtualTreeview
+
+# 界面每隔 EVENT_POLL_MS 毫秒处理一次执行线程发来的事件，每次最多处理 EVENT_BATCH 条
+EVENT_POLL_MS = 50
+EVENT_BATCH = 500
+# 运行日志最多保留的行数
+RUN_LOG_LINES = 1000
+
+# 移动方式的显示名称，None 表示使用运行选项中的全局设置
+MOTION_LABELS = {
+    None: "默认",
+    MOTION_TELEPORT: "瞬移",
+    MOTION_DURATION: "固定时长（秒）",
+    MOTION_SPEED: "按速度（像素/秒）",
+}
+
+# 步骤类型的显示名称，None 为普通步骤
+FLOW_LABELS = {
+    None: "普通步骤",
+    FLOW_LABEL: "标签",
+    FLOW_JUMP: "跳转到标签",
+    FLOW_JUMP_IF: "颜色一致时跳转",
+    FLOW_JUMP_UNLESS: "颜色不一致时跳转",
+    FLOW_REPEAT: "重复开始",
+    FLOW_END_REPEAT: "重复结束",
+    FLOW_ANCHOR: "锚点（定位窗口）",
+}
 
 class TkinterApp:
     def __init__(self, root):
         self.root = root
         self.root.title("增强的 Tkinter 示例界面")
-        self.root.geometry("1400x700")  # 扩大窗口大小以适应Treeview
+        self.root.geometry("1400x820")  # 扩大窗口大小以适应Treeview
 
         # 配置目录和文件路径
         self.config_dir = DEFAULT_CONFIG_DIR
         self.settings_path = os.path.join(self.config_dir, SETTINGS_FILE)
+        self.current_script = DEFAULT_SCRIPT
         self.items_path = os.path.join(self.config_dir, ITEMS_FILE)
+        self.library = None
 
         # 数据结构：items 是一个列表，每个项目是一个字典，包含 'coordinates', 'color', 'judge_color', 'click', 'delay', 'delay_time', 'remarks'
         self.items = []
+        # 撤销/重做：列表项加入后不再原地修改，所有修改都通过 apply_edit 以编辑操作的形式进行
+        self.history = History()
 
-        # 运行控制
+        # 运行控制：执行循环由 ActionRunner 负责，它在执行线程中发出的事件放入队列，由界面线程定时批量处理
         self.running = False
-        self.stop_event = threading.Event()
+        self.events = queue.Queue()
+        self.steps_per_pass = 0
+        # 最近一次运行的统计和逐步耗时记录，供运行报告查看和导出
+        self.last_stats = None
+        self.last_timings = None
+        self.recorder = None
+        self.input_backend = PyAutoGUIBackend()
+        self.runner = ActionRunner(self.input_backend, on_event=self.on_runner_event)
+        self.hotkeys = None
+
+        # 存储：整份 JSON 或快照 + 追加日志，都在后台线程写盘，不阻塞界面
+        self.storage_format = FORMAT_JSON
+        self.store = None
+        # 本地控制接口（见 control.py），设置文件中有 control_port 或 control_socket 时启动
+        self.control = None
+        self.control_port = None
+        self.control_socket = None
+        self.control_token = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # 加载设置
         self.load_settings()
@@ -37,15 +92,41 @@ class TkinterApp:
         # 创建主界面
         self.create_widgets()
 
-        # 加载列表项
+        # 加载脚本库和当前脚本的列表项
+        self.load_library()
         self.load_items()
 
-        # 绑定按键F3用于停止（已移除）
-        # self.root.bind('<F3>', self.stop_actions)
-        # self.root.bind('<f3>', self.stop_actions)
+        self.root.after(EVENT_POLL_MS, self.poll_runner_events)
+
+        if self.control_port is not None or self.control_socket:
+            self.start_control_server()
+
+        # F3 停止、F4 暂停/继续：优先注册全局热键（运行时焦点通常在其它窗口），同时绑定本窗口的按键
+        self.root.bind('<F3>', self.stop_actions)
+        self.root.bind('<F4>', self.toggle_pause_actions)
+        # 撤销、重做：Caps Lock 会改变 Z 的大小写，按是否按着 Shift 区分撤销（Ctrl+Z）和重做（Ctrl+Shift+Z）
+        self.root.bind('<Control-z>', self.undo_or_redo)
+        self.root.bind('<Control-Z>', self.undo_or_redo)
+        self.root.bind('<Control-y>', self.redo)
+        self.root.bind('<Control-Y>', self.redo)
+        self.start_hotkeys()
 
     def create_widgets(self):
         # 使用帧（Frame）来组织布局
+        # 底部：运行进度和运行日志（先放置，保证窗口缩小时仍可见）
+        bottom_frame = tk.Frame(self.root, padx=10, pady=5)
+        bottom_frame.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.progress_var = tk.StringVar(value="未运行")
+        progress_label = tk.Label(bottom_frame, textvariable=self.progress_var, anchor='w')
+        progress_label.pack(fill=tk.X)
+
+        log_scrollbar = tk.Scrollbar(bottom_frame)
+        log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.run_log = tk.Text(bottom_frame, height=6, state=tk.DISABLED, yscrollcommand=log_scrollbar.set)
+        self.run_log.pack(fill=tk.X)
+        log_scrollbar.config(command=self.run_log.yview)
+
         left_frame = tk.Frame(self.root, width=400, height=700, padx=10, pady=10)
         left_frame.pack(side=tk.LEFT, fill=tk.Y)
 
@@ -60,14 +141,66 @@ class TkinterApp:
         button_get_my_coords = tk.Button(left_frame, text="获取我的坐标", command=self.get_my_coordinates)
         button_get_my_coords.pack(pady=10, fill=tk.X)
 
+        # 录制：在其它窗口中操作鼠标，停止后把点击和移动轨迹批量加入列表
+        record_frame = tk.Frame(left_frame)
+        record_frame.pack(pady=10, fill=tk.X)
+        self.button_record = tk.Button(record_frame, text="录制", command=self.toggle_recording)
+        self.button_record.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.record_moves_var = tk.BooleanVar(value=True)
+        cb_record_moves = tk.Checkbutton(record_frame, text="记录移动轨迹", variable=self.record_moves_var)
+        cb_record_moves.pack(side=tk.LEFT)
+
         # 新增“运行”按钮
         self.button_run = tk.Button(left_frame, text="运行", command=self.run_actions)
         self.button_run.pack(pady=10, fill=tk.X)
 
+        # 暂停/继续和停止（F4 / F3）
+        control_frame = tk.Frame(left_frame)
+        control_frame.pack(fill=tk.X)
+        self.button_pause = tk.Button(control_frame, text="暂停 (F4)", command=self.toggle_pause_actions)
+        self.button_pause.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        button_stop = tk.Button(control_frame, text="停止 (F3)", command=self.stop_actions)
+        button_stop.pack(side=tk.LEFT, expand=True, fill=tk.X)
+
+        # 运行报告：逐步耗时汇总和导出
+        button_report = tk.Button(left_frame, text="运行报告", command=self.show_run_report)
+        button_report.pack(pady=10, fill=tk.X)
+
+        # 本地控制接口：其它程序通过 HTTP 排队运行脚本、停止和查询进度
+        self.control_var = tk.BooleanVar()
+        cb_control = tk.Checkbutton(left_frame, text="本地控制接口", variable=self.control_var, command=self.toggle_control_server)
+        cb_control.pack(pady=5, anchor='w')
+
         # 设置配置目录按钮
         button_set_dir = tk.Button(left_frame, text="设置配置文件目录", command=self.set_config_directory)
         button_set_dir.pack(pady=10, fill=tk.X)
 
+        # 脚本库：双击打开脚本
+        library_label = tk.Label(left_frame, text="脚本库")
+        library_label.pack(pady=(10, 0), anchor='w')
+        self.script_listbox = tk.Listbox(left_frame, height=8, exportselection=False)
+        self.script_listbox.pack(pady=5, fill=tk.X)
+        self.script_listbox.bind('<Double-1>', self.on_script_double_click)
+
+        library_buttons = tk.Frame(left_frame)
+        library_buttons.pack(fill=tk.X)
+        button_new_script = tk.Button(library_buttons, text="新建脚本", command=self.new_script)
+        button_new_script.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        button_delete_script = tk.Button(library_buttons, text="删除脚本", command=self.delete_script)
+        button_delete_script.pack(side=tk.LEFT, expand=True, fill=tk.X)
+
+        # 存储格式
+        self.journal_var = tk.BooleanVar(value=self.storage_format == FORMAT_JOURNAL)
+        cb_journal = tk.Checkbutton(left_frame, text="日志格式保存（适合大型脚本）", variable=self.journal_var, command=self.toggle_storage_format)
+        cb_journal.pack(pady=10, anchor='w')
+
+        # 导入、导出 items.json
+        button_import = tk.Button(left_frame, text="导入列表（JSON）", command=self.import_items)
+        button_import.pack(pady=10, fill=tk.X)
+
+        button_export = tk.Button(left_frame, text="导出列表（JSON）", command=self.export_items)
+        button_export.pack(pady=10, fill=tk.X)
+
         # 保存配置文件按钮
         button_save_config = tk.Button(left_frame, text="保存配置文件", command=self.save_all)
         button_save_config.pack(pady=10, fill=tk.X)
@@ -81,11 +214,11 @@ class TkinterApp:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # 创建Treeview
-        self.tree = ttk.Treeview(right_frame, columns=("Coordinates", "RGB Color", "Judge Color", "Click", "Delay", "Delay Time", "Remarks"), show='headings', yscrollcommand=scrollbar.set)
+        self.tree = ttk.Treeview(right_frame, columns=("Coordinates", "RGB Color", "Judge Color", "Click", "Delay", "Delay Time", "Remarks"), show='headings')
         self.tree.pack(fill=tk.BOTH, expand=True)
 
-        # 配置滚动条
-        scrollbar.config(command=self.tree.yview)
+        # 虚拟列表：只创建可见的行，由它配置滚动条
+        self.treeview = VirtualTreeview(self.tree, scrollbar, lambda: self.items)
 
         # 定义列
         self.tree.heading("Coordinates", text="坐标")
@@ -106,6 +239,8 @@ class TkinterApp:
 
         # 绑定双击事件
         self.tree.bind('<Double-1>', self.on_tree_double_click)
+        # 拖放排序：选中的行可以一次拖到任意位置
+        self.treeview.enable_drag(self.drop_items)
 
         # 添加、删除、复制、上移和下移按钮
         button_add = tk.Button(right_frame, text="新增一行", command=self.add_item)
@@ -117,6 +252,9 @@ class TkinterApp:
         button_copy = tk.Button(right_frame, text="复制一行", command=self.copy_item)
         button_copy.pack(pady=5, fill=tk.X)
 
+        button_batch = tk.Button(right_frame, text="批量修改", command=self.batch_edit_items)
+        button_batch.pack(pady=5, fill=tk.X)
+
         # 上移和下移按钮
         button_move_up = tk.Button(right_frame, text="上移", command=self.move_up)
         button_move_up.pack(pady=5, fill=tk.X)
@@ -124,18 +262,72 @@ class TkinterApp:
         button_move_down = tk.Button(right_frame, text="下移", command=self.move_down)
         button_move_down.pack(pady=5, fill=tk.X)
 
+        # 撤销和重做
+        history_buttons = tk.Frame(right_frame)
+        history_buttons.pack(pady=5, fill=tk.X)
+        self.button_undo = tk.Button(history_buttons, text="撤销 (Ctrl+Z)", command=self.undo, state=tk.DISABLED)
+        self.button_undo.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.button_redo = tk.Button(history_buttons, text="重做 (Ctrl+Y)", command=self.redo, state=tk.DISABLED)
+        self.button_redo.pack(side=tk.LEFT, expand=True, fill=tk.X)
+
     def get_my_coordinates(self):
         # 点击按钮后，等待5秒，获取鼠标位置和颜色，并自动新增到列表
         messagebox.showinfo("提示", "请在5秒内将鼠标移动到目标位置...")
         self.root.after(5000, self.retrieve_my_coordinates)
 
+    def toggle_recording(self):
+        if self.recorder is None:
+            if self.running:
+                messagebox.showwarning("警告", "脚本正在运行中。")
+                return
+            from recorder import Recorder
+            self.recorder = Recorder(self.input_backend)
+            try:
+                self.recorder.start()
+            except Exception as e:
+                self.recorder = None
+                messagebox.showerror("错误", f"无法开始录制: {e}")
+                return
+            self.button_record.config(text="停止录制")
+            self.update_recording_status()
+            return
+
+        from recorder import build_items
+
+        recorder, self.recorder = self.recorder, None
+        events = recorder.stop()
+        self.button_record.config(text="录制")
+
+        # 本窗口内的点击（包括“停止录制”按钮本身）不记录
+        left, top = self.root.winfo_rootx(), self.root.winfo_rooty()
+        right, bottom = left + self.root.winfo_width(), top + self.root.winfo_height()
+        new_items = build_items(events, record_moves=self.record_moves_var.get(),
+                                exclude=lambda x, y: left <= x < right and top <= y < bottom)
+        if not new_items:
+            self.progress_var.set("录制结束：没有记录到点击")
+            return
+
+        # 一次性加入列表：只刷新一次、保存一次
+        start = len(self.items)
+        self.apply_edit([("insert", start + offset, item) for offset, item in enumerate(new_items)], "录制",
+                        see=start + len(new_items) - 1)
+        self.progress_var.set(f"录制结束：新增 {len(new_items)} 项（采样 {len(events)} 次）")
+
+    def update_recording_status(self):
+        recorder = self.recorder
+        if recorder is None:
+            return
+        self.progress_var.set(f"录制中：已记录点击 {recorder.clicks} 次，采样 {recorder.events.count} 次。"
+                              "完成后回到本窗口点击“停止录制”")
+        self.root.after(200, self.update_recording_status)
+
     def retrieve_my_coordinates(self):
         # 获取鼠标位置
-        x, y = pyautogui.position()
+        x, y = self.input_backend.position()
 
         try:
             # 获取鼠标所在位置的颜色
-            color = pyautogui.pixel(x, y)
+            color = self.input_backend.pixel(x, y)
         except Exception as e:
             messagebox.showerror("错误", f"获取颜色失败: {e}")
             return
@@ -150,16 +342,54 @@ class TkinterApp:
             "delay_time": 0,      # 默认值
             "remarks": ""         # 默认值
         }
-        self.items.append(new_item)
-        self.update_treeview_display()
-        self.save_items()
+        self.apply_edit([("insert", len(self.items), new_item)], "获取坐标", see=len(self.items))
         messagebox.showinfo("成功", f"已将坐标 ({x}, {y}) 和颜色 {color} 添加到列表中。")
 
+    def capture_item_signature(self, popup, x, y, signature, signature_label, radius=1):
+        # 暂时隐藏对话框，避免遮挡目标位置，再采集周围像素
+        popup.withdraw()
+
+        def capture():
+            try:
+                from capture import capture_signature
+                signature["value"] = capture_signature(self.runner.backend, x, y, radius)
+                signature_label.config(text=f"特征像素：{len(signature['value'])}")
+            except Exception as e:
+                messagebox.showerror("错误", f"采集特征失败: {e}", parent=popup)
+            finally:
+                popup.deiconify()
+
+        popup.after(300, capture)
+
+    def capture_item_template(self, popup, x, y, template_entry, size=40):
+        # 暂时隐藏对话框，截取坐标周围 size x size 的图片保存到配置目录的 templates 下
+        popup.withdraw()
+
+        def capture():
+            try:
+                from PIL import Image  # 确保已安装：pip install pillow
+
+                half = size // 2
+                frame = self.runner.backend.grab((x - half, y - half, x - half + size, y - half + size))
+                template_dir = os.path.join(self.config_dir, "templates")
+                if not os.path.exists(template_dir):
+                    os.makedirs(template_dir)
+                filename = f"template_{int(time.time() * 1000)}.png"
+                Image.fromarray(frame.array).save(os.path.join(template_dir, filename))
+                template_entry.delete(0, tk.END)
+                template_entry.insert(0, f"templates/{filename}")
+            except Exception as e:
+                messagebox.showerror("错误", f"截取模板失败: {e}", parent=popup)
+            finally:
+                popup.deiconify()
+
+        popup.after(300, capture)
+
     def add_item(self):
         # 弹出输入对话框，获取用户输入
         popup = tk.Toplevel(self.root)
         popup.title("新增项目")
-        popup.geometry("400x550")
+        popup.geometry("420x970")
         popup.grab_set()  # 模态窗口
 
         # 坐标输入
@@ -207,6 +437,18 @@ class TkinterApp:
         cb_click = tk.Checkbutton(popup, text="是否点击", variable=click_var)
         cb_click.pack(pady=5)
 
+        # 不点击时只移动鼠标
+        move_var = tk.BooleanVar()
+        cb_move = tk.Checkbutton(popup, text="不点击时只移动鼠标", variable=move_var)
+        cb_move.pack(pady=5)
+
+        # 坐标相对于上方最近的锚点（新项目追加在末尾）
+        relative_var = tk.BooleanVar()
+        cb_relative = tk.Checkbutton(popup, text="坐标相对于上方的锚点", variable=relative_var,
+                                     command=lambda: self.toggle_relative(relative_var, x_entry, y_entry,
+                                                                          len(self.items)))
+        cb_relative.pack(pady=5)
+
         # 是否延时
         delay_var = tk.BooleanVar()
         cb_delay = tk.Checkbutton(popup, text="是否延时", variable=delay_var)
@@ -218,6 +460,101 @@ class TkinterApp:
         delay_time_entry = tk.Entry(popup)
         delay_time_entry.pack(pady=5)
 
+        # 移动方式（默认使用运行选项中的设置）
+        motion_label = tk.Label(popup, text="移动方式：")
+        motion_label.pack(pady=5)
+        motion_frame = tk.Frame(popup)
+        motion_frame.pack(pady=5)
+        motion_var = tk.StringVar(value=MOTION_LABELS[None])
+        motion_menu = tk.OptionMenu(motion_frame, motion_var, *MOTION_LABELS.values())
+        motion_menu.grid(row=0, column=0, padx=5)
+        motion_value_entry = tk.Entry(motion_frame, width=10)
+        motion_value_entry.grid(row=0, column=1, padx=5)
+
+        # 颜色容差和特征像素
+        match_frame = tk.Frame(popup)
+        match_frame.pack(pady=5)
+        tolerance_label = tk.Label(match_frame, text="颜色容差：")
+        tolerance_label.grid(row=0, column=0, padx=5)
+        tolerance_entry = tk.Entry(match_frame, width=6)
+        tolerance_entry.grid(row=0, column=1, padx=5)
+        tolerance_entry.insert(0, str(0))
+        signature = {"value": None}
+        signature_label = tk.Label(match_frame, text=f"特征像素：{len(signature['value'] or [])}")
+        signature_label.grid(row=0, column=2, padx=5)
+
+        def capture_signature():
+            position = self.screen_position(popup, x_entry, y_entry, relative_var, len(self.items))
+            if position is not None:
+                x, y = position
+                self.capture_item_signature(popup, x, y, signature, signature_label)
+
+        def clear_signature():
+            signature["value"] = None
+            signature_label.config(text="特征像素：0")
+
+        button_capture_signature = tk.Button(match_frame, text="采集周围像素", command=capture_signature)
+        button_capture_signature.grid(row=1, column=0, columnspan=2, padx=5, pady=2)
+        button_clear_signature = tk.Button(match_frame, text="清除特征", command=clear_signature)
+        button_clear_signature.grid(row=1, column=2, padx=5, pady=2)
+
+        # 等待颜色出现（超时后跳过）
+        wait_frame = tk.Frame(popup)
+        wait_frame.pack(pady=5)
+        wait_color_var = tk.BooleanVar(value=False)
+        cb_wait_color = tk.Checkbutton(wait_frame, text="等待颜色出现，超时（秒）：", variable=wait_color_var)
+        cb_wait_color.grid(row=0, column=0)
+        wait_timeout_entry = tk.Entry(wait_frame, width=8)
+        wait_timeout_entry.grid(row=0, column=1, padx=5)
+        wait_timeout_entry.insert(0, str(10))
+
+        # 模板查找：在坐标周围查找图片并点击匹配位置（填写后不再判断颜色）
+        template_frame = tk.Frame(popup)
+        template_frame.pack(pady=5)
+        template_label = tk.Label(template_frame, text="模板图片：")
+        template_label.grid(row=0, column=0)
+        template_entry = tk.Entry(template_frame, width=20)
+        template_entry.grid(row=0, column=1, columnspan=2, padx=5)
+        template_entry.insert(0, "")
+
+        def browse_template():
+            path = filedialog.askopenfilename(title="选择模板图片", filetypes=[("图片", "*.png *.bmp *.jpg")], parent=popup)
+            if path:
+                template_entry.delete(0, tk.END)
+                template_entry.insert(0, path)
+
+        def capture_template():
+            position = self.screen_position(popup, x_entry, y_entry, relative_var, len(self.items))
+            if position is not None:
+                x, y = position
+                self.capture_item_template(popup, x, y, template_entry)
+
+        button_browse_template = tk.Button(template_frame, text="浏览", command=browse_template)
+        button_browse_template.grid(row=0, column=3)
+        button_capture_template = tk.Button(template_frame, text="截取坐标周围", command=capture_template)
+        button_capture_template.grid(row=1, column=0, pady=2)
+        threshold_label = tk.Label(template_frame, text="相似度：")
+        threshold_label.grid(row=1, column=1)
+        threshold_entry = tk.Entry(template_frame, width=6)
+        threshold_entry.grid(row=1, column=2)
+        threshold_entry.insert(0, str(DEFAULT_TEMPLATE_THRESHOLD))
+
+        # 流程控制：步骤类型、标签名（标签和跳转目标）、重复次数
+        flow_frame = tk.Frame(popup)
+        flow_frame.pack(pady=5)
+        flow_var = tk.StringVar(value=FLOW_LABELS[None])
+        flow_menu = tk.OptionMenu(flow_frame, flow_var, *FLOW_LABELS.values())
+        flow_menu.grid(row=0, column=0, columnspan=4)
+        flow_label_label = tk.Label(flow_frame, text="标签：")
+        flow_label_label.grid(row=1, column=0)
+        flow_label_entry = tk.Entry(flow_frame, width=12)
+        flow_label_entry.grid(row=1, column=1)
+        repeat_count_label = tk.Label(flow_frame, text="重复次数：")
+        repeat_count_label.grid(row=1, column=2)
+        repeat_count_entry = tk.Entry(flow_frame, width=6)
+        repeat_count_entry.grid(row=1, column=3)
+        repeat_count_entry.insert(0, "1")
+
         # 备注输入框
         remarks_label = tk.Label(popup, text="备注：")
         remarks_label.pack(pady=5)
@@ -226,9 +563,27 @@ class TkinterApp:
 
         # 增加到列表按钮
         def add_to_list():
+            # 获取步骤类型；标签、跳转和重复步骤可以不填坐标
+            flow = next(flow for flow, label in FLOW_LABELS.items() if label == flow_var.get())
+            flow_label = flow_label_entry.get().strip()
+            repeat_count = 1
+            if flow in (FLOW_LABEL, FLOW_JUMP, FLOW_JUMP_IF, FLOW_JUMP_UNLESS) and not flow_label:
+                messagebox.showerror("错误", "标签和跳转步骤必须填写标签名。")
+                return
+            if flow == FLOW_REPEAT:
+                try:
+                    repeat_count = int(repeat_count_entry.get().strip())
+                    if repeat_count < 0:
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", "重复次数必须是非负整数。")
+                    return
+
             # 获取坐标
             x = x_entry.get().strip()
             y = y_entry.get().strip()
+            if not x and not y and flow in (FLOW_LABEL, FLOW_JUMP, FLOW_REPEAT, FLOW_END_REPEAT):
+                x, y = "0", "0"
             if not x or not y:
                 messagebox.showerror("错误", "坐标X和Y不能为空。")
                 return
@@ -280,6 +635,54 @@ class TkinterApp:
             else:
                 delay_time = 0
 
+            # 获取移动方式
+            motion = next(mode for mode, label in MOTION_LABELS.items() if label == motion_var.get())
+            motion_value = 0
+            if motion in (MOTION_DURATION, MOTION_SPEED):
+                try:
+                    motion_value = float(motion_value_entry.get().strip())
+                    if motion_value < 0 or (motion == MOTION_SPEED and motion_value == 0):
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", "移动时长必须是非负数字，移动速度必须是正数。")
+                    return
+
+            # 获取颜色容差
+            try:
+                tolerance = float(tolerance_entry.get().strip() or 0)
+                if tolerance < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "颜色容差必须是非负数字。")
+                return
+
+            # 获取等待超时
+            wait_timeout = 0
+            if wait_color_var.get():
+                try:
+                    wait_timeout = float(wait_timeout_entry.get().strip())
+                    if wait_timeout <= 0:
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", "等待超时必须是正数。")
+                    return
+
+            # 获取模板
+            template = template_entry.get().strip() or None
+            try:
+                template_threshold = float(threshold_entry.get().strip() or DEFAULT_TEMPLATE_THRESHOLD)
+                if not 0 < template_threshold <= 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "相似度必须是 0 到 1 之间的数字。")
+                return
+
+            # 锚点需要能定位；锚点本身的坐标总是屏幕坐标
+            if flow == FLOW_ANCHOR and not template and not (color and judge_color):
+                messagebox.showerror("错误", "锚点需要设置颜色（特征）或模板。")
+                return
+            relative = relative_var.get() and flow != FLOW_ANCHOR
+
             # 获取备注
             remarks = remarks_entry.get().strip()
 
@@ -289,13 +692,24 @@ class TkinterApp:
                 "color": color,
                 "judge_color": judge_color,
                 "click": click_var.get(),
+                "move": move_var.get(),
                 "delay": delay_var.get(),
                 "delay_time": delay_time,
+                "motion": motion,
+                "motion_value": motion_value,
+                "tolerance": tolerance,
+                "signature": signature["value"],
+                "wait_color": wait_color_var.get(),
+                "wait_timeout": wait_timeout,
+                "template": template,
+                "template_threshold": template_threshold,
+                "flow": flow,
+                "label": flow_label,
+                "repeat_count": repeat_count,
+                "relative": relative,
                 "remarks": remarks
             }
-            self.items.append(new_item)
-            self.update_treeview_display()
-            self.save_items()
+            self.apply_edit([("insert", len(self.items), new_item)], "新增一行", see=len(self.items))
             popup.destroy()
             messagebox.showinfo("成功", "已将信息添加到列表中。")
 
@@ -308,41 +722,206 @@ class TkinterApp:
         button_cancel = tk.Button(popup, text="取消", command=cancel)
         button_cancel.pack(pady=5)
 
+    def anchor_origin(self, index):
+        """
+        返回第 index 项上方最近的锚点的坐标，没有锚点时返回 None。
+        """
+        for item in reversed(self.items[:index]):
+            if item.get('flow') == FLOW_ANCHOR:
+                return item['coordinates']
+        return None
+
+    def screen_position(self, popup, x_entry, y_entry, relative_var, index):
+        """
+        返回坐标框中的坐标对应的屏幕坐标（相对坐标加上锚点的坐标），用于采集特征和截取模板；
+        坐标无效或找不到锚点时提示并返回 None。
+        """
+        try:
+            x, y = int(x_entry.get()), int(y_entry.get())
+        except ValueError:
+            messagebox.showerror("错误", "请先填写整数坐标。", parent=popup)
+            return None
+        if relative_var.get():
+            origin = self.anchor_origin(index)
+            if origin is None:
+                messagebox.showerror("错误", "上方没有锚点，不能使用相对坐标。", parent=popup)
+                return None
+            x, y = x + origin[0], y + origin[1]
+        return x, y
+
+    def toggle_relative(self, relative_var, x_entry, y_entry, index):
+        """
+        勾选相对坐标时把坐标框中的屏幕坐标换算为相对于锚点的偏移，取消勾选时换算回屏幕坐标。
+        """
+        origin = self.anchor_origin(index)
+        if origin is None:
+            relative_var.set(False)
+            messagebox.showerror("错误", "上方没有锚点，不能使用相对坐标。")
+            return
+        try:
+            x = int(x_entry.get().strip())
+            y = int(y_entry.get().strip())
+        except ValueError:
+            return
+        sign = -1 if relative_var.get() else 1
+        x_entry.delete(0, tk.END)
+        x_entry.insert(0, str(x + sign * origin[0]))
+        y_entry.delete(0, tk.END)
+        y_entry.insert(0, str(y + sign * origin[1]))
+
     def delete_item(self):
-        selected_items = self.tree.selection()
-        if not selected_items:
+        selected_indices = self.treeview.selected_indices()
+        if not selected_indices:
             messagebox.showwarning("警告", "请先选择要删除的项目。")
             return
         # Collect indices and sort in reverse to prevent reindexing issues
-        indices = sorted([self.tree.index(item) for item in selected_items], reverse=True)
-        for index in indices:
-            del self.items[index]
-        self.update_treeview_display()
-        self.save_items()
+        indices = sorted(selected_indices, reverse=True)
+        self.apply_edit([("delete", index) for index in indices], f"删除 {len(indices)} 项")
 
     def copy_item(self):
-        selected_items = self.tree.selection()
-        if not selected_items:
+        selected_indices = self.treeview.selected_indices()
+        if not selected_indices:
             messagebox.showwarning("警告", "请先选择要复制的项目。")
             return
-        for item_id in selected_items:
-            index = self.tree.index(item_id)
-            item = self.items[index].copy()  # 深拷贝以避免引用问题
+        start = len(self.items)
+        ops = []
+        for offset, index in enumerate(selected_indices):
+            item = copy.deepcopy(self.items[index])  # 深拷贝：签名等嵌套列表不与原项目共享
             # Optionally, you can modify some fields like remarks to indicate it's a copy
             # item['remarks'] = item.get('remarks', '') + " (复制)"
-            self.items.append(item)
-        self.update_treeview_display()
-        self.save_items()
+            ops.append(("insert", start + offset, item))
+        self.apply_edit(ops, f"复制 {len(ops)} 项")
         messagebox.showinfo("成功", "已复制选中的项目到列表底部。")
 
+    def drop_items(self, indices, target):
+        # 拖放：选中的项目按原顺序移动到 target 之前，一次完成
+        ops = move_ops(indices, target)
+        if ops:
+            self.apply_edit(ops, f"移动 {len(indices)} 项", see=moved_range(indices, target)[0])
+
+    def batch_edit_items(self):
+        indices = self.treeview.selected_indices()
+        if not indices:
+            messagebox.showwarning("警告", "请先选择要修改的项目。")
+            return
+
+        popup = tk.Toplevel(self.root)
+        popup.title(f"批量修改（{len(indices)} 项）")
+        popup.geometry("380x520")
+        popup.grab_set()  # 模态窗口
+
+        # 坐标平移
+        shift_label = tk.Label(popup, text="坐标平移 (dx, dy)：")
+        shift_label.pack(pady=5)
+        shift_frame = tk.Frame(popup)
+        shift_frame.pack(pady=5)
+        dx_label = tk.Label(shift_frame, text="dx：")
+        dx_label.grid(row=0, column=0, padx=5, pady=5)
+        dx_entry = tk.Entry(shift_frame, width=10)
+        dx_entry.grid(row=0, column=1, padx=5, pady=5)
+        dx_entry.insert(0, "0")
+        dy_label = tk.Label(shift_frame, text="dy：")
+        dy_label.grid(row=0, column=2, padx=5, pady=5)
+        dy_entry = tk.Entry(shift_frame, width=10)
+        dy_entry.grid(row=0, column=3, padx=5, pady=5)
+        dy_entry.insert(0, "0")
+
+        # 是否点击、是否延时、是否判断颜色：不修改 / 是 / 否
+        choices = ("不修改", "是", "否")
+        flags_frame = tk.Frame(popup)
+        flags_frame.pack(pady=5)
+        flag_vars = {}
+        for row, (key, text) in enumerate((("click", "是否点击："), ("delay", "是否延时："), ("judge_color", "是否判断颜色："))):
+            flag_label = tk.Label(flags_frame, text=text)
+            flag_label.grid(row=row, column=0, padx=5, pady=5, sticky='e')
+            flag_vars[key] = tk.StringVar(value=choices[0])
+            flag_menu = ttk.Combobox(flags_frame, textvariable=flag_vars[key], values=choices, state="readonly", width=8)
+            flag_menu.grid(row=row, column=1, padx=5, pady=5)
+
+        delay_time_label = tk.Label(popup, text="延迟时间（秒，留空不修改）：")
+        delay_time_label.pack(pady=5)
+        delay_time_entry = tk.Entry(popup)
+        delay_time_entry.pack(pady=5)
+
+        # 备注查找替换
+        find_label = tk.Label(popup, text="备注中查找：")
+        find_label.pack(pady=5)
+        find_entry = tk.Entry(popup)
+        find_entry.pack(pady=5)
+        replace_label = tk.Label(popup, text="替换为：")
+        replace_label.pack(pady=5)
+        replace_entry = tk.Entry(popup)
+        replace_entry.pack(pady=5)
+
+        # 移动到指定行
+        move_label = tk.Label(popup, text=f"移动到第几行（1-{len(self.items)}，留空不移动）：")
+        move_label.pack(pady=5)
+        move_entry = tk.Entry(popup)
+        move_entry.pack(pady=5)
+
+        def apply_batch():
+            try:
+                dx = int(dx_entry.get().strip() or 0)
+                dy = int(dy_entry.get().strip() or 0)
+            except ValueError:
+                messagebox.showerror("错误", "dx 和 dy 必须是整数。")
+                return
+
+            fields = {key: var.get() == "是" for key, var in flag_vars.items() if var.get() != choices[0]}
+            delay_time = delay_time_entry.get().strip()
+            if delay_time:
+                try:
+                    delay_time = float(delay_time)
+                    if delay_time < 0:
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", "延迟时间必须是非负数。")
+                    return
+                fields["delay_time"] = delay_time
+
+            position = move_entry.get().strip()
+            if position:
+                try:
+                    position = int(position)
+                    if not 1 <= position <= len(self.items):
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", f"行号必须是 1 到 {len(self.items)} 之间的整数。")
+                    return
+
+            # 先修改内容再移动，整批作为一次修改：一条撤销记录、一次刷新、一次保存
+            ops = edit_ops(self.items, indices, dx, dy, fields, find_entry.get(), replace_entry.get())
+            see = indices[0]
+            if position:
+                # 选中项移动后从第 position 行开始
+                target = move_target(indices, position - 1, len(self.items))
+                ops += move_ops(indices, target)
+                see = moved_range(indices, target)[0]
+            popup.destroy()
+            if not ops:
+                messagebox.showinfo("提示", "没有需要修改的项目。")
+                return
+            self.apply_edit(ops, f"批量修改 {len(indices)} 项", see=see)
+
+        button_apply = tk.Button(popup, text="应用", command=apply_batch)
+        button_apply.pack(pady=10)
+
+        button_cancel = tk.Button(popup, text="取消", command=popup.destroy)
+        button_cancel.pack(pady=5)
+
     def set_config_directory(self):
         # 弹出目录选择对话框
         new_dir = filedialog.askdirectory(title="选择配置文件目录")
         if new_dir:
+            self.close_current_script()
             self.config_dir = new_dir
             self.settings_path = os.path.join(self.config_dir, SETTINGS_FILE)
+            self.current_script = DEFAULT_SCRIPT
             self.items_path = os.path.join(self.config_dir, ITEMS_FILE)
             self.save_settings()
+            if self.control is not None:
+                self.control.config_dir = self.config_dir
+            self.load_library()
             self.load_items()
             messagebox.showinfo("成功", f"配置文件目录已设置为：{self.config_dir}")
 
@@ -350,10 +929,14 @@ class TkinterApp:
         # 如果设置文件存在，则加载配置目录
         if os.path.exists(self.settings_path):
             try:
-                with open(self.settings_path, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+                settings = read_settings(self.settings_path)
                 self.config_dir = settings.get("config_dir", DEFAULT_CONFIG_DIR)
-                self.items_path = os.path.join(self.config_dir, ITEMS_FILE)
+                self.storage_format = settings.get("storage_format", FORMAT_JSON)
+                self.current_script = settings.get("current_script", DEFAULT_SCRIPT)
+                self.control_port = settings.get("control_port")
+                self.control_socket = settings.get("control_socket")
+                self.control_token = settings.get("control_token")
+                self.items_path = os.path.join(self.config_dir, f"{self.current_script}.json")
             except Exception as e:
                 messagebox.showerror("错误", f"加载设置失败: {e}")
                 self.config_dir = DEFAULT_CONFIG_DIR
@@ -367,54 +950,178 @@ class TkinterApp:
     def save_settings(self):
         # 保存配置目录到设置文件
         settings = {
-            "config_dir": self.config_dir
+            "config_dir": self.config_dir,
+            "storage_format": self.storage_format,
+            "current_script": self.current_script
         }
+        if self.control_port is not None:
+            settings["control_port"] = self.control_port
+        if self.control_socket:
+            settings["control_socket"] = self.control_socket
+        if self.control_token:
+            settings["control_token"] = self.control_token
         try:
             with open(self.settings_path, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=4)
         except Exception as e:
             messagebox.showerror("错误", f"保存设置失败: {e}")
 
+    def load_library(self):
+        # 扫描配置目录中的脚本库，只读取有变化的脚本
+        if not os.path.exists(self.config_dir):
+            os.makedirs(self.config_dir)
+        self.library = ScriptLibrary(self.config_dir)
+        try:
+            self.library.scan()
+        except Exception as e:
+            messagebox.showerror("错误", f"加载脚本库失败: {e}")
+        self.update_script_list()
+
+    def update_script_list(self):
+        self.script_listbox.delete(0, tk.END)
+        for name in self.library.names():
+            steps = self.library.entries[name]["steps"]
+            self.script_listbox.insert(tk.END, f"{name}（{steps} 步）")
+            if name == self.current_script:
+                self.script_listbox.selection_set(tk.END)
+
+    def close_current_script(self):
+        # 写完当前脚本并更新索引中的步数、修改时间和校验和
+        if self.store is None:
+            return
+        self.store.close()
+        self.store = None
+        try:
+            self.library.update_entry(self.current_script, steps=len(self.items))
+        except Exception as e:
+            messagebox.showerror("错误", f"更新脚本库索引失败: {e}")
+
+    def open_script(self, name):
+        if name == self.current_script:
+            return
+        if self.running:
+            messagebox.showwarning("警告", "脚本正在运行中。")
+            return
+        self.close_current_script()
+        self.current_script = name
+        self.items_path = os.path.join(self.config_dir, f"{name}.json")
+        self.save_settings()
+        self.load_items()
+        self.update_script_list()
+
+    def on_script_double_click(self, event):
+        selection = self.script_listbox.curselection()
+        if selection:
+            self.open_script(self.library.names()[selection[0]])
+
+    def new_script(self):
+        name = simpledialog.askstring("新建脚本", "脚本名称：", parent=self.root)
+        if name is None:
+            return
+        try:
+            name = self.library.create(name)
+        except Exception as e:
+            messagebox.showerror("错误", f"新建脚本失败: {e}")
+            return
+        self.open_script(name)
+
+    def delete_script(self):
+        selection = self.script_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("警告", "请先选择要删除的脚本。")
+            return
+        name = self.library.names()[selection[0]]
+        if name == self.current_script:
+            messagebox.showwarning("警告", "不能删除当前打开的脚本。")
+            return
+        if not messagebox.askyesno("确认", f"确定删除脚本“{name}”吗？"):
+            return
+        try:
+            self.library.delete(name)
+        except Exception as e:
+            messagebox.showerror("错误", f"删除脚本失败: {e}")
+        self.update_script_list()
+
+    def open_items_store(self):
+        # 关闭旧的存储（写完待保存的修改），按当前目录和格式打开新的存储
+        if self.store is not None:
+            self.store.close()
+        base = os.path.splitext(self.items_path)[0]
+        self.store = open_store(base, self.storage_format, on_error=self.on_write_error)
+
     def load_items(self):
-        # 清空当前Treeview
-        self.tree.delete(*self.tree.get_children())
+        # 清空当前Treeview和撤销记录
+        self.items = []
+        self.treeview.reset()
+        self.history.clear()
+        self.update_history_buttons()
         # 如果配置目录不存在，则创建它
         if not os.path.exists(self.config_dir):
             os.makedirs(self.config_dir)
-        # 如果项目文件存在，则加载
-        if os.path.exists(self.items_path):
-            try:
-                with open(self.items_path, 'r', encoding='utf-8') as f:
-                    self.items = json.load(f)
-                for item in self.items:
-                    # 确保每个项目包含所有键
-                    if 'coordinates' not in item:
-                        item['coordinates'] = (0, 0)
-                    if 'color' not in item:
-                        item['color'] = None
-                    if 'judge_color' not in item:
-                        item['judge_color'] = True  # 默认为是
-                    if 'click' not in item:
-                        item['click'] = False
-                    if 'delay' not in item:
-                        item['delay'] = False
-                    if 'delay_time' not in item:
-                        item['delay_time'] = 0
-                    if 'remarks' not in item:
-                        item['remarks'] = ""
-                self.update_treeview_display()
-            except Exception as e:
-                messagebox.showerror("错误", f"加载项目列表失败: {e}")
-                self.items = []
-
-    def save_items(self):
-        # 保存到项目文件
+        self.open_items_store()
         try:
-            with open(self.items_path, 'w', encoding='utf-8') as f:
-                json.dump(self.items, f, ensure_ascii=False, indent=4)
+            self.items = self.store.load()
             self.update_treeview_display()
         except Exception as e:
-            messagebox.showerror("错误", f"保存项目列表失败: {e}")
+            messagebox.showerror("错误", f"加载项目列表失败: {e}")
+            self.items = []
+
+    def save_items(self, ops=None):
+        # 交给后台线程保存；ops 为本次修改的编辑操作（见 storage.apply_ops），None 表示整体保存
+        if ops is None:
+            self.store.replace(self.items)
+        else:
+            self.store.record(ops, self.items)
+
+    def toggle_storage_format(self):
+        # 切换存储格式，并把当前列表完整写入新格式
+        self.storage_format = FORMAT_JOURNAL if self.journal_var.get() else FORMAT_JSON
+        self.open_items_store()
+        self.save_items()
+        self.save_settings()
+
+    def import_items(self):
+        path = filedialog.askopenfilename(title="导入列表", filetypes=[("JSON 文件", "*.json")])
+        if not path:
+            return
+        try:
+            items = read_items_json(path)
+        except Exception as e:
+            messagebox.showerror("错误", f"导入列表失败: {e}")
+            return
+        self.history.replace(self.items, items, "导入列表")
+        self.items = items
+        self.treeview.reset()
+        self.save_items()
+        self.update_history_buttons()
+        messagebox.showinfo("成功", f"已导入 {len(self.items)} 个项目。")
+
+    def export_items(self):
+        path = filedialog.asksaveasfilename(title="导出列表", defaultextension=".json", initialfile=f"{self.current_script}.json", filetypes=[("JSON 文件", "*.json")])
+        if not path:
+            return
+        try:
+            write_json_atomic(path, self.items)
+        except Exception as e:
+            messagebox.showerror("错误", f"导出列表失败: {e}")
+            return
+        messagebox.showinfo("成功", f"列表已导出到：{path}")
+
+    def on_write_error(self, path, error):
+        # 在后台写盘线程中调用，转到界面线程提示
+        self.root.after(0, lambda: messagebox.showerror("错误", f"保存项目列表失败: {error}"))
+
+    def on_close(self):
+        # 退出前写完所有待保存的修改
+        self.runner.stop()
+        if self.hotkeys is not None:
+            self.hotkeys.stop()
+        if self.recorder is not None:
+            self.recorder.stop()
+        if self.control is not None:
+            self.control.close()
+        self.close_current_script()
+        self.root.destroy()
 
     def save_all(self):
         """
@@ -422,21 +1129,23 @@ class TkinterApp:
         """
         self.save_settings()
         self.save_items()
+        self.store.flush()
+        self.library.update_entry(self.current_script, steps=len(self.items))
+        self.update_script_list()
         messagebox.showinfo("保存成功", "配置文件和列表项已成功保存。")
 
     def on_tree_double_click(self, event):
         # 获取被点击的项
-        selected_item = self.tree.selection()
-        if not selected_item:
+        row_id = self.tree.identify_row(event.y)
+        if not row_id:
             return
-        item_id = selected_item[0]
-        index = self.tree.index(item_id)
+        index = self.treeview.first + self.tree.index(row_id)
         item = self.items[index]
 
         # 创建编辑窗口
         popup = tk.Toplevel(self.root)
         popup.title(f"编辑项目：{item['coordinates']}")
-        popup.geometry("400x600")
+        popup.geometry("420x1020")
         popup.grab_set()  # 模态窗口
 
         # 坐标输入（允许修改）
@@ -491,6 +1200,17 @@ class TkinterApp:
         cb_click = tk.Checkbutton(popup, text="是否点击", variable=click_var)
         cb_click.pack(pady=5)
 
+        # 不点击时只移动鼠标
+        move_var = tk.BooleanVar(value=item.get("move", False))
+        cb_move = tk.Checkbutton(popup, text="不点击时只移动鼠标", variable=move_var)
+        cb_move.pack(pady=5)
+
+        # 坐标相对于上方最近的锚点
+        relative_var = tk.BooleanVar(value=item.get("relative", False))
+        cb_relative = tk.Checkbutton(popup, text="坐标相对于上方的锚点", variable=relative_var,
+                                     command=lambda: self.toggle_relative(relative_var, x_entry, y_entry, index))
+        cb_relative.pack(pady=5)
+
         # 是否延时
         delay_var = tk.BooleanVar(value=item.get("delay", False))
         cb_delay = tk.Checkbutton(popup, text="是否延时", variable=delay_var)
@@ -503,6 +1223,104 @@ class TkinterApp:
         delay_time_entry.pack(pady=5)
         delay_time_entry.insert(0, str(item.get("delay_time", 0)))
 
+        # 移动方式（默认使用运行选项中的设置）
+        motion_label = tk.Label(popup, text="移动方式：")
+        motion_label.pack(pady=5)
+        motion_frame = tk.Frame(popup)
+        motion_frame.pack(pady=5)
+        motion_var = tk.StringVar(value=MOTION_LABELS.get(item.get('motion'), MOTION_LABELS[None]))
+        motion_menu = tk.OptionMenu(motion_frame, motion_var, *MOTION_LABELS.values())
+        motion_menu.grid(row=0, column=0, padx=5)
+        motion_value_entry = tk.Entry(motion_frame, width=10)
+        motion_value_entry.grid(row=0, column=1, padx=5)
+        if item.get('motion') in (MOTION_DURATION, MOTION_SPEED):
+            motion_value_entry.insert(0, str(item.get('motion_value', 0)))
+
+        # 颜色容差和特征像素
+        match_frame = tk.Frame(popup)
+        match_frame.pack(pady=5)
+        tolerance_label = tk.Label(match_frame, text="颜色容差：")
+        tolerance_label.grid(row=0, column=0, padx=5)
+        tolerance_entry = tk.Entry(match_frame, width=6)
+        tolerance_entry.grid(row=0, column=1, padx=5)
+        tolerance_entry.insert(0, str(item.get('tolerance', 0)))
+        signature = {"value": item.get('signature')}
+        signature_label = tk.Label(match_frame, text=f"特征像素：{len(signature['value'] or [])}")
+        signature_label.grid(row=0, column=2, padx=5)
+
+        def capture_signature():
+            position = self.screen_position(popup, x_entry, y_entry, relative_var, index)
+            if position is not None:
+                x, y = position
+                self.capture_item_signature(popup, x, y, signature, signature_label)
+
+        def clear_signature():
+            signature["value"] = None
+            signature_label.config(text="特征像素：0")
+
+        button_capture_signature = tk.Button(match_frame, text="采集周围像素", command=capture_signature)
+        button_capture_signature.grid(row=1, column=0, columnspan=2, padx=5, pady=2)
+        button_clear_signature = tk.Button(match_frame, text="清除特征", command=clear_signature)
+        button_clear_signature.grid(row=1, column=2, padx=5, pady=2)
+
+        # 等待颜色出现（超时后跳过）
+        wait_frame = tk.Frame(popup)
+        wait_frame.pack(pady=5)
+        wait_color_var = tk.BooleanVar(value=item.get('wait_color', False))
+        cb_wait_color = tk.Checkbutton(wait_frame, text="等待颜色出现，超时（秒）：", variable=wait_color_var)
+        cb_wait_color.grid(row=0, column=0)
+        wait_timeout_entry = tk.Entry(wait_frame, width=8)
+        wait_timeout_entry.grid(row=0, column=1, padx=5)
+        wait_timeout_entry.insert(0, str(item.get('wait_timeout', 10)))
+
+        # 模板查找：在坐标周围查找图片并点击匹配位置（填写后不再判断颜色）
+        template_frame = tk.Frame(popup)
+        template_frame.pack(pady=5)
+        template_label = tk.Label(template_frame, text="模板图片：")
+        template_label.grid(row=0, column=0)
+        template_entry = tk.Entry(template_frame, width=20)
+        template_entry.grid(row=0, column=1, columnspan=2, padx=5)
+        template_entry.insert(0, item.get('template') or "")
+
+        def browse_template():
+            path = filedialog.askopenfilename(title="选择模板图片", filetypes=[("图片", "*.png *.bmp *.jpg")], parent=popup)
+            if path:
+                template_entry.delete(0, tk.END)
+                template_entry.insert(0, path)
+
+        def capture_template():
+            position = self.screen_position(popup, x_entry, y_entry, relative_var, index)
+            if position is not None:
+                x, y = position
+                self.capture_item_template(popup, x, y, template_entry)
+
+        button_browse_template = tk.Button(template_frame, text="浏览", command=browse_template)
+        button_browse_template.grid(row=0, column=3)
+        button_capture_template = tk.Button(template_frame, text="截取坐标周围", command=capture_template)
+        button_capture_template.grid(row=1, column=0, pady=2)
+        threshold_label = tk.Label(template_frame, text="相似度：")
+        threshold_label.grid(row=1, column=1)
+        threshold_entry = tk.Entry(template_frame, width=6)
+        threshold_entry.grid(row=1, column=2)
+        threshold_entry.insert(0, str(item.get('template_threshold', DEFAULT_TEMPLATE_THRESHOLD)))
+
+        # 流程控制：步骤类型、标签名（标签和跳转目标）、重复次数
+        flow_frame = tk.Frame(popup)
+        flow_frame.pack(pady=5)
+        flow_var = tk.StringVar(value=FLOW_LABELS.get(item.get('flow'), FLOW_LABELS[None]))
+        flow_menu = tk.OptionMenu(flow_frame, flow_var, *FLOW_LABELS.values())
+        flow_menu.grid(row=0, column=0, columnspan=4)
+        flow_label_label = tk.Label(flow_frame, text="标签：")
+        flow_label_label.grid(row=1, column=0)
+        flow_label_entry = tk.Entry(flow_frame, width=12)
+        flow_label_entry.grid(row=1, column=1)
+        repeat_count_label = tk.Label(flow_frame, text="重复次数：")
+        repeat_count_label.grid(row=1, column=2)
+        repeat_count_entry = tk.Entry(flow_frame, width=6)
+        repeat_count_entry.grid(row=1, column=3)
+        flow_label_entry.insert(0, item.get("label") or "")
+        repeat_count_entry.insert(0, str(item.get("repeat_count", 1)))
+
         # 备注输入框
         remarks_label = tk.Label(popup, text="备注：")
         remarks_label.pack(pady=5)
@@ -512,9 +1330,27 @@ class TkinterApp:
 
         # 保存按钮
         def save_edit():
+            # 获取步骤类型；标签、跳转和重复步骤可以不填坐标
+            flow = next(flow for flow, label in FLOW_LABELS.items() if label == flow_var.get())
+            flow_label = flow_label_entry.get().strip()
+            repeat_count = 1
+            if flow in (FLOW_LABEL, FLOW_JUMP, FLOW_JUMP_IF, FLOW_JUMP_UNLESS) and not flow_label:
+                messagebox.showerror("错误", "标签和跳转步骤必须填写标签名。")
+                return
+            if flow == FLOW_REPEAT:
+                try:
+                    repeat_count = int(repeat_count_entry.get().strip())
+                    if repeat_count < 0:
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", "重复次数必须是非负整数。")
+                    return
+
             # 获取坐标
             x = x_entry.get().strip()
             y = y_entry.get().strip()
+            if not x and not y and flow in (FLOW_LABEL, FLOW_JUMP, FLOW_REPEAT, FLOW_END_REPEAT):
+                x, y = "0", "0"
             if not x or not y:
                 messagebox.showerror("错误", "坐标X和Y不能为空。")
                 return
@@ -566,19 +1402,82 @@ class TkinterApp:
             else:
                 delay_time = 0
 
+            # 获取移动方式
+            motion = next(mode for mode, label in MOTION_LABELS.items() if label == motion_var.get())
+            motion_value = 0
+            if motion in (MOTION_DURATION, MOTION_SPEED):
+                try:
+                    motion_value = float(motion_value_entry.get().strip())
+                    if motion_value < 0 or (motion == MOTION_SPEED and motion_value == 0):
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", "移动时长必须是非负数字，移动速度必须是正数。")
+                    return
+
+            # 获取颜色容差
+            try:
+                tolerance = float(tolerance_entry.get().strip() or 0)
+                if tolerance < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "颜色容差必须是非负数字。")
+                return
+
+            # 获取等待超时
+            wait_timeout = 0
+            if wait_color_var.get():
+                try:
+                    wait_timeout = float(wait_timeout_entry.get().strip())
+                    if wait_timeout <= 0:
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("错误", "等待超时必须是正数。")
+                    return
+
+            # 获取模板
+            template = template_entry.get().strip() or None
+            try:
+                template_threshold = float(threshold_entry.get().strip() or DEFAULT_TEMPLATE_THRESHOLD)
+                if not 0 < template_threshold <= 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "相似度必须是 0 到 1 之间的数字。")
+                return
+
+            # 锚点需要能定位；锚点本身的坐标总是屏幕坐标
+            if flow == FLOW_ANCHOR and not template and not (color and judge_color):
+                messagebox.showerror("错误", "锚点需要设置颜色（特征）或模板。")
+                return
+            relative = relative_var.get() and flow != FLOW_ANCHOR
+
             # 获取备注
             remarks = remarks_entry.get().strip()
 
-            # 更新项目数据
-            self.items[index]['coordinates'] = coordinates
-            self.items[index]['color'] = color
-            self.items[index]['judge_color'] = judge_color
-            self.items[index]['click'] = click_var.get()
-            self.items[index]['delay'] = delay_var.get()
-            self.items[index]['delay_time'] = delay_time
-            self.items[index]['remarks'] = remarks
-
-            self.save_items()
+            # 更新项目数据：替换为新的字典，撤销记录中保留的旧项目不受影响
+            item = dict(self.items[index])
+            item['coordinates'] = coordinates
+            item['color'] = color
+            item['judge_color'] = judge_color
+            item['click'] = click_var.get()
+            item['move'] = move_var.get()
+            item['delay'] = delay_var.get()
+            item['delay_time'] = delay_time
+            item['motion'] = motion
+            item['motion_value'] = motion_value
+            item['tolerance'] = tolerance
+            item['signature'] = signature["value"]
+            item['wait_color'] = wait_color_var.get()
+            item['wait_timeout'] = wait_timeout
+            item['template'] = template
+            item['template_threshold'] = template_threshold
+            item['flow'] = flow
+            item['label'] = flow_label
+            item['repeat_count'] = repeat_count
+            item['relative'] = relative
+            item['remarks'] = remarks
+
+            self.apply_edit([("set", index, item)], "编辑")
+            self.treeview.select_indices([index])
             popup.destroy()
             messagebox.showinfo("成功", "项目已更新。")
 
@@ -589,62 +1488,45 @@ class TkinterApp:
         button_cancel.pack(pady=5)
 
     def move_up(self):
-        selected_items = list(self.tree.selection())
-        if not selected_items:
+        # 获取选中项的索引（已排序）
+        indices = self.treeview.selected_indices()
+        if not indices:
             messagebox.showwarning("警告", "请先选择要上移的项目。")
             return
 
-        # 获取选中项的索引，并排序
-        indices = sorted([self.tree.index(item) for item in selected_items])
         if 0 in indices:
             messagebox.showwarning("警告", "最顶部的项目无法上移。")
             return
 
-        for index in indices:
-            # 交换项目与上方的项目
-            self.items[index - 1], self.items[index] = self.items[index], self.items[index - 1]
-
-        self.update_treeview_display()
-        self.save_items()
-
-        # 重新选择移动后的项目
-        self.tree.selection_remove(*self.tree.selection())
-        for index in indices:
-            self.tree.selection_add(index - 1)
+        # 交换项目与上方的项目，选中状态跟随项目移动
+        self.apply_edit([("move", index, index - 1) for index in indices], "上移", see=indices[0] - 1)
 
     def move_down(self):
-        selected_items = list(self.tree.selection())
-        if not selected_items:
+        indices = sorted(self.treeview.selected_indices(), reverse=True)
+        if not indices:
             messagebox.showwarning("警告", "请先选择要下移的项目。")
             return
 
         max_index = len(self.items) - 1
-        indices = sorted([self.tree.index(item) for item in selected_items], reverse=True)
         if max_index in indices:
             messagebox.showwarning("警告", "最底部的项目无法下移。")
             return
 
-        for index in indices:
-            # 交换项目与下方的项目
-            self.items[index + 1], self.items[index] = self.items[index], self.items[index + 1]
-
-        self.update_treeview_display()
-        self.save_items()
-
-        # 重新选择移动后的项目
-        self.tree.selection_remove(*self.tree.selection())
-        for index in indices:
-            self.tree.selection_add(index + 1)
+        # 交换项目与下方的项目，选中状态跟随项目移动
+        self.apply_edit([("move", index, index + 1) for index in indices], "下移", see=indices[0] + 1)
 
     def run_actions(self):
         if self.running:
             messagebox.showwarning("警告", "脚本正在运行中。")
             return
+        if self.recorder is not None:
+            messagebox.showwarning("警告", "请先停止录制。")
+            return
 
         # 创建运行选项窗口
         run_popup = tk.Toplevel(self.root)
         run_popup.title("运行选项")
-        run_popup.geometry("350x300")
+        run_popup.geometry("380x710")
         run_popup.grab_set()  # 模态窗口
 
         # 循环选项
@@ -664,6 +1546,52 @@ class TkinterApp:
         interval_entry = tk.Entry(run_popup)
         interval_entry.pack(pady=5, fill=tk.X, padx=20)
 
+        # 判色方式选项
+        capture_mode_var = tk.StringVar(value=self.runner.capture_mode)
+        rb_capture_pixel = tk.Radiobutton(run_popup, text="逐点读取颜色", variable=capture_mode_var, value=CAPTURE_PIXEL)
+        rb_capture_pixel.pack(anchor='w')
+        rb_capture_frame = tk.Radiobutton(run_popup, text="批量抓屏（整个屏幕）", variable=capture_mode_var, value=CAPTURE_FRAME)
+        rb_capture_frame.pack(anchor='w')
+        rb_capture_region = tk.Radiobutton(run_popup, text="批量抓屏（只抓坐标所在区域）", variable=capture_mode_var, value=CAPTURE_REGION)
+        rb_capture_region.pack(anchor='w')
+
+        frame_ttl_label = tk.Label(run_popup, text="画面有效期（秒，留空为每轮一次，点击后失效）：")
+        frame_ttl_label.pack(pady=5, anchor='w')
+        frame_ttl_entry = tk.Entry(run_popup)
+        frame_ttl_entry.pack(pady=5, fill=tk.X, padx=20)
+        if self.runner.frame_ttl is not None:
+            frame_ttl_entry.insert(0, str(self.runner.frame_ttl))
+
+        # 从共享内存帧总线读取画面（多个进程共用一个采集进程）
+        frame_bus_var = tk.BooleanVar(value=self.runner.backend is not self.input_backend)
+        cb_frame_bus = tk.Checkbutton(run_popup, text="从帧总线读取画面（需先运行 python framebus.py）", variable=frame_bus_var)
+        cb_frame_bus.pack(pady=5, anchor='w')
+
+        # 全局移动方式
+        motion_label = tk.Label(run_popup, text="移动方式：")
+        motion_label.pack(pady=5, anchor='w')
+        motion_frame = tk.Frame(run_popup)
+        motion_frame.pack(pady=5, fill=tk.X, padx=20)
+        motion_var = tk.StringVar(value=MOTION_LABELS[self.runner.motion_mode])
+        motion_menu = tk.OptionMenu(motion_frame, motion_var, *[MOTION_LABELS[mode] for mode in (MOTION_TELEPORT, MOTION_DURATION, MOTION_SPEED)])
+        motion_menu.pack(side=tk.LEFT)
+        motion_value_entry = tk.Entry(motion_frame, width=10)
+        motion_value_entry.pack(side=tk.LEFT, padx=5)
+        motion_value_entry.insert(0, str(self.runner.motion_value))
+
+        # 每次输入后的停顿
+        pause_label = tk.Label(run_popup, text="每次操作后停顿（秒，留空为 pyautogui 默认值）：")
+        pause_label.pack(pady=5, anchor='w')
+        pause_entry = tk.Entry(run_popup)
+        pause_entry.pack(pady=5, fill=tk.X, padx=20)
+        if self.runner.pause is not None:
+            pause_entry.insert(0, str(self.runner.pause))
+
+        # 极速模式
+        turbo_var = tk.BooleanVar(value=self.runner.turbo)
+        cb_turbo = tk.Checkbutton(run_popup, text="极速模式（不移动轨迹，直接在目标位置点击）", variable=turbo_var)
+        cb_turbo.pack(pady=5, anchor='w')
+
         # 开始运行按钮
         def start_run():
             loop = loop_var.get()
@@ -684,12 +1612,50 @@ class TkinterApp:
             except ValueError:
                 messagebox.showerror("错误", "间隔时间必须是非负数字。")
                 return
+            try:
+                frame_ttl = float(frame_ttl_entry.get()) if frame_ttl_entry.get() else None
+                if frame_ttl is not None and frame_ttl < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "画面有效期必须是非负数字。")
+                return
+            motion_mode = next(mode for mode, label in MOTION_LABELS.items() if label == motion_var.get())
+            try:
+                motion_value = float(motion_value_entry.get()) if motion_value_entry.get() else 0
+                if motion_value < 0 or (motion_mode == MOTION_SPEED and motion_value == 0):
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "移动时长必须是非负数字，移动速度必须是正数。")
+                return
+            try:
+                pause = float(pause_entry.get()) if pause_entry.get() else None
+                if pause is not None and pause < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "停顿时间必须是非负数字。")
+                return
 
+            # 编译出不可变的执行计划，运行中编辑列表不会影响本次运行
+            try:
+                plan = compile_plan(self.items, self.config_dir)
+            except ValueError as e:
+                messagebox.showerror("错误", str(e))
+                return
+            try:
+                self.use_frame_bus(frame_bus_var.get())
+            except (OSError, ValueError) as e:
+                messagebox.showerror("错误", f"无法连接帧总线：{e}")
+                return
+            self.runner.capture_mode = capture_mode_var.get()
+            self.runner.frame_ttl = frame_ttl
+            self.runner.motion_mode = motion_mode
+            self.runner.motion_value = motion_value
+            self.runner.pause = pause
+            self.runner.turbo = turbo_var.get()
             run_popup.destroy()
             self.running = True
-            self.stop_event.clear()
             self.button_run.config(state=tk.DISABLED)
-            threading.Thread(target=self.execute_actions, args=(loop, count, interval), daemon=True).start()
+            threading.Thread(target=self.execute_actions, args=(plan, loop, count, interval), daemon=True).start()
 
         button_start = tk.Button(run_popup, text="开始运行", command=start_run)
         button_start.pack(pady=10)
@@ -697,103 +1663,279 @@ class TkinterApp:
         button_cancel = tk.Button(run_popup, text="取消", command=run_popup.destroy)
         button_cancel.pack(pady=5)
 
-    def execute_actions(self, loop, count, interval):
-        iteration = 0
-        while True:
-            for item in self.items:
-                if self.stop_event.is_set():
-                    self.running = False
+    def start_control_server(self):
+        from control import ControlServer
+
+        # 请求需要带上设置文件中的令牌，第一次启动时生成
+        if not self.control_token:
+            self.control_token = new_control_token()
+            self.save_settings()
+        self.control = ControlServer(self.runner, self.config_dir, port=self.control_port,
+                                     socket_path=self.control_socket, token=self.control_token)
+        try:
+            self.control.start()
+        except OSError as e:
+            self.control = None
+            self.control_var.set(False)
+            self.append_run_log([f"本地控制接口启动失败：{e}"])
+            return False
+        self.control_var.set(True)
+        self.append_run_log([f"本地控制接口已启动：{self.control.address}（令牌见 {self.settings_path} 中的 control_token）"])
+        return True
+
+    def toggle_control_server(self):
+        # 开关保存在设置文件中，下次启动时自动打开
+        if self.control_var.get():
+            if self.control is None and not self.start_control_server():
+                return
+            if self.control_port is None and not self.control_socket:
+                self.control_port = self.control.port
+        else:
+            if self.control is not None:
+                self.control.close()
+                self.control = None
+                self.append_run_log(["本地控制接口已关闭"])
+            self.control_port = None
+            self.control_socket = None
+        self.save_settings()
+
+    def use_frame_bus(self, enabled):
+        # 切换读屏来源：帧总线或直接抓屏，鼠标操作始终由 input_backend 执行
+        current = self.runner.backend
+        if enabled and current is self.input_backend:
+            from framebus import FrameBusBackend
+            self.runner.backend = FrameBusBackend(self.input_backend)
+        elif not enabled and current is not self.input_backend:
+            current.close()
+            self.runner.backend = self.input_backend
+
+    def execute_actions(self, plan, loop, count, interval):
+        try:
+            self.runner.run(plan, loop, count, interval)
+        except Exception as e:
+            # 执行引擎意外退出，也要通知界面恢复运行按钮
+            self.on_runner_event("crashed", {"message": str(e)})
+
+    def on_runner_event(self, kind, data):
+        # 在执行线程中调用：只放入队列，不直接操作界面，也不弹出会阻塞运行的对话框
+        self.events.put((kind, data))
+        control = self.control
+        if control is not None:
+            control.publish(kind, data)
+
+    def poll_runner_events(self):
+        # 在界面线程中批量处理事件：日志一次性写入，进度只显示最新的一条
+        lines = []
+        progress = None
+        for _ in range(EVENT_BATCH):
+            try:
+                kind, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                progress = data
+            elif kind == "started":
+                # 也可能是控制接口发起的运行
+                self.running = True
+                self.button_run.config(state=tk.DISABLED)
+                self.steps_per_pass = data["steps"]
+                count = "循环" if data["count"] is None else f"{data['count']} 次"
+                lines.append(f"开始运行：每轮 {data['steps']} 步，{count}")
+                self.progress_var.set("运行中")
+            elif kind == "error":
+                lines.append(f"第 {data['step'] + 1} 行：{data['message']}")
+            elif kind == "paused":
+                progress = None
+                step = "" if data["step"] is None else f"，停在第 {data['step'] + 1} 行"
+                lines.append(f"已暂停{step}")
+                self.progress_var.set(f"已暂停{step}（F4 继续）")
+                self.button_pause.config(text="继续 (F4)")
+            elif kind == "resumed":
+                lines.append("继续运行")
+                self.button_pause.config(text="暂停 (F4)")
+            elif kind in ("stopped", "finished", "crashed"):
+                progress = None
+                # 界面发起的运行可能因为控制接口的运行正在进行而没有开始
+                self.running = self.runner.running
+                if not self.running:
                     self.button_run.config(state=tk.NORMAL)
-                    messagebox.showinfo("已停止", "脚本运行已被停止。")
-                    return
+                    self.button_pause.config(text="暂停 (F4)")
+                if kind == "crashed":
+                    lines.append(f"运行出错：{data['message']}")
+                    self.progress_var.set("运行出错")
+                else:
+                    stats = data["stats"]
+                    self.last_stats = stats
+                    self.last_timings = data["timings"]
+                    title = "运行完成" if kind == "finished" else "已停止"
+                    summary = (f"{title}：{stats.iterations} 轮，{stats.steps} 步，点击 {stats.clicks} 次，"
+                               f"错误 {stats.errors} 次，用时 {stats.elapsed:.2f} 秒，{stats.steps_per_second:.1f} 步/秒")
+                    lines.append(summary)
+                    lines.append(stats.jitter_summary())
+                    self.progress_var.set(summary)
+
+        if progress is not None:
+            self.progress_var.set(f"运行中：第 {progress['iteration']} 轮，第 {progress['step'] + 1}/{self.steps_per_pass} 行，"
+                                  f"已执行 {progress['steps']} 步，{progress['steps_per_second']:.1f} 步/秒")
+        if lines:
+            self.append_run_log(lines)
+        self.root.after(EVENT_POLL_MS, self.poll_runner_events)
+
+    def append_run_log(self, lines):
+        timestamp = time.strftime("%H:%M:%S")
+        self.run_log.config(state=tk.NORMAL)
+        self.run_log.insert(tk.END, "".join(f"[{timestamp}] {line}\n" for line in lines))
+        # 只保留最近的 RUN_LOG_LINES 行
+        total = int(self.run_log.index("end-1c").split(".")[0])
+        if total > RUN_LOG_LINES:
+            self.run_log.delete("1.0", f"{total - RUN_LOG_LINES}.0")
+        self.run_log.config(state=tk.DISABLED)
+        self.run_log.see(tk.END)
+
+    def show_run_report(self):
+        if self.last_timings is None or not self.last_timings.steps.count:
+            messagebox.showinfo("提示", "还没有运行记录。")
+            return
+        timings = self.last_timings
+
+        report_popup = tk.Toplevel(self.root)
+        report_popup.title("运行报告")
+        report_popup.geometry("1000x500")
+
+        iterations = timings.iteration_summary()
+        text = f"{self.last_stats.jitter_summary()}\n" if self.last_stats is not None else ""
+        if iterations["count"]:
+            text += (f"每轮用时 p50 {iterations['duration_p50'] * 1000:.2f} ms，p95 {iterations['duration_p95'] * 1000:.2f} ms，"
+                     f"循环开销 p50 {iterations['overhead_p50'] * 1000:.3f} ms，最大 {iterations['overhead_max'] * 1000:.3f} ms")
+        if timings.steps.dropped:
+            text += f"\n只保留最近 {timings.steps.capacity} 条记录（已丢弃 {timings.steps.dropped} 条）"
+        tk.Label(report_popup, text=text, justify=tk.LEFT, anchor='w').pack(fill=tk.X, padx=10, pady=5)
+
+        # 按总用时从大到小列出每一步，时间单位毫秒
+        columns = ("Row", "Count", "Total", "Cost", "Check", "Move", "Click", "Results")
+        report_tree = ttk.Treeview(report_popup, columns=columns, show='headings')
+        headings = ("行", "次数", "总用时", "单步 p50/p95/max", "判色 p50/p95/max", "移动 p50/p95/max", "点击 p50/p95/max", "匹配/不匹配/出错")
+        for column, heading in zip(columns, headings):
+            report_tree.heading(column, text=heading)
+            report_tree.column(column, width=120, anchor='center')
+        report_scrollbar = tk.Scrollbar(report_popup, command=report_tree.yview)
+        report_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        report_tree.config(yscrollcommand=report_scrollbar.set)
+        report_tree.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def ms(entry, name):
+            return "/".join(f"{entry[f'{name}_{key}'] * 1000:.2f}" for key in ("p50", "p95", "max"))
+
+        for entry in timings.summary():
+            report_tree.insert("", tk.END, values=(
+                entry["step"] + 1, entry["count"], f"{entry['total'] * 1000:.1f}",
+                ms(entry, "cost"), ms(entry, "check"), ms(entry, "move"), ms(entry, "click"),
+                f"{entry['match']}/{entry['miss']}/{entry['error']}"))
+
+        def export_report():
+            path = filedialog.asksaveasfilename(parent=report_popup, defaultextension=".csv",
+                                                filetypes=[("CSV 文件", "*.csv"), ("JSON 文件", "*.json")])
+            if not path:
+                return
+            try:
+                if path.lower().endswith(".json"):
+                    timings.export_json(path, self.last_stats)
+                else:
+                    timings.export_csv(path)
+            except OSError as e:
+                messagebox.showerror("错误", f"导出运行报告失败: {e}", parent=report_popup)
+
+        button_export_report = tk.Button(report_popup, text="导出（CSV/JSON）", command=export_report)
+        button_export_report.pack(pady=10)
+
+    def stop_actions(self, event=None):
+        # 立即生效：执行线程在延时、移动和等待颜色中都会马上醒来
+        if self.runner.running:
+            self.runner.stop()
+        elif event is None:
+            messagebox.showinfo("提示", "当前没有正在运行的脚本。")
+
+    def toggle_pause_actions(self, event=None):
+        # 暂停停在当前步骤，继续后从该步骤接着执行
+        if self.runner.running:
+            self.runner.toggle_pause()
+        elif event is None:
+            messagebox.showinfo("提示", "当前没有正在运行的脚本。")
+
+    def start_hotkeys(self):
+        # 全局热键在 pynput 的监听线程中直接调用执行引擎，不经过界面线程
+        try:
+            from pynput import keyboard  # 确保已安装：pip install pynput
+        except ImportError:
+            self.append_run_log(["未安装 pynput，F3/F4 只在本窗口有焦点时有效"])
+            return
 
-                coordinates = item['coordinates']
-
-                x, y = coordinates
-
-                color = item['color']
-                judge_color = item.get('judge_color', True)
-                click = item['click']
-                delay = item['delay']
-                delay_time = item['delay_time']
-                remarks = item['remarks']
-
-                perform_click = True
-
-
-
-
-                if perform_click and click:
-                    try:
-                        if judge_color and color:
-                            try:
-                                current_color = pyautogui.pixel(x, y)
-                                if current_color != color:
-                                    continue
-                            except Exception as e:
-                                messagebox.showerror("错误", f"获取颜色失败: {e}")
-                                continue  # Skip this item
-                        # 移动鼠标到坐标
-                        pyautogui.moveTo(x, y, duration=0.5)
-                        pyautogui.click()
-                    except Exception as e:
-                        messagebox.showerror("错误", f"点击失败: {e}")
-                        continue
-
-
-
-                if delay:
-                    # 分段延迟以便及时响应停止事件
-                    total_sleep = delay_time
-                    elapsed = 0
-                    while elapsed < total_sleep:
-                        if self.stop_event.is_set():
-                            self.running = False
-                            self.button_run.config(state=tk.NORMAL)
-                            messagebox.showinfo("已停止", "脚本运行已被停止。")
-                            return
-                        time.sleep(0.1)
-                        elapsed += 0.1
-
-            iteration += 1
-            if not loop:
-                if count and iteration >= count:
-                    break
-            time.sleep(interval)
-
-            if loop:
-                # 在无限循环中, continue until stopped
-                continue
-            else:
-                if count and iteration >= count:
-                    break
+        def stop():
+            if self.runner.running:
+                self.runner.stop()
 
-        self.running = False
-        self.button_run.config(state=tk.NORMAL)
-        messagebox.showinfo("运行完成", "所有操作已完成。")
+        def toggle_pause():
+            if self.runner.running:
+                self.runner.toggle_pause()
 
-    # def stop_actions(self, event=None):
-    #     if self.running:
-    #         self.stop_event.set()
-    #     else:
-    #         messagebox.showinfo("提示", "当前没有正在运行的脚本。")
+        try:
+            self.hotkeys = keyboard.GlobalHotKeys({'<f3>': stop, '<f4>': toggle_pause})
+            self.hotkeys.start()
+        except Exception as e:
+            self.hotkeys = None
+            self.append_run_log([f"注册全局热键失败：{e}"])
 
-    def update_treeview_display(self):
-        # 清空当前Treeview
-        self.tree.delete(*self.tree.get_children())
-        # 重新插入项目
-        for item in self.items:
-            coordinates = f"({item['coordinates'][0]}, {item['coordinates'][1]})"
-            if item['color']:
-                color = f"({item['color'][0]}, {item['color'][1]}, {item['color'][2]})"
+    def apply_edit(self, ops, label, see=None):
+        # 所有对列表的修改都经过这里：应用编辑操作并记录撤销信息（只保存改动的项），刷新一次、保存一次
+        self.history.apply(self.items, ops, label)
+        if see is None:
+            self.update_treeview_display()
+        else:
+            self.treeview.see(see)
+        self.save_items(ops)
+        self.update_history_buttons()
+
+    def undo(self, event=None):
+        return self.step_history(self.history.undo, "撤销", event)
+
+    def redo(self, event=None):
+        return self.step_history(self.history.redo, "重做", event)
+
+    def undo_or_redo(self, event):
+        # 0x0001 为 Shift
+        if event.state & 0x0001:
+            return self.redo(event)
+        return self.undo(event)
+
+    def step_history(self, step, verb, event=None):
+        # 输入框里的 Ctrl+Z 留给输入框自己
+        if event is not None and isinstance(event.widget, tk.Entry):
+            return
+        edit, items, ops = step(self.items)
+        if edit is None:
+            return
+        if ops is None:
+            # 整体替换（导入）
+            self.items = items
+            self.treeview.reset()
+            self.save_items()
+        else:
+            if self.items and ops:
+                self.treeview.see(min(first_index(ops), len(self.items) - 1))
             else:
-                color = ""
-            judge_color = "是" if item.get("judge_color", True) else "否"
-            click = "✔" if item.get("click", False) else ""
-            delay = "✔" if item.get("delay", False) else ""
-            delay_time = item.get("delay_time", 0)
-            remarks = item.get("remarks", "")
-            self.tree.insert("", "end", values=(coordinates, color, judge_color, click, delay, delay_time, remarks))
+                self.update_treeview_display()
+            self.save_items(ops)
+        self.update_history_buttons()
+        self.progress_var.set(f"已{verb}：{edit.label}")
+        return "break"
+
+    def update_history_buttons(self):
+        self.button_undo.config(state=tk.NORMAL if self.history.can_undo else tk.DISABLED)
+        self.button_redo.config(state=tk.NORMAL if self.history.can_redo else tk.DISABLED)
+
+    def update_treeview_display(self):
+        # 只对可见行做增量更新
+        self.treeview.refresh()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,286 @@
+import math
+import os
+
+# 运行前把列表项编译成不可变的执行计划，执行循环只读取计划，不再访问界面正在编辑的 items
+
+# 鼠标移动方式：瞬移、固定时长（秒）、按速度（像素/秒）
+MOTION_TELEPORT = "teleport"
+MOTION_DURATION = "duration"
+MOTION_SPEED = "speed"
+MOTION_MODES = (MOTION_TELEPORT, MOTION_DURATION, MOTION_SPEED)
+
+# 流程控制步骤（列表项的 flow 字段），None 为普通步骤
+FLOW_LABEL = "label"              # 标签：跳转目标，本身不执行任何动作
+FLOW_JUMP = "jump"                # 无条件跳转到标签
+FLOW_JUMP_IF = "jump_if"          # 颜色（或模板）一致时跳转
+FLOW_JUMP_UNLESS = "jump_unless"  # 颜色（或模板）不一致时跳转
+FLOW_REPEAT = "repeat"            # 重复开始：到对应的重复结束之间的步骤执行 repeat_count 次
+FLOW_END_REPEAT = "end_repeat"    # 重复结束
+FLOW_ANCHOR = "anchor"            # 锚点：定位窗口，之后 relative 为 True 的项目坐标相对于它
+FLOW_TYPES = (FLOW_LABEL, FLOW_JUMP, FLOW_JUMP_IF, FLOW_JUMP_UNLESS, FLOW_REPEAT, FLOW_END_REPEAT, FLOW_ANCHOR)
+
+# 锚点模板的快速检查范围：在缓存位置周围多抓取的像素数
+ANCHOR_CHECK_MARGIN = 4
+
+# 模板查找的默认相似度阈值和搜索范围（坐标周围的像素数）
+DEFAULT_TEMPLATE_THRESHOLD = 0.9
+DEFAULT_SEARCH_MARGIN = 200
+
+
+def motion_duration(mode, value, start, end):
+    """
+    计算从 start 移动到 end 所需的时长。
+    """
+    if mode == MOTION_DURATION:
+        return max(float(value), 0.0)
+    if mode == MOTION_SPEED and value and value > 0:
+        return math.hypot(end[0] - start[0], end[1] - start[1]) / value
+    return 0.0
+
+
+def color_distance(a, b):
+    """
+    两个 RGB 颜色的欧氏距离。
+    """
+    return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
+
+
+class Step:
+    """
+    编译后的一步。index 为它在原列表中的位置，row 为它在计划判色数组中的序号（不判色时为 None），
+    samples 为判色时读取的 ((x, y), 颜色) 元组（目标点及其特征像素），tolerance 为允许的最大颜色距离，
+    motion 为该项单独设置的移动方式 (mode, value)，None 表示使用全局设置，
+    wait 大于 0 时颜色不一致会最多等待 wait 秒直到颜色出现，
+    template 为 (Template, 搜索区域, 阈值) 时在屏幕上查找模板并点击匹配位置，不再判色，
+    move 为 True 时（不点击）只把鼠标移动到坐标。
+    op 为流程控制类型（FLOW_*，普通步骤为 None），target 为跳转目标在 Plan.steps 中的下标
+    （重复开始为对应重复结束的下标，重复结束为对应重复开始的下标），count 为重复次数。
+    anchor 为坐标所相对的锚点编号（从 1 开始，0 表示屏幕绝对坐标）：执行时 x、y、采样点和模板搜索区域
+    都加上该锚点当前的偏移量。锚点步骤本身的 anchor 为自己的编号，x、y 为录制时锚点所在的位置。
+    """
+
+    __slots__ = ("index", "x", "y", "color", "click", "delay", "row", "motion", "samples", "tolerance", "wait",
+                 "template", "move", "op", "target", "count", "anchor")
+
+    def __init__(self, index, x, y, color, click, delay, row, motion=None, samples=(), tolerance=0.0, wait=0.0,
+                 template=None, move=False, op=None, target=None, count=0, anchor=0):
+        self.index = index
+        self.x = x
+        self.y = y
+        self.color = color
+        self.click = click
+        self.delay = delay
+        self.row = row
+        self.motion = motion
+        self.samples = samples
+        self.tolerance = tolerance
+        self.wait = wait
+        self.template = template
+        self.move = move
+        self.op = op
+        self.target = target
+        self.count = count
+        self.anchor = anchor
+
+    def __repr__(self):
+        if self.op is not None:
+            return f"Step(index={self.index}, op={self.op}, target={self.target}, count={self.count})"
+        return f"Step(index={self.index}, x={self.x}, y={self.y}, color={self.color}, click={self.click}, delay={self.delay})"
+
+
+class Plan:
+    """
+    执行计划：steps 为 Step 元组。
+    points / expected 为所有判色步骤的采样坐标和颜色，第 row 个判色步骤的采样点从 starts[row] 开始，
+    其允许的颜色距离为 tolerances[row]。groups 为每个采样点所相对的锚点编号（0 为绝对坐标），anchors 为锚点个数。
+    """
+
+    __slots__ = ("steps", "points", "expected", "starts", "tolerances", "groups", "anchors")
+
+    def __init__(self, steps, points, expected, starts=(), tolerances=(), groups=None, anchors=0):
+        self.steps = steps
+        self.points = points
+        self.expected = expected
+        self.starts = starts
+        self.tolerances = tolerances
+        self.groups = groups if groups is not None else (0,) * len(points)
+        self.anchors = anchors
+
+    def __len__(self):
+        return len(self.steps)
+
+
+def compile_template(item, x, y, base_dir):
+    """
+    加载项目的模板图片（相对路径相对于 base_dir），返回 (Template, 搜索区域, 阈值)。
+    """
+    from template import load_template
+
+    path = item['template']
+    if base_dir and not os.path.isabs(path):
+        path = os.path.join(base_dir, path)
+    try:
+        template = load_template(path)
+    except Exception as e:
+        raise ValueError(f"加载模板 {item['template']} 失败: {e}")
+    margin = item.get('search_margin', DEFAULT_SEARCH_MARGIN)
+    region = None
+    if margin and margin > 0:
+        margin = int(margin)
+        region = (x - margin, y - margin, x + margin + 1, y + margin + 1)
+    threshold = float(item.get('template_threshold', DEFAULT_TEMPLATE_THRESHOLD))
+    return template, region, threshold
+
+
+def anchor_check_region(template, x, y, margin=ANCHOR_CHECK_MARGIN):
+    """
+    锚点模板中心在 (x, y) 时，快速检查需要抓取的区域（模板大小加上 margin）。
+    """
+    left = x - template.width // 2 - margin
+    top = y - template.height // 2 - margin
+    return left, top, left + template.width + 2 * margin, top + template.height + 2 * margin
+
+
+def compile_check(item, x, y, base_dir, points, expected, starts, tolerances):
+    """
+    编译项目的判色（或模板查找）部分，返回 (color, row, samples, tolerance, wait, template)；
+    判色采样点追加到 points / expected 中。
+    """
+    color = item.get('color')
+    template = None
+    if item.get('template'):
+        template = compile_template(item, x, y, base_dir)
+    # 模板项目不判色
+    check = template is None and item.get('judge_color', True) and bool(color)
+    color = tuple(color) if check else None
+    row = None
+    samples = ()
+    tolerance = float(item.get('tolerance', 0) or 0)
+    wait = float(item.get('wait_timeout', 0) or 0) if check and item.get('wait_color', False) else 0.0
+    if check:
+        samples = [((x, y), color)]
+        for dx, dy, r, g, b in item.get('signature') or ():
+            if dx or dy:
+                samples.append(((x + int(dx), y + int(dy)), (int(r), int(g), int(b))))
+        samples = tuple(samples)
+        row = len(starts)
+        starts.append(len(points))
+        tolerances.append(tolerance)
+        for point, sample_color in samples:
+            points.append(point)
+            expected.append(sample_color)
+    return color, row, samples, tolerance, wait, template
+
+
+def compile_plan(items, base_dir=None):
+    """
+    把列表项冻结为 Plan：坐标和颜色转为元组，去掉备注等运行时不用的字段，
+    既不点击、移动也不延时的项目不会产生任何动作，直接跳过。
+    判色项目的 signature（[[dx, dy, r, g, b], ...]）展开为目标点周围的采样点；
+    模板项目（template 为图片路径）预先加载模板，模板加载失败时抛出 ValueError。
+    流程控制步骤在这里解析为跳转下标，执行时不再查找标签；标签不存在、重复开始和结束不配对时抛出 ValueError。
+    relative 为 True 的项目坐标是相对于它上方最近的锚点位置的偏移，上方没有锚点时抛出 ValueError。
+    """
+    steps = []
+    points = []
+    expected = []
+    starts = []
+    tolerances = []
+    labels = {}   # 标签名 -> 下一个步骤的下标
+    jumps = []    # (步骤下标, 标签名, 列表下标)
+    repeats = []  # 未结束的重复开始步骤下标
+    groups = []   # 每个采样点所相对的锚点编号
+    anchors = 0   # 已出现的锚点个数，即最近一个锚点的编号
+    origin = None  # 最近一个锚点录制时的位置
+    for index, item in enumerate(list(items)):
+        flow = item.get('flow')
+        anchor = 0
+        if item.get('relative', False) and flow != FLOW_ANCHOR:
+            if not anchors:
+                raise ValueError(f"第 {index + 1} 行：使用相对坐标，但上方没有锚点")
+            anchor = anchors
+            # 相对坐标先换算为锚点在录制位置时的屏幕坐标，执行时再加上锚点的偏移量
+            dx, dy = item.get('coordinates', (0, 0))
+            item = dict(item, coordinates=(origin[0] + int(dx), origin[1] + int(dy)))
+        group_start = len(points)
+        if flow in FLOW_TYPES:
+            name = str(item.get('label') or "").strip()
+            if flow == FLOW_LABEL:
+                if not name:
+                    raise ValueError(f"第 {index + 1} 行：标签名称不能为空")
+                if name in labels:
+                    raise ValueError(f"第 {index + 1} 行：标签 {name} 重复")
+                labels[name] = len(steps)
+                continue
+            if flow == FLOW_REPEAT:
+                repeats.append(len(steps))
+                steps.append(Step(index, 0, 0, None, False, 0.0, None, op=flow,
+                                  count=int(item.get('repeat_count', 1) or 0)))
+                continue
+            if flow == FLOW_ANCHOR:
+                # 锚点：用模板或颜色特征定位，执行时先在缓存位置快速检查，不一致时才全屏查找
+                anchors += 1
+                x, y = item.get('coordinates', (0, 0))
+                x, y = int(x), int(y)
+                origin = (x, y)
+                color, row, samples, tolerance, wait, template = compile_check(item, x, y, base_dir, points, expected,
+                                                                              starts, tolerances)
+                if row is None and template is None:
+                    raise ValueError(f"第 {index + 1} 行：锚点需要设置颜色（特征）或模板")
+                if template is not None:
+                    template = (template[0], anchor_check_region(template[0], x, y), template[2])
+                groups.extend([anchors] * (len(points) - group_start))
+                steps.append(Step(index, x, y, color, False, 0.0, row, None, samples, tolerance, 0.0, template,
+                                  op=flow, anchor=anchors))
+                continue
+            if flow == FLOW_END_REPEAT:
+                if not repeats:
+                    raise ValueError(f"第 {index + 1} 行：重复结束没有对应的重复开始")
+                begin = repeats.pop()
+                steps[begin].target = len(steps)
+                steps.append(Step(index, 0, 0, None, False, 0.0, None, op=flow, target=begin))
+                continue
+            if not name:
+                raise ValueError(f"第 {index + 1} 行：跳转目标不能为空")
+            jumps.append((len(steps), name, index))
+            if flow == FLOW_JUMP:
+                steps.append(Step(index, 0, 0, None, False, 0.0, None, op=flow))
+                continue
+            # 条件跳转：判断坐标处的颜色（或查找模板），不点击
+            x, y = item.get('coordinates', (0, 0))
+            x, y = int(x), int(y)
+            color, row, samples, tolerance, wait, template = compile_check(item, x, y, base_dir, points, expected,
+                                                                          starts, tolerances)
+            if row is None and template is None:
+                raise ValueError(f"第 {index + 1} 行：条件跳转需要设置颜色或模板")
+            groups.extend([anchor] * (len(points) - group_start))
+            steps.append(Step(index, x, y, color, False, 0.0, row, None, samples, tolerance, wait, template, op=flow,
+                              anchor=anchor))
+            continue
+
+        click = bool(item.get('click', False))
+        delay = float(item.get('delay_time', 0) or 0) if item.get('delay', False) else 0.0
+        move = not click and bool(item.get('move', False))
+        if not click and not move and delay <= 0:
+            continue
+        x, y = item.get('coordinates', (0, 0))
+        x, y = int(x), int(y)
+        # 只有点击的项目才判断颜色
+        color, row, samples, tolerance, wait, template = None, None, (), 0.0, 0.0, None
+        if click:
+            color, row, samples, tolerance, wait, template = compile_check(item, x, y, base_dir, points, expected,
+                                                                          starts, tolerances)
+        motion = None
+        if item.get('motion') in MOTION_MODES:
+            motion = (item['motion'], float(item.get('motion_value', 0) or 0))
+        groups.extend([anchor] * (len(points) - group_start))
+        steps.append(Step(index, x, y, color, click, delay, row, motion, samples, tolerance, wait, template, move,
+                          anchor=anchor))
+
+    if repeats:
+        raise ValueError(f"第 {steps[repeats[-1]].index + 1} 行：重复开始没有对应的重复结束")
+    for position, name, index in jumps:
+        if name not in labels:
+            raise ValueError(f"第 {index + 1} 行：跳转目标 {name} 不存在")
+        steps[position].target = labels[name]
+    return Plan(tuple(steps), tuple(points), tuple(expected), tuple(starts), tuple(tolerances), tuple(groups), anchors)
@@ -0,0 +1,167 @@
+import threading
+import time
+
+import numpy as np  # 确保已安装：pip install numpy
+
+from plan import MOTION_TELEPORT
+from storage import normalize_item
+from timing import RingLog
+
+# 录制：后台线程高频采样鼠标位置和左键状态，记录点击（及其颜色）和移动轨迹，
+# 停止后把轨迹简化（Ramer-Douglas-Peucker）并转换为列表项
+
+EVENT_MOVE = "move"
+EVENT_CLICK = "click"
+
+
+class Recorder:
+    """
+    录制鼠标操作。每 interval 秒采样一次，位置变化记为移动，左键按下记为点击（同时读取该点颜色），
+    记录保存在容量为 capacity 的记录环中，录制过久时丢弃最早的记录。
+    """
+
+    def __init__(self, backend, interval=0.01, capacity=200000):
+        self.backend = backend
+        self.interval = interval
+        self.events = RingLog(capacity)
+        self.clicks = 0
+        self.errors = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        # 清除开始录制之前的按键状态（例如点击“录制”按钮本身）
+        self.backend.mouse_down()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        停止录制，返回按时间顺序的记录 (类型, 时间, x, y, 颜色)。
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        return self.events.rows()
+
+    def run(self):
+        backend = self.backend
+        events = self.events
+        last_position = None
+        was_down = backend.mouse_down()
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            try:
+                x, y = backend.position()
+                down = backend.mouse_down()
+                if down and not was_down:
+                    try:
+                        color = tuple(backend.pixel(x, y))
+                    except Exception:
+                        color = None
+                    events.append((EVENT_CLICK, now, x, y, color))
+                    self.clicks += 1
+                elif (x, y) != last_position:
+                    events.append((EVENT_MOVE, now, x, y, None))
+                last_position = (x, y)
+                was_down = down
+            except Exception:
+                self.errors += 1
+            next_time += self.interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                next_time = time.monotonic()
+
+
+def simplify_path(points, epsilon):
+    """
+    Ramer-Douglas-Peucker 折线简化：返回需要保留的点的下标（升序），
+    去掉的点到保留折线的距离都不超过 epsilon 像素。
+    """
+    count = len(points)
+    if count <= 2:
+        return list(range(count))
+    points = np.asarray(points, dtype=np.float64)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    # 用栈代替递归，长轨迹不会超出递归深度
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        segment = points[first + 1:last]
+        dx, dy = end - start
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(segment[:, 0] - start[0], segment[:, 1] - start[1])
+        else:
+            distances = np.abs(dx * (segment[:, 1] - start[1]) - dy * (segment[:, 0] - start[0])) / length
+        index = int(distances.argmax())
+        if distances[index] > epsilon:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return [int(index) for index in np.flatnonzero(keep)]
+
+
+def build_items(events, epsilon=3.0, record_moves=True, min_delay=0.05, exclude=None):
+    """
+    把录制记录转换为列表项：每次点击一项（判断录制时的颜色），两次点击之间的移动轨迹简化后每个拐点一项（只移动），
+    每项的延时为到下一项的时间间隔（小于 min_delay 的忽略）。
+    第一次点击之前和最后一次点击之后的移动不保留；exclude(x, y) 为 True 的点击（例如点在本程序窗口上）丢弃。
+    """
+    clicks = [event for event in events if event[0] == EVENT_CLICK and not (exclude and exclude(event[2], event[3]))]
+    if not clicks:
+        return []
+
+    kept = []
+    if record_moves:
+        first_time, last_time = clicks[0][1], clicks[-1][1]
+        path = []  # 上一次点击以来的移动
+        for event in events:
+            if event[1] < first_time or event[1] > last_time:
+                continue
+            if event[0] == EVENT_MOVE:
+                path.append(event)
+                continue
+            if exclude and exclude(event[2], event[3]):
+                continue
+            if path:
+                # 以上一次点击位置为起点、本次点击位置为终点简化，两个端点本身不作为移动项
+                start = kept[-1] if kept else path[0]
+                polyline = [start] + path + [event]
+                indices = simplify_path([(e[2], e[3]) for e in polyline], epsilon)
+                kept.extend(polyline[index] for index in indices[1:-1] if polyline[index][0] == EVENT_MOVE)
+                path = []
+            kept.append(event)
+    else:
+        kept = clicks
+
+    items = []
+    for position, (kind, timestamp, x, y, color) in enumerate(kept):
+        delay = kept[position + 1][1] - timestamp if position + 1 < len(kept) else 0.0
+        delay = round(delay, 2) if delay >= min_delay else 0
+        click = kind == EVENT_CLICK
+        item = {
+            "coordinates": (x, y),
+            "color": color if click else None,
+            "judge_color": click and color is not None,
+            "click": click,
+            "move": not click,
+            "delay": delay > 0,
+            "delay_time": delay,
+            "remarks": "录制" if click else "录制（移动）",
+        }
+        if record_moves:
+            # 轨迹已经逐点记录，回放时直接跳到每个点，用延时还原节奏
+            item["motion"] = MOTION_TELEPORT
+            item["motion_value"] = 0
+        items.append(normalize_item(item))
+    return items
@@ -0,0 +1,627 @@
+import contextlib
+import sys
+import threading
+import time
+
+from plan import (FLOW_ANCHOR, FLOW_END_REPEAT, FLOW_JUMP, FLOW_JUMP_IF, FLOW_REPEAT, MOTION_DURATION, Plan,
+                  color_distance, compile_plan, motion_duration)
+from timing import RESULT_ERROR, RESULT_MATCH, RESULT_MISS, RESULT_NONE, StepTimings
+
+# 判色方式：逐点读取像素；抓整屏后批量判色；只抓坐标所在区域后批量判色
+CAPTURE_PIXEL = "pixel"
+CAPTURE_FRAME = "frame"
+CAPTURE_REGION = "region"
+
+# 有时长的移动分成每段 MOVE_STEP 秒，段与段之间响应停止和暂停
+MOVE_STEP = 0.01
+
+# 延时最后一段改为让出 CPU 轮询的最短时长（秒），实际取测量到的定时器精度与它的较大者
+MIN_SPIN = 0.002
+
+
+@contextlib.contextmanager
+def timer_resolution(period=1):
+    """
+    Windows 上在 with 块内把系统定时器精度调到 period 毫秒（timeBeginPeriod），退出时恢复；
+    默认精度约 15.6 ms，不调整时 Event.wait 的超时会晚一个时钟周期。其它平台什么也不做。
+    """
+    winmm = None
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            winmm = ctypes.windll.winmm
+            if winmm.timeBeginPeriod(period) != 0:
+                winmm = None
+        except (OSError, AttributeError):
+            winmm = None
+    try:
+        yield
+    finally:
+        if winmm is not None:
+            winmm.timeEndPeriod(period)
+
+
+def measure_wait_granularity(samples=5, timeout=0.0005):
+    """
+    测量 Event.wait 实际比超时晚醒来多久（取 samples 次中最大的，秒），即当前的定时器精度。
+    """
+    event = threading.Event()
+    worst = 0.0
+    for _ in range(samples):
+        start = time.perf_counter()
+        event.wait(timeout)
+        worst = max(worst, time.perf_counter() - start - timeout)
+    return worst
+
+
+class RunnerBusy(RuntimeError):
+    """
+    执行引擎已有运行正在进行。
+    """
+
+
+class RunStats:
+    """
+    一次运行的统计：步数、点击数、耗时和单步延迟。
+    """
+
+    def __init__(self):
+        self.status = "running"
+        self.iterations = 0
+        self.steps = 0
+        self.clicks = 0
+        self.errors = 0
+        self.wait_timeouts = 0
+        self.anchor_searches = 0  # 锚点在缓存位置检查失败后重新查找的次数
+        self.elapsed = 0.0
+        self.step_time_total = 0.0
+        self.step_time_max = 0.0
+        # 延时误差：实际等待时间 - 计划等待时间
+        self.waits = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self.timer_granularity = 0.0  # 运行开始时测量的 Event.wait 精度
+
+    def record_step(self, cost):
+        self.steps += 1
+        self.step_time_total += cost
+        if cost > self.step_time_max:
+            self.step_time_max = cost
+
+    def record_wait(self, planned, actual):
+        jitter = actual - planned
+        self.waits += 1
+        self.jitter_total += jitter
+        if abs(jitter) > abs(self.jitter_max):
+            self.jitter_max = jitter
+
+    @property
+    def jitter_avg(self):
+        return self.jitter_total / self.waits if self.waits else 0.0
+
+    @property
+    def steps_per_second(self):
+        return self.steps / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def step_time_avg(self):
+        return self.step_time_total / self.steps if self.steps else 0.0
+
+    def as_dict(self):
+        return {
+            "status": self.status,
+            "iterations": self.iterations,
+            "steps": self.steps,
+            "clicks": self.clicks,
+            "errors": self.errors,
+            "wait_timeouts": self.wait_timeouts,
+            "anchor_searches": self.anchor_searches,
+            "elapsed": self.elapsed,
+            "steps_per_second": self.steps_per_second,
+            "step_time_avg": self.step_time_avg,
+            "step_time_max": self.step_time_max,
+            "waits": self.waits,
+            "jitter_avg": self.jitter_avg,
+            "jitter_max": self.jitter_max,
+            "timer_granularity": self.timer_granularity,
+        }
+
+    def jitter_summary(self):
+        return (f"延时 {self.waits} 次，平均误差 {self.jitter_avg * 1000:.2f} ms，最大误差 {self.jitter_max * 1000:.2f} ms"
+                f"（定时器精度 {self.timer_granularity * 1000:.2f} ms）")
+
+
+class DeadlineScheduler:
+    """
+    基于单调时钟截止时间的等待。
+    大部分时间阻塞在 wake_event.wait 上，停止或暂停时立即醒来；最后 spin 秒改为短暂让出 CPU 轮询，
+    spin 为 None 时取测量到的定时器精度（至少 MIN_SPIN），使 wait 不会因为定时器晚醒而超过截止时间。
+    能达到的精度取决于系统调度，每次等待的实际误差记录在 stats（jitter_avg / jitter_max）中。
+    醒来后调用 hold()：返回 None 表示停止，否则为暂停的秒数，截止时间相应顺延，继续等待剩余的时间。
+    """
+
+    def __init__(self, wake_event, stats, hold, spin=None):
+        self.wake_event = wake_event
+        self.stats = stats
+        self.hold = hold
+        if spin is None:
+            stats.timer_granularity = measure_wait_granularity()
+            spin = max(MIN_SPIN, stats.timer_granularity + 0.001)
+        self.spin = spin
+
+    def wait(self, seconds):
+        """
+        等待 seconds 秒（不含暂停的时间），被停止时返回 False。
+        """
+        start = time.perf_counter()
+        deadline = start + seconds
+        paused = 0.0
+        wake_event = self.wake_event
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            if remaining > self.spin:
+                woken = wake_event.wait(remaining - self.spin)
+            else:
+                woken = wake_event.is_set()
+                if not woken:
+                    time.sleep(0)
+            if woken:
+                held = self.hold()
+                if held is None:
+                    return False
+                deadline += held
+                paused += held
+        self.stats.record_wait(seconds, time.perf_counter() - start - paused)
+        return True
+
+
+class ActionRunner:
+    """
+    无界面的动作执行引擎。
+    所有读屏和鼠标操作都经过 backend，运行中的提示通过 on_event(kind, data) 回调发出（在执行线程中调用，回调不应阻塞）：
+    - "started"：{"steps": 每轮步数, "count": 次数（循环时为 None）}
+    - "progress"：{"step", "iteration", "steps", "steps_per_second"}，每 progress_interval 秒最多一次
+    - "error"：{"message": ..., "step": 步骤下标}
+    - "paused" / "resumed"：{"step": 暂停时所在的步骤下标}
+    - "stopped" / "finished"：{"stats": RunStats, "timings": StepTimings 或 None}
+    capture_mode 为 CAPTURE_FRAME / CAPTURE_REGION 时，画面缓存到下一轮（或 frame_ttl 秒后）才重新抓取，
+    invalidate_on_click 为 True 时每次点击后缓存失效。
+    motion_mode / motion_value 为全局移动方式（见 plan.MOTION_*），pause 为每次输入调用后的停顿（None 表示不修改后端默认值），
+    turbo 为 True 时忽略移动方式，移动和点击合并为一次输入事件。
+    timing_capacity 为逐步耗时记录保留的条数（0 表示不记录），见 timing.StepTimings。
+    锚点的偏移量缓存在 anchor_offsets 中（下标为锚点编号，None 表示尚未找到），整个运行期间保留。
+    stop()、pause_run()、resume_run() 可在任意线程中调用，延时、移动和等待颜色过程中也能在几毫秒内生效；
+    暂停停在当前步骤，继续后从该步骤（或剩余的延时、移动）接着执行，不会重新开始本轮。
+    """
+
+    def __init__(self, backend, on_event=None, motion_mode=MOTION_DURATION, motion_value=0.5, pause=None, turbo=False,
+                 capture_mode=CAPTURE_PIXEL, frame_ttl=None, invalidate_on_click=True, progress_interval=0.1,
+                 timing_capacity=50000):
+        self.backend = backend
+        self.on_event = on_event
+        self.motion_mode = motion_mode
+        self.motion_value = motion_value
+        self.pause = pause
+        self.turbo = turbo
+        self.capture_mode = capture_mode
+        self.frame_ttl = frame_ttl
+        self.invalidate_on_click = invalidate_on_click
+        self.progress_interval = progress_interval
+        self.timing_capacity = timing_capacity
+        self.timings = None
+        self.anchor_offsets = [(0, 0)]
+        self.running = False
+        self.run_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        # resume_event 清除时暂停；停止和暂停都会置位 wake_event，唤醒正在进行的延时、移动和等待
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+        self.wake_event = threading.Event()
+        self.control_lock = threading.Lock()
+        self.paused_time = 0.0
+        self.current_step = None
+
+    def emit(self, kind, **data):
+        if self.on_event is not None:
+            self.on_event(kind, data)
+
+    def stop(self):
+        with self.control_lock:
+            self.stop_event.set()
+            self.wake_event.set()
+            self.resume_event.set()
+
+    def pause_run(self):
+        with self.control_lock:
+            if self.stop_event.is_set():
+                return
+            self.resume_event.clear()
+            self.wake_event.set()
+
+    def resume_run(self):
+        with self.control_lock:
+            if not self.stop_event.is_set():
+                self.wake_event.clear()
+            self.resume_event.set()
+
+    @property
+    def paused(self):
+        return not self.resume_event.is_set()
+
+    def toggle_pause(self):
+        """
+        暂停或继续，返回切换后是否处于暂停状态。
+        """
+        if self.paused:
+            self.resume_run()
+        else:
+            self.pause_run()
+        return self.paused
+
+    def _hold(self):
+        """
+        wake_event 置位后调用：停止时返回 None；暂停时阻塞到继续或停止，返回暂停的秒数。
+        """
+        if self.stop_event.is_set():
+            return None
+        start = time.perf_counter()
+        if not self.resume_event.is_set():
+            self.emit("paused", step=self.current_step)
+            self.resume_event.wait()
+            if self.stop_event.is_set():
+                return None
+            self.emit("resumed", step=self.current_step)
+        held = time.perf_counter() - start
+        self.paused_time += held
+        return held
+
+    def _move(self, cursor, target, duration):
+        """
+        把鼠标从 cursor 移动到 target。有时长时逐段直线移动，每段之间响应停止和暂停
+        （暂停的时间不计入移动时长）。被停止时返回 False。
+        """
+        backend = self.backend
+        if duration <= 0:
+            backend.move_to(target[0], target[1])
+            return True
+        (start_x, start_y), (x, y) = cursor, target
+        begin = time.perf_counter()
+        wake_event = self.wake_event
+        while True:
+            progress = (time.perf_counter() - begin) / duration
+            if progress >= 1:
+                backend.move_to(x, y)
+                return True
+            backend.move_step(round(start_x + (x - start_x) * progress), round(start_y + (y - start_y) * progress))
+            if wake_event.wait(MOVE_STEP):
+                held = self._hold()
+                if held is None:
+                    return False
+                begin += held
+
+    def run(self, plan, loop=False, count=1, interval=1, cancel=None):
+        """
+        执行计划；传入列表项时先编译。loop 为 True 时无限循环直到停止，否则执行 count 次。
+        返回 RunStats；已有运行正在进行时抛出 RunnerBusy。
+        开始时会清除之前残留的停止请求；cancel（threading.Event）在开始前已经置位时则保留停止，
+        供调用方在准备运行期间取消（先置位 cancel 再调用 stop()，不会因为时机被 run() 清掉）。
+        """
+        if not isinstance(plan, Plan):
+            plan = compile_plan(plan)
+        # 界面和控制接口共用一个执行引擎，同一时间只允许一次运行
+        if not self.run_lock.acquire(blocking=False):
+            raise RunnerBusy("已有运行正在进行")
+        with self.control_lock:
+            self.stop_event.clear()
+            self.wake_event.clear()
+            self.resume_event.set()
+            if cancel is not None and cancel.is_set():
+                self.stop_event.set()
+                self.wake_event.set()
+        self.paused_time = 0.0
+        self.running = True
+        stats = RunStats()
+        # 每次运行新建耗时记录，运行结束后仍保留在 self.timings 中供导出
+        self.timings = StepTimings(self.timing_capacity) if self.timing_capacity else None
+        start = time.perf_counter()
+        try:
+            self.emit("started", steps=len(plan.steps), count=None if loop else count)
+            with timer_resolution():
+                finished = self._run_loop(plan, loop, count, interval, stats)
+        finally:
+            stats.elapsed = time.perf_counter() - start
+            self.running = False
+            self.run_lock.release()
+        stats.status = "finished" if finished else "stopped"
+        self.emit(stats.status, stats=stats, timings=self.timings)
+        return stats
+
+    def _build_sampler(self, plan):
+        if not plan.points:
+            return None
+        # 批量判色需要 numpy，只在使用时导入
+        from capture import FrameSampler
+
+        # 按区域抓取时由 FrameSampler 按坐标分簇，锚点移动后重新分簇
+        return FrameSampler(self.backend, plan.points, plan.expected, plan.starts, plan.tolerances,
+                            ttl=self.frame_ttl, groups=plan.groups, cluster=self.capture_mode == CAPTURE_REGION)
+
+    def _check_color(self, sampler, step, dx=0, dy=0):
+        """
+        返回颜色是否一致，读取失败时抛出异常。dx, dy 为锚点偏移量（批量判色时已由 sampler 处理）。
+        """
+        if sampler is None:
+            pixel = self.backend.pixel
+            for (x, y), color in step.samples:
+                if color_distance(pixel(x + dx, y + dy), color) > step.tolerance:
+                    return False
+            return True
+        valid, matched = sampler.match(step.row)
+        if not valid:
+            raise ValueError(f"坐标 ({step.x}, {step.y}) 不在抓取的画面内")
+        return matched
+
+    def _test(self, step, sampler, matcher, stats):
+        """
+        判断步骤的颜色（或查找模板），返回 (结果, x, y)：模板匹配时 x, y 为匹配位置的中心。
+        等待颜色时被停止返回 None。相对于锚点的步骤先加上锚点偏移量，锚点未找到时判为不匹配。
+        """
+        dx = dy = 0
+        if step.anchor:
+            offset = self.anchor_offsets[step.anchor]
+            if offset is None:
+                return RESULT_MISS, step.x, step.y
+            dx, dy = offset
+        x, y = step.x + dx, step.y + dy
+        if step.template is not None:
+            # 在提示区域内查找模板
+            template, region, threshold = step.template
+            if region is not None and (dx or dy):
+                region = (region[0] + dx, region[1] + dy, region[2] + dx, region[3] + dy)
+            try:
+                found = matcher.find(template, region, threshold)
+            except Exception as e:
+                stats.errors += 1
+                self.emit("error", message=f"查找模板失败: {e}", step=step.index)
+                return RESULT_ERROR, x, y
+            if found is None:
+                return RESULT_MISS, x, y
+            return RESULT_MATCH, found[0], found[1]
+        if step.row is None:
+            return RESULT_NONE, x, y
+        try:
+            matched = self._check_color(sampler, step, dx, dy)
+            if not matched and step.wait > 0:
+                # 等待颜色出现（只轮询目标点附近的小区域）
+                from capture import wait_for_match
+                samples = step.samples
+                if dx or dy:
+                    samples = [((px + dx, py + dy), color) for (px, py), color in samples]
+                matched = wait_for_match(self.backend, samples, step.tolerance, step.wait, self.wake_event,
+                                         hold=self._hold)
+                if matched is None:
+                    return None
+                if not matched:
+                    stats.wait_timeouts += 1
+        except Exception as e:
+            stats.errors += 1
+            self.emit("error", message=f"获取颜色失败: {e}", step=step.index)
+            return RESULT_ERROR, x, y
+        return (RESULT_MATCH if matched else RESULT_MISS), x, y
+
+    def _locate_anchor(self, step, sampler, matcher, stats):
+        """
+        定位锚点：已有缓存的偏移量时先在缓存位置检查（判色或在附近小区域查找模板），
+        不一致时才在整个屏幕上查找。找到后更新偏移量，返回判色结果；等待时被停止返回 None。
+        """
+        anchor = step.anchor
+        previous = self.anchor_offsets[anchor]
+        if previous is not None:
+            tested = self._test(step, sampler, matcher, stats)
+            if tested is None:
+                return None
+            result, x, y = tested
+            if result == RESULT_MATCH:
+                if step.template is not None:
+                    # 模板可能在检查范围内移动了几个像素
+                    self._set_anchor(anchor, x - step.x, y - step.y, sampler)
+                return RESULT_MATCH
+
+        stats.anchor_searches += 1
+        try:
+            if step.template is not None:
+                template, region, threshold = step.template
+                found = matcher.find(template, None, threshold)
+            else:
+                from capture import find_signature
+                near = (step.x + previous[0], step.y + previous[1]) if previous is not None else (step.x, step.y)
+                found = find_signature(self.backend.grab(), step.samples, step.tolerance, near)
+        except Exception as e:
+            stats.errors += 1
+            self.emit("error", message=f"查找锚点失败: {e}", step=step.index)
+            return RESULT_ERROR
+        if found is None:
+            # 找不到时相对于该锚点的步骤都跳过，下次执行到锚点时再查找
+            self.anchor_offsets[anchor] = None
+            if sampler is not None:
+                sampler.clear_offset(anchor)
+            self.emit("error", message="未找到锚点，相对于它的步骤将跳过", step=step.index)
+            return RESULT_MISS
+        self._set_anchor(anchor, found[0] - step.x, found[1] - step.y, sampler)
+        return RESULT_MATCH
+
+    def _set_anchor(self, anchor, dx, dy, sampler):
+        self.anchor_offsets[anchor] = (dx, dy)
+        if sampler is not None:
+            sampler.set_offset(anchor, dx, dy)
+
+    def _run_loop(self, plan, loop, count, interval, stats):
+        backend = self.backend
+        wake_event = self.wake_event
+        default_motion = (self.motion_mode, self.motion_value)
+        turbo = self.turbo
+        if self.pause is not None:
+            backend.set_pause(self.pause)
+        cursor = backend.position()
+        invalidate_on_click = self.invalidate_on_click
+        scheduler = DeadlineScheduler(wake_event, stats, self._hold)
+        run_start = time.perf_counter()
+        progress_interval = self.progress_interval
+        next_progress = run_start
+        sampler = None
+        if self.capture_mode in (CAPTURE_FRAME, CAPTURE_REGION):
+            sampler = self._build_sampler(plan)
+        matcher = None
+        if any(step.template is not None for step in plan.steps):
+            from template import TemplateMatcher
+            matcher = TemplateMatcher(backend, ttl=self.frame_ttl)
+        # 锚点偏移量在整个运行期间缓存，每轮执行到锚点时只在缓存位置检查一次
+        self.anchor_offsets = [(0, 0)] + [None] * plan.anchors
+        timings = self.timings
+        steps = plan.steps
+        total = len(steps)
+        # 重复块的剩余次数，按重复开始步骤的下标保存
+        counters = [0] * total if any(step.op == FLOW_REPEAT for step in steps) else None
+        while True:
+            iteration_start = time.perf_counter()
+            iteration_paused = self.paused_time
+            busy = 0.0  # 本轮各步用时和延时之和（不含暂停的时间）
+            if sampler is not None:
+                sampler.begin_pass()
+            if matcher is not None:
+                matcher.begin_pass()
+            pc = 0
+            while pc < total:
+                if wake_event.is_set():
+                    # 停止，或在下一步开始之前暂停
+                    self.current_step = steps[pc].index
+                    if self._hold() is None:
+                        return False
+
+                step = steps[pc]
+                pc += 1
+                self.current_step = step.index
+                step_start = time.perf_counter()
+                paused_before = self.paused_time
+                if step_start >= next_progress:
+                    # 进度按时间节流，避免每步都发事件
+                    next_progress = step_start + progress_interval
+                    elapsed = step_start - run_start
+                    self.emit("progress", step=step.index, iteration=stats.iterations + 1, steps=stats.steps,
+                              steps_per_second=stats.steps / elapsed if elapsed > 0 else 0.0)
+
+                result = RESULT_NONE
+                check_time = move_time = click_time = 0.0
+                op = step.op
+                if op is not None:
+                    # 流程控制：跳转下标已在编译时解析
+                    current = pc - 1
+                    if op == FLOW_REPEAT:
+                        counters[current] = step.count
+                        if step.count <= 0:
+                            pc = step.target + 1
+                    elif op == FLOW_END_REPEAT:
+                        begin = step.target
+                        counters[begin] -= 1
+                        if counters[begin] > 0:
+                            pc = begin + 1
+                    elif op == FLOW_JUMP:
+                        pc = step.target
+                    elif op == FLOW_ANCHOR:
+                        result = self._locate_anchor(step, sampler, matcher, stats)
+                        if result is None:
+                            return False
+                        check_time = time.perf_counter() - step_start
+                    else:
+                        tested = self._test(step, sampler, matcher, stats)
+                        if tested is None:
+                            return False
+                        result = tested[0]
+                        if result != RESULT_ERROR and (result == RESULT_MATCH) == (op == FLOW_JUMP_IF):
+                            pc = step.target
+                        check_time = time.perf_counter() - step_start
+                    if pc <= current:
+                        # 向回跳转（重试、循环）时重新抓取画面，否则会一直判断同一帧
+                        if sampler is not None:
+                            sampler.begin_pass()
+                        if matcher is not None:
+                            matcher.begin_pass()
+                elif step.click:
+                    tested = self._test(step, sampler, matcher, stats)
+                    if tested is None:
+                        return False
+                    result, x, y = tested
+                    check_end = time.perf_counter()
+                    check_time = check_end - step_start
+
+                    if result == RESULT_NONE or result == RESULT_MATCH:
+                        try:
+                            target = (x, y)
+                            if turbo:
+                                backend.click_at(x, y)
+                                click_time = time.perf_counter() - check_end
+                            else:
+                                # 移动鼠标到坐标
+                                mode, value = step.motion or default_motion
+                                if not self._move(cursor, target, motion_duration(mode, value, cursor, target)):
+                                    return False
+                                move_end = time.perf_counter()
+                                move_time = move_end - check_end - (self.paused_time - paused_before)
+                                backend.click()
+                                click_time = time.perf_counter() - move_end
+                            cursor = target
+                            stats.clicks += 1
+                            # 点击通常会改变画面
+                            if invalidate_on_click:
+                                if sampler is not None:
+                                    sampler.invalidate()
+                                if matcher is not None:
+                                    matcher.invalidate()
+                        except Exception as e:
+                            result = RESULT_ERROR
+                            stats.errors += 1
+                            self.emit("error", message=f"点击失败: {e}", step=step.index)
+                elif step.move:
+                    # 只移动不点击（录制的移动轨迹、悬停菜单等）
+                    try:
+                        offset = self.anchor_offsets[step.anchor]
+                        if offset is None:
+                            result = RESULT_MISS
+                        else:
+                            target = (step.x + offset[0], step.y + offset[1])
+                            mode, value = step.motion or default_motion
+                            if not self._move(cursor, target, motion_duration(mode, value, cursor, target)):
+                                return False
+                            move_time = time.perf_counter() - step_start - (self.paused_time - paused_before)
+                            cursor = target
+                    except Exception as e:
+                        result = RESULT_ERROR
+                        stats.errors += 1
+                        self.emit("error", message=f"移动失败: {e}", step=step.index)
+
+                step_end = time.perf_counter()
+                cost = step_end - step_start - (self.paused_time - paused_before)
+                stats.record_step(cost)
+
+                # 不匹配或出错时跳过本步的延时
+                delay = step.delay if result == RESULT_NONE or result == RESULT_MATCH else 0
+                paused_before = self.paused_time
+                finished = not delay or scheduler.wait(delay)
+                delay_actual = time.perf_counter() - step_end - (self.paused_time - paused_before) if delay else 0.0
+                busy += cost + delay_actual
+                if timings is not None:
+                    timings.record_step(stats.iterations, step.index, step_start - run_start, cost, check_time, result,
+                                        move_time, click_time, delay, delay_actual)
+                if not finished:
+                    return False
+
+            stats.iterations += 1
+            if timings is not None:
+                duration = time.perf_counter() - iteration_start - (self.paused_time - iteration_paused)
+                timings.record_iteration(stats.iterations - 1, iteration_start - run_start, duration, duration - busy)
+            if not loop and count and stats.iterations >= count:
+                return True
+            if not scheduler.wait(interval):
+                return False
@@ -0,0 +1,40 @@
+import json
+import os
+import secrets
+
+# 设置文件：界面和命令行共用，不依赖 tkinter
+
+# 默认配置文件目录
+DEFAULT_CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".tkinter_app")
+SETTINGS_FILE = "settings.json"
+ITEMS_FILE = "items.json"
+
+
+def read_settings(path=None):
+    """
+    读取设置文件（默认为默认配置目录中的 settings.json），不存在时返回空字典，格式错误时抛出异常。
+    """
+    path = path or os.path.join(DEFAULT_CONFIG_DIR, SETTINGS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def new_control_token():
+    return secrets.token_urlsafe(24)
+
+
+def ensure_control_token(path=None):
+    """
+    返回设置文件中的本地控制接口令牌（control_token），没有时生成一个并写回设置文件。
+    """
+    path = path or os.path.join(DEFAULT_CONFIG_DIR, SETTINGS_FILE)
+    settings = read_settings(path)
+    token = settings.get("control_token")
+    if not token:
+        token = settings["control_token"] = new_control_token()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, ensure_ascii=False, indent=4)
+    return token
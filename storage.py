@@ -0,0 +1,412 @@
+import json
+import os
+import threading
+import time
+
+# 存储格式：整份 JSON（items.json），或快照 + 追加日志
+FORMAT_JSON = "json"
+FORMAT_JOURNAL = "journal"
+
+# 快照的数据版本，版本一致时加载不再逐项补全缺失字段
+SCHEMA_VERSION = 1
+
+# 每个列表项应包含的字段及默认值
+ITEM_DEFAULTS = {
+    'coordinates': (0, 0),
+    'color': None,
+    'judge_color': True,  # 默认为是
+    'click': False,
+    'delay': False,
+    'delay_time': 0,
+    'remarks': "",
+}
+
+
+def normalize_item(item):
+    # 确保每个项目包含所有键
+    for key, default in ITEM_DEFAULTS.items():
+        if key not in item:
+            item[key] = default
+    return item
+
+
+def apply_ops(items, ops):
+    """
+    把编辑操作应用到列表上。操作格式：
+    ("insert", index, item) / ("delete", index) / ("set", index, item) / ("move", from_index, to_index)
+    """
+    for op in ops:
+        kind = op[0]
+        if kind == "insert":
+            items.insert(op[1], op[2])
+        elif kind == "delete":
+            del items[op[1]]
+        elif kind == "set":
+            items[op[1]] = op[2]
+        elif kind == "move":
+            items.insert(op[2], items.pop(op[1]))
+        else:
+            raise ValueError(f"未知的编辑操作: {kind}")
+    return items
+
+
+def write_json_atomic(path, data, indent=4):
+    """
+    先写入临时文件再原子替换，写入过程中崩溃不会截断原文件。
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_items_json(path):
+    """
+    读取 items.json（列表格式），逐项补全缺失字段。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError(f"{path} 不是项目列表")
+    for item in items:
+        normalize_item(item)
+    return items
+
+
+def read_journal(snapshot_path, journal_path):
+    """
+    读取快照并重放日志，返回 (items, 最后的序号, 日志条数)。
+    """
+    items, snapshot_seq = [], 0
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        items = snapshot["items"]
+        snapshot_seq = snapshot.get("seq", 0)
+        if snapshot.get("version") != SCHEMA_VERSION:
+            for item in items:
+                normalize_item(item)
+
+    seq = snapshot_seq
+    journal_length = 0
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 写入中途崩溃留下的不完整记录
+                    break
+                journal_length += 1
+                # 快照已包含的记录（压缩后尚未清空日志时崩溃）跳过
+                if record[0] <= snapshot_seq:
+                    continue
+                apply_ops(items, [record[1:]])
+                seq = record[0]
+    return items, seq, journal_length
+
+
+def script_paths(base):
+    """
+    返回一个脚本可能用到的所有文件：(JSON 文件, 快照文件, 日志文件)。
+    """
+    return f"{base}.json", f"{base}.snapshot.json", f"{base}.journal"
+
+
+def saved_format(base):
+    """
+    返回脚本最近一次保存使用的格式（按文件修改时间判断），没有任何文件时返回 None。
+    """
+    json_path, snapshot_path, journal_path = script_paths(base)
+    mtimes = {}
+    for storage_format, path in ((FORMAT_JSON, json_path), (FORMAT_JOURNAL, snapshot_path), (FORMAT_JOURNAL, journal_path)):
+        if os.path.exists(path):
+            mtimes[storage_format] = max(mtimes.get(storage_format, 0), os.path.getmtime(path))
+    if not mtimes:
+        return None
+    return max(mtimes, key=mtimes.get)
+
+
+def read_script(base):
+    """
+    不创建存储对象直接读取脚本内容，按最近一次保存的格式读取。
+    """
+    json_path, snapshot_path, journal_path = script_paths(base)
+    storage_format = saved_format(base)
+    if storage_format == FORMAT_JOURNAL:
+        return read_journal(snapshot_path, journal_path)[0]
+    if storage_format == FORMAT_JSON:
+        return read_items_json(json_path)
+    return []
+
+
+class BackgroundWriter:
+    """
+    后台写盘线程的公共部分：调用方在 self.cond 下登记待写内容并调用 _touch()，
+    连续的登记在 delay 秒内合并，由后台线程调用 _take() 取出、_write() 写入。
+    flush() 等待所有待写内容落盘，close() 在退出前调用。
+    写入失败时调用 on_error(path, exception)（在后台线程中）。
+    """
+
+    def __init__(self, delay=0.3, on_error=None):
+        self.delay = delay
+        self.on_error = on_error
+        self.deadline = 0.0
+        self.writing = False
+        self.closed = False
+        self.writes = 0
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def _has_pending(self):
+        raise NotImplementedError
+
+    def _take(self):
+        raise NotImplementedError
+
+    def _write(self, batch):
+        raise NotImplementedError
+
+    def _touch(self):
+        # 在 self.cond 下调用
+        self.deadline = time.monotonic() + self.delay
+        self.cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        立即写入所有待写内容并等待完成，超时返回 False。
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            self.deadline = 0.0
+            self.cond.notify_all()
+            while self._has_pending() or self.writing:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def close(self):
+        self.flush()
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while not self.closed:
+                    if self._has_pending():
+                        remaining = self.deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+                    else:
+                        self.cond.wait()
+                if self.closed and not self._has_pending():
+                    return
+                batch = self._take()
+                self.writing = True
+
+            try:
+                self._write(batch)
+            finally:
+                with self.cond:
+                    self.writing = False
+                    self.cond.notify_all()
+
+
+class ItemsWriter(BackgroundWriter):
+    """
+    整份写入 items.json：schedule() 只登记待写内容，连续的修改合并为一次写入。
+    """
+
+    def __init__(self, delay=0.3, on_error=None):
+        self.pending = {}  # path -> 待写入的列表
+        super().__init__(delay, on_error)
+
+    def schedule(self, path, items):
+        with self.cond:
+            # 浅拷贝列表，之后的增删不会影响本次写入
+            self.pending[path] = list(items)
+            self._touch()
+
+    def _has_pending(self):
+        return bool(self.pending)
+
+    def _take(self):
+        batch = self.pending
+        self.pending = {}
+        return batch
+
+    def _write(self, batch):
+        for path, items in batch.items():
+            try:
+                write_json_atomic(path, items)
+                self.writes += 1
+            except RuntimeError:
+                # 写入时列表项正被界面线程修改，稍后重试（已有更新的内容时以新内容为准）
+                with self.cond:
+                    self.pending.setdefault(path, items)
+                    self._touch()
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(path, e)
+
+
+class JsonStore:
+    """
+    整份 JSON 存储（items.json），每次修改都重写整个文件。
+    """
+
+    format = FORMAT_JSON
+
+    def __init__(self, base, on_error=None):
+        self.base = base
+        self.path = f"{base}.json"
+        self.writer = ItemsWriter(on_error=on_error)
+
+    def load(self):
+        # 之前用日志格式保存时读取快照和日志
+        return read_script(self.base)
+
+    def record(self, ops, items):
+        self.writer.schedule(self.path, items)
+
+    def replace(self, items):
+        self.writer.schedule(self.path, items)
+
+    def flush(self, timeout=None):
+        return self.writer.flush(timeout)
+
+    def close(self):
+        self.writer.close()
+
+
+class JournalStore(BackgroundWriter):
+    """
+    快照 + 追加日志存储，每次修改只在日志末尾追加几行紧凑记录。
+    - {base}.snapshot.json：{"version": 数据版本, "seq": 已包含的最后一条日志序号, "items": [...]}
+    - {base}.journal：每行一条 [序号, 操作, 参数...]
+    日志条数超过 compact_threshold 时，后台线程把当前列表写成新快照并清空日志。
+    {base}.json 比快照和日志更新时（之前用 JSON 格式保存）从它导入。
+    """
+
+    format = FORMAT_JOURNAL
+
+    def __init__(self, base, on_error=None, delay=0.3, compact_threshold=2000):
+        self.base = base
+        self.legacy_path, self.snapshot_path, self.journal_path = script_paths(base)
+        self.compact_threshold = compact_threshold
+        self.seq = 0
+        self.journal_length = 0
+        self.pending_ops = []
+        self.latest = None  # 与 pending_ops 对应的列表快照（浅拷贝）
+        self.force_compact = False
+        # 上次写入失败：日志可能缺少记录，下次写入（或关闭时）直接从 latest 写完整快照
+        self.retry_snapshot = False
+        self.compactions = 0
+        super().__init__(delay, on_error)
+
+    def load(self):
+        with self.cond:
+            if saved_format(self.base) != FORMAT_JSON:
+                items, self.seq, self.journal_length = read_journal(self.snapshot_path, self.journal_path)
+            else:
+                # 最近一次以 JSON 格式保存，导入后写成快照
+                items = read_items_json(self.legacy_path)
+                self.seq, self.journal_length = 0, 0
+                self.force_compact = True
+
+            if self.force_compact:
+                self.latest = list(items)
+                self._touch()
+            return items
+
+    def record(self, ops, items):
+        with self.cond:
+            for op in ops:
+                self.seq += 1
+                self.pending_ops.append([self.seq, *op])
+            self.latest = list(items)
+            self._touch()
+
+    def replace(self, items):
+        # 整体替换（导入、手动保存）时直接写新快照
+        with self.cond:
+            self.latest = list(items)
+            self.force_compact = True
+            self._touch()
+
+    def _has_pending(self):
+        return bool(self.pending_ops) or self.force_compact
+
+    def _take(self):
+        batch = (self.pending_ops, self.latest, self.seq, self.force_compact or self.retry_snapshot)
+        self.pending_ops = []
+        self.force_compact = False
+        self.retry_snapshot = False
+        return batch
+
+    def _write(self, batch):
+        ops, latest, seq, force_compact = batch
+        try:
+            # 要写完整快照时快照已包含这些记录，不必再追加
+            if ops and not force_compact:
+                try:
+                    lines = "".join(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + "\n" for op in ops)
+                except RuntimeError:
+                    # 序列化时列表项正被界面线程修改，放回队列稍后重试
+                    with self.cond:
+                        self.pending_ops[:0] = ops
+                        self.force_compact = self.force_compact or force_compact
+                        self._touch()
+                    return
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.journal_length += len(ops)
+                self.writes += 1
+            if force_compact or self.journal_length >= self.compact_threshold:
+                try:
+                    self.compact(latest, seq)
+                except RuntimeError:
+                    with self.cond:
+                        self.force_compact = True
+                        self._touch()
+        except Exception as e:
+            # 记录没有写进日志（或只写了一部分），之后按序号追加的记录会建立在缺失的记录上
+            with self.cond:
+                self.retry_snapshot = True
+            if self.on_error is not None:
+                self.on_error(self.journal_path, e)
+
+    def close(self):
+        # 之前写入失败时，退出前再尝试写一次完整快照
+        with self.cond:
+            if self.retry_snapshot:
+                self.force_compact = True
+        super().close()
+
+    def compact(self, items, seq):
+        # 先原子写入快照，再清空日志；两步之间崩溃时依靠序号跳过重复记录
+        write_json_atomic(self.snapshot_path, {"version": SCHEMA_VERSION, "seq": seq, "items": items}, indent=None)
+        with open(self.journal_path, 'w', encoding='utf-8'):
+            pass
+        self.journal_length = 0
+        self.compactions += 1
+
+
+def open_store(base, storage_format, on_error=None):
+    """
+    按存储格式创建存储对象，base 为不带扩展名的路径。
+    """
+    if storage_format == FORMAT_JOURNAL:
+        return JournalStore(base, on_error=on_error)
+    return JsonStore(base, on_error=on_error)
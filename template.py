@@ -0,0 +1,193 @@
+import os
+
+import numpy as np  # 确保已安装：pip install numpy
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 模板（图片）查找：模板预处理为灰度图像金字塔并缓存，先在最粗的一层全范围匹配，
+# 再逐层放大，只在候选位置附近精确匹配
+
+# 金字塔最粗一层模板的最小边长
+MIN_TEMPLATE_SIZE = 8
+MAX_LEVELS = 4
+# 最粗一层保留的候选位置数
+CANDIDATES = 3
+
+
+def to_gray(array):
+    """
+    RGB 数组转为 float32 灰度图。
+    """
+    array = np.asarray(array, dtype=np.float32)
+    if array.ndim == 2:
+        return array
+    return array[..., 0] * 0.299 + array[..., 1] * 0.587 + array[..., 2] * 0.114
+
+
+def downsample(gray):
+    # 2x2 取平均，缩小一半
+    height, width = gray.shape[0] // 2 * 2, gray.shape[1] // 2 * 2
+    gray = gray[:height, :width]
+    return (gray[0::2, 0::2] + gray[1::2, 0::2] + gray[0::2, 1::2] + gray[1::2, 1::2]) * 0.25
+
+
+def build_pyramid(gray, levels):
+    pyramid = [gray]
+    for _ in range(levels - 1):
+        pyramid.append(downsample(pyramid[-1]))
+    return pyramid
+
+
+def match_scores(image, templ):
+    """
+    归一化互相关（NCC）得分图，scores[y, x] 为模板左上角放在 (x, y) 时的相似度（-1 ~ 1）。
+    """
+    h, w = templ.shape
+    if image.shape[0] < h or image.shape[1] < w:
+        return np.full((0, 0), -1.0, dtype=np.float32)
+    t = templ - templ.mean()
+    t_norm = np.sqrt(np.square(t).sum())
+    # 积分图求每个窗口的和与平方和
+    integral = np.pad(image, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    integral_sq = np.pad(np.square(image), ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+
+    def window_sum(table):
+        return table[h:, w:] - table[:-h, w:] - table[h:, :-w] + table[:-h, :-w]
+
+    n = h * w
+    sums = window_sum(integral)
+    variance = window_sum(integral_sq) - np.square(sums) / n
+    numerator = np.einsum('ijkl,kl->ij', sliding_window_view(image, (h, w)), t)
+    denominator = np.sqrt(np.maximum(variance, 0)) * t_norm
+    scores = np.where(denominator > 1e-6, numerator / np.maximum(denominator, 1e-6), 0.0)
+    return scores.astype(np.float32)
+
+
+class Template:
+    """
+    预处理后的模板：灰度图像金字塔。
+    """
+
+    def __init__(self, array, key=None):
+        gray = to_gray(array)
+        levels = 1
+        size = min(gray.shape)
+        while levels < MAX_LEVELS and size // 2 >= MIN_TEMPLATE_SIZE:
+            size //= 2
+            levels += 1
+        self.key = key
+        self.width = gray.shape[1]
+        self.height = gray.shape[0]
+        self.levels = levels
+        self.pyramid = build_pyramid(gray, levels)
+
+
+# 路径 -> (修改时间, Template)
+_template_cache = {}
+
+
+def load_template(path):
+    """
+    读取模板图片，按路径和修改时间缓存预处理结果。
+    """
+    from PIL import Image  # 确保已安装：pip install pillow
+
+    mtime = os.path.getmtime(path)
+    cached = _template_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with Image.open(path) as image:
+        template = Template(np.asarray(image.convert("RGB")), key=path)
+    _template_cache[path] = (mtime, template)
+    return template
+
+
+def find_in_frame(pyramid, template, threshold):
+    """
+    在画面金字塔中查找模板，返回 (left, top, score)（画面内坐标）或 None。
+    """
+    levels = min(template.levels, len(pyramid))
+    top_level = levels - 1
+    scores = match_scores(pyramid[top_level], template.pyramid[top_level])
+    if scores.size == 0:
+        return None
+
+    # 最粗一层取得分最高的几个位置作为候选
+    flat = scores.ravel()
+    count = min(CANDIDATES, flat.size)
+    candidates = np.argpartition(flat, -count)[-count:]
+    best = None
+    for candidate in candidates:
+        y, x = divmod(int(candidate), scores.shape[1])
+        score = float(scores[y, x])
+        for level in range(top_level - 1, -1, -1):
+            # 放大到下一层，在附近 ±2 像素内精确匹配
+            image = pyramid[level]
+            templ = template.pyramid[level]
+            x, y = x * 2, y * 2
+            left, top = max(x - 2, 0), max(y - 2, 0)
+            right = min(x + 2 + templ.shape[1], image.shape[1])
+            bottom = min(y + 2 + templ.shape[0], image.shape[0])
+            local = match_scores(image[top:bottom, left:right], templ)
+            if local.size == 0:
+                score = -1.0
+                break
+            dy, dx = np.unravel_index(int(local.argmax()), local.shape)
+            x, y = left + int(dx), top + int(dy)
+            score = float(local[dy, dx])
+        if best is None or score > best[2]:
+            best = (x, y, score)
+    if best is None or best[2] < threshold:
+        return None
+    return best
+
+
+class TemplateMatcher:
+    """
+    在抓取的画面中查找模板。同一块区域在画面有效期内只抓取一次，
+    画面金字塔和查找结果按画面缓存，同一画面内重复查找不再计算。
+    """
+
+    def __init__(self, backend, ttl=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.frames = {}   # 区域 -> (画面, 金字塔)
+        self.results = {}  # (区域, 模板, 阈值) -> 结果
+        self.grabs = 0
+        self.searches = 0
+
+    def invalidate(self):
+        self.frames.clear()
+        self.results.clear()
+
+    def begin_pass(self):
+        if self.ttl is None:
+            self.invalidate()
+
+    def frame_for(self, region):
+        cached = self.frames.get(region)
+        if cached is not None and (self.ttl is None or cached[0].age <= self.ttl):
+            return cached
+        if cached is not None:
+            # 画面过期，丢弃基于它的查找结果
+            self.results = {key: value for key, value in self.results.items() if key[0] != region}
+        frame = self.backend.grab(region)
+        self.grabs += 1
+        cached = (frame, build_pyramid(to_gray(frame.array), MAX_LEVELS))
+        self.frames[region] = cached
+        return cached
+
+    def find(self, template, region=None, threshold=0.9):
+        """
+        在 region（None 为整屏）中查找模板，返回模板中心的屏幕坐标 (x, y, score) 或 None。
+        """
+        frame, pyramid = self.frame_for(region)
+        key = (region, template.key or id(template), threshold)
+        if key in self.results:
+            return self.results[key]
+        self.searches += 1
+        found = find_in_frame(pyramid, template, threshold)
+        if found is not None:
+            left, top, score = found
+            found = (frame.left + left + template.width // 2, frame.top + top + template.height // 2, score)
+        self.results[key] = found
+        return found
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# 模块都在仓库根目录（与 main.py 同级），测试直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import VirtualScreenBackend  # noqa: E402
+
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+
+
+def record_click(backend, position):
+    backend.clicked.append(position)
+
+
+@pytest.fixture
+def screen():
+    """
+    320x240 的黑色虚拟屏幕，screen.clicked 按顺序记录点击位置。
+    """
+    backend = VirtualScreenBackend(320, 240, on_click=record_click)
+    backend.clicked = []
+    return backend
+
+
+def item(x, y, click=True, color=None, judge_color=False, delay_time=0, **kwargs):
+    """
+    构造一个完整的列表项（与界面新增的项目字段相同）。
+    """
+    return dict({"coordinates": (x, y), "color": color, "judge_color": judge_color, "click": click,
+                 "delay": delay_time > 0, "delay_time": delay_time, "remarks": ""}, **kwargs)
+
+
+def run_in_thread(runner, items, **kwargs):
+    """
+    在线程中运行，等 runner.running 置位后返回 (线程, 结果字典)；运行结束后结果字典中有 "stats"。
+    """
+    import threading
+    import time
+
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(stats=runner.run(items, **kwargs)), daemon=True)
+    thread.start()
+    while not runner.running and thread.is_alive():
+        time.sleep(0.001)
+    return thread, result
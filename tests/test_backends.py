@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from backends import PyAutoGUIBackend, VirtualScreenBackend
+
+
+@pytest.mark.parametrize("bbox, expected", [
+    ((10, 10, 20, 25), (10, 15, 10, 10)),
+    ((-30, -30, -10, -10), (0, 0, 0, 0)),
+    ((150, 60, 200, 80), (0, 0, 100, 50)),
+    ((-5, 40, 10, 80), (10, 10, 0, 40)),
+])
+def test_virtual_grab_clamps_bbox(bbox, expected):
+    frame = VirtualScreenBackend(100, 50).grab(bbox)
+    assert (frame.width, frame.height, frame.left, frame.top) == expected
+
+
+class FakeScreenCapture:
+    """
+    代替 mss：主屏 100x50，左侧副屏 40x30（坐标为负），记录每次抓取的区域。
+    """
+
+    monitors = [{"left": -40, "top": 0, "width": 140, "height": 50},
+                {"left": 0, "top": 0, "width": 100, "height": 50},
+                {"left": -40, "top": 0, "width": 40, "height": 30}]
+
+    def __init__(self):
+        self.regions = []
+
+    def grab(self, monitor):
+        self.regions.append(monitor)
+        shot = np.zeros((monitor["height"], monitor["width"], 4), dtype=np.uint8)
+        shot[..., :3] = (3, 2, 1)  # BGR
+        return shot
+
+
+def test_pyautogui_grab_captures_only_the_region():
+    backend = PyAutoGUIBackend()
+    backend.local.sct = sct = FakeScreenCapture()
+    frame = backend.grab((-10, 20, 10, 60))
+    assert sct.regions == [{"left": -10, "top": 20, "width": 20, "height": 30}]
+    assert backend.pixel(5, 45) == (1, 2, 3)
+    # 副屏下方的空白和屏幕外的坐标都是错误，而不是黑色
+    colors, valid = frame.lookup([-5, 5, 5], [25, 25, 55])
+    assert valid.tolist() == [True, True, False]
+    with pytest.raises(ValueError):
+        frame.pixel(-5, 40)
+    with pytest.raises(ValueError):
+        backend.pixel(200, 10)
@@ -0,0 +1,61 @@
+import random
+
+from bulk import edit_ops, move_ops, move_target, moved_range
+from storage import apply_ops
+
+
+def test_move_ops_any_distance():
+    rng = random.Random(0)
+    for _ in range(2000):
+        size = rng.randrange(1, 30)
+        items = list(range(size))
+        selected = sorted(rng.sample(range(size), rng.randrange(1, size + 1)))
+        target = rng.randrange(size + 1)
+        rest = [item for item in items if item not in selected]
+        position = target - sum(1 for index in selected if index < target)
+        apply_ops(items, move_ops(selected, target))
+        assert items == rest[:position] + selected + rest[position:]
+        assert [items[index] for index in moved_range(selected, target)] == selected
+
+
+def test_move_ops_skip_items_in_place():
+    assert move_ops([2, 3], 2) == []
+    assert move_ops([0], 0) == []
+
+
+def test_move_target():
+    rng = random.Random(1)
+    for _ in range(1000):
+        size = rng.randrange(1, 30)
+        selected = sorted(rng.sample(range(size), rng.randrange(1, size + 1)))
+        start = rng.randrange(size)
+        target = move_target(selected, start, size)
+        assert moved_range(selected, target)[0] == min(start, size - len(selected))
+
+
+def test_edit_ops():
+    items = [
+        {"coordinates": (0, 0), "remarks": "登录按钮", "click": False},
+        {"flow": "anchor", "coordinates": (10, 10)},
+        {"coordinates": (1, 1), "relative": True, "remarks": "按钮"},
+        {"coordinates": (2, 2), "remarks": "其它", "click": True},
+    ]
+    ops = edit_ops(items, [0, 1, 2, 3], 5, -5, {"click": True}, "按钮", "图标")
+    changed = {index: item for _, index, item in ops}
+    assert changed[0] == {"coordinates": (5, -5), "remarks": "登录图标", "click": True}
+    assert changed[1]["coordinates"] == (15, 5)
+    # 锚点一起平移时相对坐标不变
+    assert changed[2]["coordinates"] == (1, 1) and changed[2]["remarks"] == "图标"
+    assert changed[3]["coordinates"] == (7, -3)
+    # 原项目不被修改
+    assert items[0]["coordinates"] == (0, 0)
+
+
+def test_edit_ops_relative_without_anchor_selected():
+    items = [{"flow": "anchor", "coordinates": (10, 10)}, {"coordinates": (1, 1), "relative": True}]
+    assert edit_ops(items, [1], 2, 3) == [("set", 1, {"coordinates": (3, 4), "relative": True})]
+
+
+def test_edit_ops_without_changes():
+    items = [{"coordinates": (0, 0), "click": True, "remarks": ""}]
+    assert edit_ops(items, [0], fields={"click": True}, find="x", replace="y") == []
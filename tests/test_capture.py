@@ -0,0 +1,48 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backends import VirtualScreenBackend
+from capture import Frame, cluster_regions, find_signature, screen_mask, wait_for_match
+
+
+def test_frame_lookup_marks_points_outside():
+    array = np.zeros((4, 6, 3), dtype=np.uint8)
+    array[1, 2] = (255, 0, 0)
+    frame = Frame(array, left=10, top=20)
+    colors, valid = frame.lookup([12, 9, 16], [21, 21, 20])
+    assert valid.tolist() == [True, False, False]
+    assert tuple(colors[0]) == (255, 0, 0)
+    assert frame.pixel(12, 21) == (255, 0, 0)
+
+
+def test_cluster_regions_split_at_gaps():
+    points = [(0, 0), (10, 5), (500, 0), (505, 8)]
+    assert cluster_regions(points) == [(0, 0, 11, 6), (500, 0, 506, 9)]
+    assert cluster_regions([(0, 0), (300, 0), (600, 0)], max_regions=2) == [(0, 0, 601, 1)]
+    assert cluster_regions([]) == []
+
+
+def test_wait_for_match():
+    screen = VirtualScreenBackend(64, 48)
+    stop_event = threading.Event()
+    samples = [((5, 5), (255, 0, 0))]
+    assert wait_for_match(screen, samples, 0, 0.05, stop_event) is False
+    threading.Timer(0.05, screen.set_pixel, (5, 5, (255, 0, 0))).start()
+    assert wait_for_match(screen, samples, 0, 5, stop_event) is True
+    stop_event.set()
+    assert wait_for_match(screen, [((6, 6), (255, 0, 0))], 0, 5, stop_event) is None
+
+
+def test_screen_mask_marks_gaps_between_screens():
+    # 两个屏幕：主屏 100x50，右侧副屏 60x30，副屏下方是空白
+    screens = [(0, 0, 100, 50), (100, 0, 160, 30)]
+    assert screen_mask(screens, (10, 10, 90, 40)) is None
+    mask = screen_mask(screens, (90, 20, 120, 40))
+    frame = Frame(np.full((20, 30, 3), 7, dtype=np.uint8), left=90, top=20, mask=mask)
+    colors, valid = frame.lookup([95, 110, 110], [35, 25, 35])
+    assert valid.tolist() == [True, True, False]
+    with pytest.raises(ValueError):
+        frame.pixel(110, 35)
+    assert find_signature(frame, [((0, 0), (7, 7, 7)), ((0, 1), (7, 7, 7))], 0, near=(110, 39)) == (110, 28)
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+import cli
+
+
+def write_script(config_dir, name, items):
+    (config_dir / f"{name}.json").write_text(json.dumps(items), encoding="utf-8")
+
+
+def test_list_and_validate(tmp_path, capsys):
+    write_script(tmp_path, "demo", [{"coordinates": [1, 2], "click": True}])
+    assert cli.main(["--config-dir", str(tmp_path), "list"]) == cli.EXIT_OK
+    assert capsys.readouterr().out.split() == ["demo", "1"]
+    assert cli.main(["--config-dir", str(tmp_path), "validate", "demo"]) == cli.EXIT_OK
+    assert cli.main(["--config-dir", str(tmp_path), "validate", "missing"]) == cli.EXIT_ERROR
+
+
+def test_run_on_virtual_backend(tmp_path, capsys):
+    write_script(tmp_path, "demo", [{"coordinates": [1, 2], "click": True},
+                                    {"coordinates": [5000, 5000], "click": True}])
+    code = cli.main(["--config-dir", str(tmp_path), "run", "demo", "--backend", "virtual", "--count", "2",
+                     "--interval", "0", "--motion-duration", "0", "--pause", "0", "--json"])
+    assert code == cli.EXIT_RUN_ERRORS
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["clicks"] == 2 and summary["errors"] == 2
+
+
+def test_time_limit_stops_loop(tmp_path, capsys):
+    write_script(tmp_path, "demo", [{"coordinates": [1, 2], "click": True}])
+    code = cli.main(["--config-dir", str(tmp_path), "run", "demo", "--backend", "virtual", "--loop",
+                     "--interval", "0.01", "--time-limit", "0.2", "--motion-duration", "0", "--pause", "0", "--json"])
+    assert code == cli.EXIT_STOPPED
+    assert json.loads(capsys.readouterr().out)["time_limit_reached"]
+
+
+def test_validate_does_not_import_heavy_modules(tmp_path):
+    write_script(tmp_path, "demo", [{"coordinates": [1, 2], "click": True}])
+    code = ("import sys, cli; cli.main(['--config-dir', sys.argv[1], 'validate', 'demo']); "
+            "print(sorted(m for m in ('numpy', 'tkinter', 'pyautogui') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code, str(tmp_path)], cwd=os.path.dirname(cli.__file__),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,107 @@
+import http.client
+import json
+import time
+
+import pytest
+
+import control
+from control import ControlServer
+from plan import MOTION_TELEPORT
+from runner import ActionRunner
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def server(tmp_path, screen):
+    (tmp_path / "items.json").write_text(json.dumps([{"coordinates": [1, 1], "click": True}]), encoding='utf-8')
+    runner = ActionRunner(screen, motion_mode=MOTION_TELEPORT, pause=0, timing_capacity=0)
+    server = ControlServer(runner, str(tmp_path), port=0, token=TOKEN)
+    server.start()
+    server.screen = screen
+    yield server
+    runner.stop()
+    server.close()
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    if headers is None:
+        headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    connection.request(method, path, json.dumps(body) if body is not None else None, headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read() or b"null")
+
+
+def wait_for(predicate, timeout=3):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+def test_run_queued_script(server):
+    status, run = request(server, "POST", "/runs", {"script": "items", "count": 2, "interval": 0})
+    assert status == 202
+    wait_for(lambda: request(server, "GET", f"/runs/{run['id']}")[1]["status"] == "finished")
+    assert server.screen.clicked == [(1, 1)] * 2
+    assert "items" in request(server, "GET", "/scripts")[1]
+
+
+def test_cancel_queued_run(server):
+    status, first = request(server, "POST", "/runs", {"script": "items", "loop": True, "interval": 0.01})
+    status, second = request(server, "POST", "/runs", {"script": "items"})
+    wait_for(lambda: request(server, "GET", f"/runs/{first['id']}")[1]["status"] == "running")
+    assert request(server, "DELETE", f"/runs/{second['id']}")[1]["status"] == "cancelled"
+    request(server, "POST", "/stop", {})
+    wait_for(lambda: request(server, "GET", f"/runs/{first['id']}")[1]["status"] == "stopped")
+    assert request(server, "GET", f"/runs/{second['id']}")[1]["status"] == "cancelled"
+    assert request(server, "GET", "/runs/999")[0] == 404
+
+
+@pytest.mark.parametrize("method, path", [("DELETE", "/runs/{id}"), ("POST", "/stop")])
+def test_cancel_while_loading_script(server, monkeypatch, method, path):
+    load_plan = control.load_plan
+
+    def slow_load_plan(*args):
+        time.sleep(0.3)
+        return load_plan(*args)
+
+    monkeypatch.setattr(control, "load_plan", slow_load_plan)
+    status, run = request(server, "POST", "/runs", {"script": "items"})
+    wait_for(lambda: request(server, "GET", f"/runs/{run['id']}")[1]["status"] == "running")
+    request(server, method, path.format(id=run["id"]), {} if method == "POST" else None)
+    wait_for(lambda: request(server, "GET", f"/runs/{run['id']}")[1]["status"] == "cancelled")
+    assert server.screen.clicked == []
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({}, 401),
+    ({"Authorization": "Bearer wrong"}, 401),
+    ({"Authorization": f"Bearer {TOKEN}", "Origin": "http://example.com"}, 403),
+    ({"Authorization": f"Bearer {TOKEN}", "Host": "example.com"}, 403),
+    ({"Authorization": f"Bearer {TOKEN}", "Content-Type": "text/plain"}, 415),
+])
+def test_rejects_unauthorized_and_cross_site_requests(server, headers, expected):
+    status, _ = request(server, "POST", "/runs", {"script": "items"}, headers)
+    assert status == expected
+    assert not server.runs
+
+
+@pytest.mark.parametrize("name", ["../items", "/etc/passwd", ".hidden", "settings"])
+def test_rejects_script_paths(server, name):
+    status, _ = request(server, "POST", "/runs", {"script": name})
+    assert status == 400
+
+
+def test_queued_run_waits_for_busy_runner(server):
+    # 模拟界面在 worker 检查 runner.running 之后抢先开始运行
+    server.runner.run_lock.acquire()
+    try:
+        status, run = request(server, "POST", "/runs", {"script": "items"})
+        time.sleep(0.3)
+        assert request(server, "GET", f"/runs/{run['id']}")[1]["status"] == "queued"
+    finally:
+        server.runner.run_lock.release()
+    wait_for(lambda: request(server, "GET", f"/runs/{run['id']}")[1]["status"] == "finished")
+    assert server.screen.clicked == [(1, 1)]
@@ -0,0 +1,64 @@
+import os
+import threading
+
+import pytest
+
+from framebus import FrameBusBackend, FrameBusProducer
+
+
+@pytest.fixture
+def producer(screen):
+    producer = FrameBusProducer(screen, name=f"wcft_pytest_{os.getpid()}", slots=2)
+    producer.open()
+    yield producer
+    producer.close()
+
+
+def test_reader_sees_published_frames(screen, producer):
+    backend = FrameBusBackend(screen, name=producer.name, max_age=10)
+    try:
+        assert backend.pixel(5, 5) == (0, 0, 0)
+        screen.set_pixel(5, 5, (9, 8, 7))
+        producer.publish(screen.grab())
+        frame = backend.grab()
+        assert frame.number == 2
+        assert frame.pixel(5, 5) == (9, 8, 7)
+        region = backend.grab((4, 4, 8, 8))
+        assert (region.left, region.top, region.width) == (4, 4, 4)
+        # 输入操作交给原后端
+        backend.click_at(1, 2)
+        assert screen.clicked == [(1, 2)]
+    finally:
+        backend.close()
+
+
+def test_frame_bus_keeps_bbox_origin(screen):
+    screen.set_pixel(150, 60, (9, 8, 7))
+    producer = FrameBusProducer(screen, name=f"wcft_pytest_bbox_{os.getpid()}", slots=2, bbox=(100, 50, 300, 200))
+    producer.open()
+    try:
+        backend = FrameBusBackend(screen, name=producer.name, max_age=10)
+        try:
+            assert backend.pixel(150, 60) == (9, 8, 7)
+            frame = backend.grab()
+            assert (frame.left, frame.top, frame.width, frame.height) == (100, 50, 200, 150)
+            assert backend.grab((0, 0, 50, 40)).width == 0
+        finally:
+            backend.close()
+    finally:
+        producer.close()
+
+
+def test_grab_after_input_waits_for_newer_frame(screen, producer):
+    backend = FrameBusBackend(screen, name=producer.name, max_age=10, timeout=0.1)
+    try:
+        backend.click_at(5, 5)
+        # 点击之后还没有新画面：即使旧画面没有超过 max_age 也不能使用
+        with pytest.raises(TimeoutError):
+            backend.grab()
+        screen.set_pixel(5, 5, (9, 8, 7))
+        backend.timeout = 2
+        threading.Timer(0.05, lambda: producer.publish(screen.grab())).start()
+        assert backend.pixel(5, 5) == (9, 8, 7)
+    finally:
+        backend.close()
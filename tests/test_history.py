@@ -0,0 +1,72 @@
+import random
+
+from history import History, invert_ops
+from storage import apply_ops
+
+
+def random_ops(rng, items):
+    kind = rng.randrange(4)
+    size = len(items)
+    if kind == 0 or not size:
+        return [("insert", rng.randrange(size + 1), {"n": rng.random()})]
+    if kind == 1:
+        return [("delete", index) for index in sorted(rng.sample(range(size), min(3, size)), reverse=True)]
+    if kind == 2:
+        index = rng.randrange(size)
+        return [("set", index, dict(items[index], changed=True))]
+    return [("move", rng.randrange(size), rng.randrange(size)), ("move", rng.randrange(size), rng.randrange(size))]
+
+
+def test_inverse_ops_restore_list():
+    rng = random.Random(1)
+    items = [{"n": n} for n in range(20)]
+    for _ in range(200):
+        before = list(items)
+        inverse = invert_ops(items, random_ops(rng, items))
+        after = list(items)
+        apply_ops(items, inverse)
+        assert items == before and all(a is b for a, b in zip(items, before))
+        items[:] = after
+
+
+def test_undo_redo():
+    rng = random.Random(2)
+    items = [{"n": n} for n in range(50)]
+    history = History(limit=30)
+    snapshots = [list(items)]
+    for _ in range(40):
+        history.apply(items, random_ops(rng, items), "edit")
+        snapshots.append(list(items))
+    assert len(history.undo_stack) == 30
+    for depth in range(30):
+        edit, items, ops = history.undo(items)
+        assert edit.label == "edit"
+        assert items == snapshots[-2 - depth]
+    assert not history.can_undo
+    assert history.undo(items)[0] is None
+    for depth in range(10):
+        edit, items, ops = history.redo(items)
+    assert items == snapshots[20]
+    # 新的修改清空重做栈
+    history.apply(items, [("insert", 0, {"n": -1})])
+    assert not history.can_redo
+
+
+def test_history_shares_unchanged_rows():
+    items = [{"n": n} for n in range(1000)]
+    history = History()
+    history.apply(items, [("set", 5, {"n": "x"})])
+    edit = history.undo_stack[-1]
+    # 只引用被替换的旧项目
+    assert edit.inverse == [("set", 5, {"n": 5})]
+
+
+def test_replace():
+    history = History()
+    old = [{"n": 1}]
+    new = [{"n": 2}, {"n": 3}]
+    history.replace(old, new, "导入列表")
+    edit, items, ops = history.undo(new)
+    assert ops is None and items == old
+    edit, items, ops = history.redo(items)
+    assert ops is None and items == new
@@ -0,0 +1,37 @@
+import pytest
+
+from library import ScriptLibrary, validate_script_name
+
+
+def test_create_scan_and_delete(tmp_path):
+    library = ScriptLibrary(str(tmp_path))
+    library.create("登录")
+    (tmp_path / "items.json").write_text('[{"coordinates": [1, 2]}]', encoding='utf-8')
+    library.scan()
+    assert library.names() == ["items", "登录"]
+    assert library.entries["items"]["steps"] == 1
+    # 索引持久化，重新打开不需要扫描
+    assert ScriptLibrary(str(tmp_path)).names() == ["items", "登录"]
+    library.delete("登录")
+    assert library.names() == ["items"]
+    assert not (tmp_path / "登录.json").exists()
+    with pytest.raises(ValueError):
+        library.create("items")
+
+
+@pytest.mark.parametrize("name", ["", "a/b", "..", ".hidden", "settings", "x.snapshot"])
+def test_invalid_script_names(name):
+    with pytest.raises(ValueError):
+        validate_script_name(name)
+
+
+def test_scan_skips_non_script_json(tmp_path):
+    (tmp_path / "items.json").write_text('[{"coordinates": [1, 2]}]', encoding='utf-8')
+    (tmp_path / "config.json").write_text('{"a": 1}', encoding='utf-8')
+    (tmp_path / "numbers.json").write_text('[1, 2]', encoding='utf-8')
+    (tmp_path / "broken.json").write_text('{', encoding='utf-8')
+    (tmp_path / "settings.json").write_text('{"config_dir": "x"}', encoding='utf-8')
+    library = ScriptLibrary(str(tmp_path))
+    library.scan()
+    assert library.names() == ["items"]
+    assert library.entries["items"]["steps"] == 1
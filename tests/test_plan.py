@@ -0,0 +1,85 @@
+import pytest
+
+from plan import FLOW_ANCHOR, FLOW_END_REPEAT, FLOW_JUMP, FLOW_REPEAT, MOTION_DURATION, MOTION_SPEED, MOTION_TELEPORT, compile_plan, motion_duration
+
+
+def test_skips_items_without_actions():
+    plan = compile_plan([{"coordinates": (1, 1)}, {"coordinates": (2, 2), "click": True},
+                         {"coordinates": (3, 3), "delay": True, "delay_time": 0.5}])
+    assert [step.index for step in plan.steps] == [1, 2]
+    assert plan.steps[1].delay == 0.5
+
+
+def test_color_samples():
+    plan = compile_plan([{"coordinates": (10, 20), "click": True, "color": [1, 2, 3], "judge_color": True},
+                         {"coordinates": (30, 40), "click": True, "color": (4, 5, 6), "judge_color": False}])
+    assert plan.points == ((10, 20),)
+    assert plan.expected == ((1, 2, 3),)
+    assert plan.steps[0].row == 0
+    assert plan.steps[1].row is None
+
+
+def test_motion_duration():
+    assert motion_duration(MOTION_TELEPORT, 1, (0, 0), (300, 400)) == 0
+    assert motion_duration(MOTION_DURATION, 0.25, (0, 0), (300, 400)) == 0.25
+    assert motion_duration(MOTION_SPEED, 1000, (0, 0), (300, 400)) == 0.5
+    plan = compile_plan([{"coordinates": (1, 1), "click": True, "motion": MOTION_SPEED, "motion_value": 500},
+                         {"coordinates": (2, 2), "click": True}])
+    assert plan.steps[0].motion == (MOTION_SPEED, 500)
+    assert plan.steps[1].motion is None
+
+
+def test_color_samples_include_signature():
+    plan = compile_plan([{"coordinates": (10, 20), "click": True, "color": (1, 2, 3), "judge_color": True,
+                          "signature": [[1, 0, 4, 5, 6]], "tolerance": 10}])
+    assert plan.points == ((10, 20), (11, 20))
+    assert plan.expected == ((1, 2, 3), (4, 5, 6))
+    assert plan.starts == (0,)
+    assert plan.tolerances == (10,)
+
+
+def test_flow_targets_resolved():
+    plan = compile_plan([
+        {"flow": "jump", "label": "end"},
+        {"flow": "repeat", "repeat_count": 2},
+        {"coordinates": (1, 1), "click": True},
+        {"flow": "end_repeat"},
+        {"flow": "label", "label": "end"},
+    ])
+    ops = [step.op for step in plan.steps]
+    assert ops == [FLOW_JUMP, FLOW_REPEAT, None, FLOW_END_REPEAT]
+    assert plan.steps[0].target == 4
+    assert plan.steps[1].target == 3 and plan.steps[3].target == 1
+    assert plan.steps[1].count == 2
+
+
+@pytest.mark.parametrize("items", [
+    [{"flow": "jump", "label": "missing"}],
+    [{"flow": "label", "label": "a"}, {"flow": "label", "label": "a"}],
+    [{"flow": "repeat", "repeat_count": 2}],
+    [{"flow": "end_repeat"}],
+    [{"flow": "jump_if", "label": "a"}, {"flow": "label", "label": "a"}],
+    [{"flow": "anchor", "coordinates": (1, 1)}],
+    [{"coordinates": (1, 1), "click": True, "relative": True}],
+])
+def test_invalid_scripts(items):
+    with pytest.raises(ValueError):
+        compile_plan(items)
+
+
+def test_relative_coordinates_use_nearest_anchor():
+    plan = compile_plan([
+        {"flow": "anchor", "coordinates": (100, 100), "color": (255, 0, 0), "judge_color": True},
+        {"coordinates": (5, 5), "click": True, "relative": True},
+        {"flow": "anchor", "coordinates": (200, 50), "color": (0, 255, 0), "judge_color": True},
+        {"coordinates": (1, 2), "click": True, "relative": True, "color": (0, 0, 1), "judge_color": True},
+        {"coordinates": (7, 7), "click": True},
+    ])
+    assert plan.anchors == 2
+    steps = plan.steps
+    assert steps[0].op == FLOW_ANCHOR and steps[0].anchor == 1
+    assert (steps[1].x, steps[1].y, steps[1].anchor) == (105, 105, 1)
+    assert (steps[3].x, steps[3].y, steps[3].anchor) == (201, 52, 2)
+    assert (steps[4].x, steps[4].y, steps[4].anchor) == (7, 7, 0)
+    # 采样点按所属锚点分组
+    assert plan.groups == (1, 2, 2)
@@ -0,0 +1,41 @@
+import time
+
+from recorder import EVENT_CLICK, EVENT_MOVE, Recorder, build_items, simplify_path
+
+
+def test_simplify_path_keeps_corners():
+    points = [(0, 0), (5, 1), (10, 0), (10, 5), (10, 10)]
+    assert simplify_path(points, 2) == [0, 2, 4]
+    assert simplify_path(points[:2], 2) == [0, 1]
+
+
+def test_build_items():
+    events = [(EVENT_MOVE, 0.0, 0, 0, None),
+              (EVENT_CLICK, 1.0, 10, 10, (1, 2, 3)),
+              (EVENT_MOVE, 1.1, 20, 10, None),
+              (EVENT_MOVE, 1.2, 30, 10, None),
+              (EVENT_MOVE, 1.3, 30, 20, None),
+              (EVENT_CLICK, 1.5, 30, 30, (4, 5, 6)),
+              (EVENT_CLICK, 1.52, 500, 500, None),
+              (EVENT_MOVE, 2.0, 40, 40, None)]
+    items = build_items(events, epsilon=1, exclude=lambda x, y: x > 100)
+    assert [(item["coordinates"], item["click"], item["move"]) for item in items] == [
+        ((10, 10), True, False), ((30, 10), False, True), ((30, 30), True, False)]
+    assert items[0]["color"] == (1, 2, 3)
+    assert items[0]["delay_time"] == 0.2
+    assert items[-1]["delay"] is False
+    assert [item["click"] for item in build_items(events, record_moves=False)] == [True, True, True]
+
+
+def test_recorder_samples_virtual_mouse(screen):
+    screen.set_pixel(7, 8, (9, 9, 9))
+    recorder = Recorder(screen, interval=0.002)
+    recorder.start()
+    screen.move_to(7, 8)
+    time.sleep(0.05)
+    screen.button = True
+    time.sleep(0.05)
+    screen.button = False
+    events = recorder.stop()
+    assert [(kind, x, y, color) for kind, _, x, y, color in events if kind == EVENT_CLICK] == [
+        (EVENT_CLICK, 7, 8, (9, 9, 9))]
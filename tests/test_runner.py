@@ -0,0 +1,226 @@
+import time
+
+import pytest
+
+from conftest import BLUE, GREEN, RED, item, run_in_thread
+from plan import MOTION_DURATION, MOTION_TELEPORT
+from runner import CAPTURE_FRAME, CAPTURE_PIXEL, CAPTURE_REGION, ActionRunner, RunnerBusy
+
+CAPTURE_MODES = (CAPTURE_PIXEL, CAPTURE_FRAME, CAPTURE_REGION)
+# 锚点图案：中心红色，右边绿色，下边蓝色
+ANCHOR_SIGNATURE = [[1, 0, 0, 255, 0], [0, 1, 0, 0, 255]]
+
+
+def make_runner(screen, **kwargs):
+    kwargs.setdefault("motion_mode", MOTION_TELEPORT)
+    return ActionRunner(screen, pause=0, **kwargs)
+
+
+def test_clicks_in_order(screen):
+    stats = make_runner(screen).run([item(1, 2), item(3, 4), item(5, 6, click=False)])
+    assert stats.status == "finished"
+    assert screen.clicked == [(1, 2), (3, 4)]
+    assert stats.clicks == 2
+
+
+def test_turbo_clicks_without_moving(screen):
+    stats = make_runner(screen, turbo=True).run([item(1, 2), item(3, 4)])
+    assert screen.clicked == [(1, 2), (3, 4)]
+    assert screen.moves == 0
+    assert stats.clicks == 2
+
+
+def test_delay_is_not_early(screen):
+    stats = make_runner(screen).run([item(1, 1, delay_time=0.03)], count=3, interval=0.02)
+    # 延时只会比计划晚（受系统调度影响），不会提前结束
+    assert stats.waits == 5
+    assert 0 <= stats.jitter_avg < 0.02
+    assert stats.timer_granularity > 0
+
+
+def test_count_and_interval(screen):
+    stats = make_runner(screen).run([item(1, 1)], count=3, interval=0)
+    assert stats.iterations == 3
+    assert len(screen.clicked) == 3
+
+
+@pytest.mark.parametrize("capture_mode", CAPTURE_MODES)
+def test_color_check_skips_mismatch(screen, capture_mode):
+    screen.set_pixel(10, 10, RED)
+    make_runner(screen, capture_mode=capture_mode).run([item(10, 10, color=RED, judge_color=True),
+                                                        item(10, 10, color=list(BLUE), judge_color=True),
+                                                        item(20, 20, color=BLUE, judge_color=False)])
+    assert screen.clicked == [(10, 10), (20, 20)]
+
+
+@pytest.mark.parametrize("capture_mode", CAPTURE_MODES)
+def test_tolerance_and_signature(screen, capture_mode):
+    screen.set_pixel(10, 10, (250, 5, 0))
+    screen.set_pixel(11, 10, BLUE)
+    items = [item(10, 10, color=RED, judge_color=True),
+             item(10, 10, color=RED, judge_color=True, tolerance=10),
+             item(10, 10, color=RED, judge_color=True, tolerance=10, signature=[[1, 0, 0, 0, 255]]),
+             item(10, 10, color=RED, judge_color=True, tolerance=10, signature=[[1, 0, 0, 255, 0]])]
+    make_runner(screen, capture_mode=capture_mode).run(items)
+    assert screen.clicked == [(10, 10)] * 2
+
+
+def test_wait_color_times_out(screen):
+    screen.set_pixel(10, 10, RED)
+    stats = make_runner(screen).run([item(10, 10, color=BLUE, judge_color=True, wait_color=True, wait_timeout=0.05),
+                                     item(10, 10, color=RED, judge_color=True, wait_color=True, wait_timeout=5)])
+    assert stats.wait_timeouts == 1
+    assert screen.clicked == [(10, 10)]
+
+
+def test_frame_mode_grabs_once_per_pass(screen):
+    screen.set_pixel(10, 10, RED)
+    items = [item(10, 10, color=RED, judge_color=True), item(11, 11, color=BLUE, judge_color=True)]
+    make_runner(screen, capture_mode=CAPTURE_FRAME, invalidate_on_click=False).run(items, count=3, interval=0)
+    assert screen.grabs == 3
+    assert screen.clicked == [(10, 10)] * 3
+
+
+@pytest.mark.parametrize("capture_mode", CAPTURE_MODES)
+def test_color_check_sees_click_result(screen, capture_mode):
+    # 点击后画面变化，下一步的判色应看到新画面
+    def on_click(backend, position):
+        backend.clicked.append(position)
+        backend.set_pixel(50, 50, RED)
+
+    screen.on_click = on_click
+    make_runner(screen, capture_mode=capture_mode).run([item(1, 1), item(50, 50, color=RED, judge_color=True)])
+    assert screen.clicked == [(1, 1), (50, 50)]
+
+
+def test_errors_are_reported(screen):
+    events = []
+    runner = make_runner(screen, on_event=lambda kind, data: events.append((kind, data)), progress_interval=0)
+    stats = runner.run([item(1000, 1000, color=(1, 2, 3), judge_color=True), item(1, 1)])
+    assert stats.errors == 1
+    assert screen.clicked == [(1, 1)]
+    assert [kind for kind, data in events] == ["started", "progress", "error", "progress", "finished"]
+    assert events[0][1] == {"steps": 2, "count": 1}
+    assert events[2][1]["step"] == 0
+    assert events[3][1]["step"] == 1
+
+
+def test_stop_interrupts_delay(screen):
+    runner = make_runner(screen)
+    thread, result = run_in_thread(runner, [item(1, 1, delay_time=30), item(2, 2)])
+    time.sleep(0.05)
+    start = time.perf_counter()
+    runner.stop()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert time.perf_counter() - start < 0.5
+    assert result["stats"].status == "stopped"
+    assert screen.clicked == [(1, 1)]
+
+
+def test_move_only_steps(screen):
+    stats = make_runner(screen).run([item(5, 6, click=False, move=True), item(7, 8, click=False)])
+    assert screen.position() == (5, 6)
+    assert screen.clicked == []
+    assert stats.clicks == 0
+
+
+def test_repeat_and_jumps(screen):
+    screen.set_pixel(0, 0, RED)
+    items = [
+        {"flow": "repeat", "repeat_count": 3},
+        item(1, 1),
+        {"flow": "end_repeat"},
+        {"flow": "jump_if", "label": "end", "coordinates": (0, 0), "color": RED, "judge_color": True},
+        item(2, 2),
+        {"flow": "label", "label": "end"},
+        {"flow": "jump_unless", "label": "skip", "coordinates": (0, 0), "color": RED, "judge_color": True},
+        item(3, 3),
+        {"flow": "label", "label": "skip"},
+    ]
+    make_runner(screen).run(items)
+    assert screen.clicked == [(1, 1)] * 3 + [(3, 3)]
+
+
+def draw_anchor(screen, x, y):
+    screen.set_pixel(x, y, RED)
+    screen.set_pixel(x + 1, y, GREEN)
+    screen.set_pixel(x, y + 1, BLUE)
+
+
+@pytest.mark.parametrize("capture_mode", CAPTURE_MODES)
+def test_anchor_follows_window(screen, capture_mode):
+    draw_anchor(screen, 100, 100)
+    items = [
+        {"flow": "anchor", "coordinates": (100, 100), "color": RED, "judge_color": True,
+         "signature": ANCHOR_SIGNATURE},
+        item(5, 7, relative=True),
+    ]
+    runner = make_runner(screen, capture_mode=capture_mode)
+    stats = runner.run(items, count=2, interval=0)
+    assert screen.clicked == [(105, 107)] * 2
+    # 第一轮全屏查找一次，之后在缓存位置检查通过
+    assert stats.anchor_searches == 1
+
+    # 窗口移动后重新查找，点击跟随
+    screen.fill_rect(100, 100, 102, 102, (0, 0, 0))
+    draw_anchor(screen, 200, 150)
+    screen.clicked.clear()
+    runner.run(items)
+    assert screen.clicked == [(205, 157)]
+
+
+def test_missing_anchor_skips_relative_steps(screen):
+    events = []
+    items = [{"flow": "anchor", "coordinates": (100, 100), "color": RED, "judge_color": True,
+              "signature": ANCHOR_SIGNATURE},
+             item(5, 7, relative=True), item(1, 1)]
+    make_runner(screen, on_event=lambda kind, data: events.append(kind)).run(items)
+    assert screen.clicked == [(1, 1)]
+    assert "error" in events
+
+
+def test_pause_and_resume(screen):
+    events = []
+    runner = make_runner(screen, on_event=lambda kind, data: events.append(kind))
+    thread, result = run_in_thread(runner, [item(1, 1, delay_time=0.2), item(2, 2)])
+    time.sleep(0.05)
+    runner.pause_run()
+    time.sleep(0.4)
+    # 暂停期间延时不再计时，也不会执行下一步
+    assert runner.paused
+    assert screen.clicked == [(1, 1)]
+    assert "paused" in events
+    runner.resume_run()
+    thread.join(2)
+    assert result["stats"].status == "finished"
+    assert screen.clicked == [(1, 1), (2, 2)]
+    assert "resumed" in events
+
+
+def test_pause_during_move_keeps_cursor(screen):
+    runner = make_runner(screen, motion_mode=MOTION_DURATION, motion_value=0.3)
+    thread, result = run_in_thread(runner, [item(300, 200)])
+    time.sleep(0.1)
+    runner.pause_run()
+    time.sleep(0.05)
+    position = screen.position()
+    time.sleep(0.2)
+    assert screen.position() == position != (300, 200)
+    runner.resume_run()
+    thread.join(2)
+    assert screen.clicked == [(300, 200)]
+
+
+def test_second_run_is_rejected(screen):
+    runner = make_runner(screen)
+    thread, result = run_in_thread(runner, [item(1, 1, delay_time=30)])
+    with pytest.raises(RunnerBusy):
+        runner.run([item(2, 2)])
+    # 等第一次运行点击后进入 30 秒的延时再停止
+    end = time.monotonic() + 2
+    while not screen.clicked and time.monotonic() < end:
+        time.sleep(0.001)
+    runner.stop()
+    thread.join(2)
+    assert screen.clicked == [(1, 1)]
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from runner import DeadlineScheduler, RunStats
+
+
+def stop_hold():
+    # 醒来即视为停止
+    return None
+
+
+def test_wait_records_jitter():
+    stats = RunStats()
+    assert DeadlineScheduler(threading.Event(), stats, stop_hold).wait(0.02)
+    assert stats.waits == 1
+    assert stats.jitter_max >= 0
+
+
+def test_stop_wakes_wait():
+    wake_event = threading.Event()
+    threading.Timer(0.05, wake_event.set).start()
+    start = time.perf_counter()
+    assert not DeadlineScheduler(wake_event, RunStats(), stop_hold).wait(30)
+    assert time.perf_counter() - start < 5
+
+
+def test_hold_extends_deadline():
+    wake_event = threading.Event()
+    stats = RunStats()
+
+    def hold():
+        wake_event.clear()
+        return 0.05
+
+    threading.Timer(0.01, wake_event.set).start()
+    start = time.perf_counter()
+    assert DeadlineScheduler(wake_event, stats, hold).wait(0.05)
+    assert time.perf_counter() - start >= 0.1
+    assert stats.jitter_max < 0.05
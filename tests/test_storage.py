@@ -0,0 +1,119 @@
+import json
+import os
+
+import pytest
+
+from storage import (FORMAT_JOURNAL, FORMAT_JSON, ItemsWriter, JournalStore, apply_ops, open_store, read_items_json,
+                     saved_format)
+
+
+def as_json(items):
+    return json.loads(json.dumps(items))
+
+
+def test_apply_ops():
+    items = ["a", "b", "c"]
+    apply_ops(items, [("insert", 1, "x"), ("delete", 0), ("set", 2, "y"), ("move", 0, 2)])
+    assert items == ["b", "y", "x"]
+    with pytest.raises(ValueError):
+        apply_ops(items, [("unknown", 0)])
+
+
+def edit(store, items, ops):
+    apply_ops(items, ops)
+    store.record(ops, items)
+
+
+def test_journal_replay(tmp_path):
+    base = str(tmp_path / "script")
+    store = JournalStore(base, delay=0.01)
+    items = store.load()
+    edit(store, items, [("insert", 0, {"n": 1}), ("insert", 1, {"n": 2}), ("insert", 2, {"n": 3})])
+    store.flush()
+    edit(store, items, [("move", 2, 0), ("set", 1, {"n": 4}), ("delete", 2)])
+    store.close()
+    assert saved_format(base) == FORMAT_JOURNAL
+    assert JournalStore(base).load() == as_json(items)
+
+
+def test_journal_compaction(tmp_path):
+    base = str(tmp_path / "script")
+    store = JournalStore(base, delay=0.01, compact_threshold=10)
+    items = store.load()
+    for n in range(25):
+        edit(store, items, [("insert", 0, {"n": n})])
+        store.flush()
+    store.close()
+    assert store.compactions >= 2
+    assert JournalStore(base).load() == as_json(items)
+
+
+def test_journal_ignores_truncated_record(tmp_path):
+    base = str(tmp_path / "script")
+    store = JournalStore(base, delay=0.01)
+    items = store.load()
+    edit(store, items, [("insert", 0, {"n": 1})])
+    store.close()
+    with open(store.journal_path, 'a', encoding='utf-8') as f:
+        f.write('[99,"insert",0,{"n":')
+    assert JournalStore(base).load() == as_json(items)
+
+
+def test_journal_recovers_after_failed_write(tmp_path):
+    base = str(tmp_path / "script")
+    errors = []
+    store = JournalStore(base, delay=0.01, on_error=lambda path, error: errors.append(error))
+    items = store.load()
+    edit(store, items, [("insert", 0, {"n": 1}), ("insert", 1, {"n": 2})])
+    store.flush()
+    # 日志路径暂时不可写
+    os.replace(store.journal_path, store.journal_path + ".bak")
+    os.mkdir(store.journal_path)
+    edit(store, items, [("delete", 0)])
+    store.flush()
+    assert errors
+    os.rmdir(store.journal_path)
+    os.replace(store.journal_path + ".bak", store.journal_path)
+    edit(store, items, [("insert", 0, {"n": 3})])
+    store.close()
+    assert JournalStore(base).load() == as_json(items)
+
+
+def test_json_and_journal_formats_switch(tmp_path):
+    base = str(tmp_path / "script")
+    store = open_store(base, FORMAT_JSON)
+    store.replace([{"n": 1}])
+    store.close()
+    assert saved_format(base) == FORMAT_JSON
+    store = open_store(base, FORMAT_JOURNAL)
+    items = store.load()
+    assert [item["n"] for item in items] == [1]
+    store.close()
+
+
+def test_read_items_json_rejects_non_lists(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text('{"config_dir": "x"}', encoding='utf-8')
+    with pytest.raises(ValueError):
+        read_items_json(str(path))
+
+
+def test_writer_coalesces_updates(tmp_path):
+    path = str(tmp_path / "items.json")
+    writer = ItemsWriter(delay=10)
+    for n in range(5):
+        writer.schedule(path, [{"n": n}])
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert writer.writes == 1
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == [{"n": 4}]
+
+
+def test_writer_reports_errors(tmp_path):
+    errors = []
+    writer = ItemsWriter(delay=0, on_error=lambda path, e: errors.append(path))
+    missing = str(tmp_path / "missing" / "items.json")
+    writer.schedule(missing, [])
+    writer.close()
+    assert errors == [missing]
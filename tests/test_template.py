@@ -0,0 +1,39 @@
+import numpy as np
+from PIL import Image
+
+from plan import MOTION_TELEPORT
+from runner import ActionRunner
+from template import Template, TemplateMatcher
+
+
+def draw_patch(screen, left, top, patch):
+    for dy, row in enumerate(patch):
+        for dx, color in enumerate(row):
+            screen.set_pixel(left + dx, top + dy, tuple(int(v) for v in color))
+
+
+def make_patch(size=32):
+    return np.random.default_rng(1).integers(0, 256, (size, size, 3), dtype=np.uint8)
+
+
+def test_matcher_finds_template_and_caches(screen):
+    patch = make_patch()
+    draw_patch(screen, 150, 100, patch)
+    matcher = TemplateMatcher(screen)
+    x, y, score = matcher.find(Template(patch, key="patch"))
+    assert (x, y) == (166, 116)
+    assert score > 0.99
+    assert matcher.find(Template(patch, key="patch"))[:2] == (166, 116)
+    assert matcher.grabs == 1 and matcher.searches == 1
+
+
+def test_runner_clicks_template_center(screen, tmp_path):
+    patch = make_patch()
+    draw_patch(screen, 40, 30, patch)
+    path = tmp_path / "button.png"
+    Image.fromarray(patch).save(path)
+    items = [{"coordinates": (60, 50), "click": True, "template": str(path)},
+             {"coordinates": (200, 200), "click": True, "template": str(path), "search_margin": 20}]
+    stats = ActionRunner(screen, motion_mode=MOTION_TELEPORT, pause=0).run(items)
+    assert screen.clicked == [(56, 46)]
+    assert stats.status == "finished"
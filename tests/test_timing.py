@@ -0,0 +1,35 @@
+import json
+
+from conftest import RED, item
+from plan import MOTION_TELEPORT
+from runner import ActionRunner
+from timing import RESULT_MATCH, RESULT_MISS, RingLog, StepTimings
+
+
+def test_ring_log_keeps_latest_rows():
+    log = RingLog(3)
+    for n in range(5):
+        log.append(n)
+    assert log.rows() == [2, 3, 4]
+    assert log.dropped == 2
+
+
+def test_runner_records_timings(screen, tmp_path):
+    screen.set_pixel(10, 10, RED)
+    runner = ActionRunner(screen, motion_mode=MOTION_TELEPORT, pause=0)
+    runner.run([item(10, 10, color=RED, judge_color=True), item(10, 10, color=(0, 0, 1), judge_color=True)],
+               count=3, interval=0)
+    summary = {entry["step"]: entry for entry in runner.timings.summary()}
+    assert summary[0]["count"] == 3 and summary[0]["match"] == 3
+    assert summary[1]["miss"] == 3
+    assert runner.timings.iteration_summary()["count"] == 3
+    path = tmp_path / "report.json"
+    runner.timings.export_json(str(path))
+    assert len(json.loads(path.read_text(encoding="utf-8"))["steps"]) == 6
+
+
+def test_summary_orders_by_total_time():
+    timings = StepTimings(capacity=10)
+    timings.record_step(1, 0, 0.0, 0.01, 0.0, RESULT_MATCH, 0.0, 0.0, 0.0, 0.0)
+    timings.record_step(1, 1, 0.01, 0.5, 0.0, RESULT_MISS, 0.0, 0.0, 0.0, 0.0)
+    assert [entry["step"] for entry in timings.summary()] == [1, 0]
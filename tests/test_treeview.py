@@ -0,0 +1,167 @@
+from types import SimpleNamespace
+
+import pytest
+
+import treeview
+from treeview import VirtualTreeview
+
+
+class FakeStyle:
+    def lookup(self, style, option):
+        return ""
+
+
+class FakeTree:
+    """
+    只实现 VirtualTreeview 用到的 Treeview 方法，记录插入次数。
+    """
+
+    def __init__(self):
+        self.children = []
+        self.rows = {}
+        self.current = ()
+        self.inserts = 0
+
+    def bind(self, sequence, func, add=None):
+        pass
+
+    def config(self, **kwargs):
+        pass
+
+    def get_children(self):
+        return tuple(self.children)
+
+    def insert(self, parent, index, iid, values):
+        self.children.insert(index, iid)
+        self.rows[iid] = values
+        self.inserts += 1
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.children.remove(iid)
+            self.rows.pop(iid)
+
+    def item(self, iid, values):
+        self.rows[iid] = values
+
+    def index(self, iid):
+        return self.children.index(iid)
+
+    def move(self, iid, parent, index):
+        self.children.remove(iid)
+        self.children.insert(index, iid)
+
+    def selection(self):
+        return self.current
+
+    def selection_set(self, iids):
+        self.current = tuple(iids)
+
+    # 拖放用到的几何查询：每行高 20 像素，没有表头
+    def identify_row(self, y):
+        row = y // 20
+        return self.children[row] if 0 <= row < len(self.children) else ""
+
+    def identify_region(self, x, y):
+        return "cell" if self.identify_row(y) else "nothing"
+
+    def winfo_height(self):
+        return 20 * len(self.children)
+
+    def after(self, ms, func):
+        return "timer"
+
+    def after_cancel(self, timer):
+        pass
+
+
+class FakeScrollbar:
+    def config(self, **kwargs):
+        pass
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+def make_item(n):
+    return {"coordinates": (n, n), "color": None, "remarks": str(n)}
+
+
+@pytest.fixture
+def view(monkeypatch):
+    monkeypatch.setattr(treeview.ttk, "Style", FakeStyle)
+    items = [make_item(n) for n in range(100)]
+    view = VirtualTreeview(FakeTree(), FakeScrollbar(), lambda: items)
+    view.items = items
+    view.visible = 10
+    view.refresh()
+    return view
+
+
+def click(view, index, state=0):
+    # 模拟在 Treeview 中单击可见的一行；state 为修饰键（Shift 0x1，Ctrl 0x4）
+    view.remember_modifiers(SimpleNamespace(state=state))
+    iid = view.tree.children[index - view.first]
+    if state:
+        view.tree.selection_set(view.tree.selection() + (iid,))
+    else:
+        view.tree.selection_set([iid])
+    view.on_select()
+
+
+def test_only_visible_rows_are_created(view):
+    assert len(view.tree.children) == 10
+    assert view.tree.rows[view.tree.children[0]][-1] == "0"
+    view.scroll(5)
+    assert view.tree.rows[view.tree.children[0]][-1] == "5"
+    # 滚动时只插入新出现的行
+    assert view.tree.inserts == 15
+
+
+def test_edit_updates_row_in_place(view):
+    view.items[3] = dict(view.items[3], remarks="changed")
+    view.refresh()
+    assert view.tree.rows[view.tree.children[3]][-1] == "changed"
+
+
+def test_selection_survives_scrolling(view):
+    click(view, 5)
+    view.scroll(50)
+    assert view.tree.selection() == ()
+    view.scroll(-50)
+    assert view.selected_indices() == [5]
+    assert view.tree.selection() == (view.tree.children[5],)
+
+
+def test_plain_click_after_scroll_replaces_selection(view):
+    click(view, 5)
+    view.scroll(90)
+    click(view, 95)
+    assert view.selected_indices() == [95]
+
+
+def test_ctrl_click_after_scroll_extends_selection(view):
+    click(view, 5)
+    view.scroll(90)
+    click(view, 95, state=0x0004)
+    assert view.selected_indices() == [5, 95]
+
+
+def mouse(y, state=0):
+    return SimpleNamespace(x=5, y=y, state=state)
+
+
+def test_drag_selected_rows(view):
+    drops = []
+    view.enable_drag(lambda indices, target: drops.append((indices, target)))
+    view.select_indices([2, 3])
+    # 按在已选中的行上保留多选，拖到第 7 行松开放在它之后
+    assert view.on_drag_start(mouse(45)) == "break"
+    view.on_drag_motion(mouse(100))
+    view.on_drag_motion(mouse(145))
+    view.on_drag_end(mouse(145))
+    assert drops == [([2, 3], 8)]
+    # 没有拖动时松开只选中按下的行
+    view.on_drag_start(mouse(65))
+    view.on_drag_end(mouse(65))
+    assert view.selected_indices() == [3]
@@ -0,0 +1,133 @@
+import csv
+import json
+
+# 每步的判色结果
+RESULT_NONE = 0   # 不判色
+RESULT_MATCH = 1  # 颜色（或模板）匹配
+RESULT_MISS = 2   # 不匹配，跳过
+RESULT_ERROR = 3  # 读取失败或点击失败
+
+RESULT_NAMES = {RESULT_NONE: "none", RESULT_MATCH: "match", RESULT_MISS: "miss", RESULT_ERROR: "error"}
+
+# 每步记录的字段（时间单位：秒，start 为相对运行开始的时间）
+STEP_FIELDS = ("iteration", "step", "start", "cost", "check", "result", "move", "click", "delay_planned", "delay_actual")
+# 每轮记录的字段：overhead 为一轮用时减去各步用时和延时，即循环本身的开销
+ITERATION_FIELDS = ("iteration", "start", "duration", "overhead")
+
+
+class RingLog:
+    """
+    固定容量的记录环：预先分配列表，写满后覆盖最早的记录，记录一条只是一次列表赋值。
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.count = 0
+
+    def append(self, row):
+        self.slots[self.count % self.capacity] = row
+        self.count += 1
+
+    @property
+    def dropped(self):
+        return max(0, self.count - self.capacity)
+
+    def rows(self):
+        """
+        按时间顺序返回保留的记录。
+        """
+        if self.count <= self.capacity:
+            return self.slots[:self.count]
+        split = self.count % self.capacity
+        return self.slots[split:] + self.slots[:split]
+
+
+class StepTimings:
+    """
+    一次运行的逐步耗时记录，用于找出占用循环时间最多的步骤。
+    """
+
+    def __init__(self, capacity=50000, iteration_capacity=10000):
+        self.steps = RingLog(capacity)
+        self.iterations = RingLog(iteration_capacity)
+
+    def record_step(self, iteration, step, start, cost, check, result, move, click, delay_planned, delay_actual):
+        self.steps.append((iteration, step, start, cost, check, result, move, click, delay_planned, delay_actual))
+
+    def record_iteration(self, iteration, start, duration, overhead):
+        self.iterations.append((iteration, start, duration, overhead))
+
+    def summary(self):
+        """
+        按步骤汇总：次数、各结果次数、用时（cost）与判色、移动、点击耗时的 p50/p95/max，以及延时误差。
+        按总用时从大到小排序。
+        """
+        import numpy as np  # 确保已安装：pip install numpy
+
+        rows = self.steps.rows()
+        if not rows:
+            return []
+        data = np.array(rows, dtype=np.float64)
+        steps = data[:, 1].astype(np.int64)
+        order = np.argsort(steps, kind="stable")
+        data, steps = data[order], steps[order]
+        unique, starts = np.unique(steps, return_index=True)
+        result = []
+        for step, group in zip(unique, np.split(data, starts[1:])):
+            entry = {"step": int(step), "count": len(group), "total": float(group[:, 3].sum())}
+            codes = group[:, 5].astype(np.int64)
+            for code, name in RESULT_NAMES.items():
+                entry[name] = int((codes == code).sum())
+            for column, name in ((3, "cost"), (4, "check"), (6, "move"), (7, "click")):
+                p50, p95 = np.percentile(group[:, column], (50, 95))
+                entry[f"{name}_p50"] = float(p50)
+                entry[f"{name}_p95"] = float(p95)
+                entry[f"{name}_max"] = float(group[:, column].max())
+            delayed = group[group[:, 8] > 0]
+            entry["delay_jitter_max"] = float(np.abs(delayed[:, 9] - delayed[:, 8]).max()) if len(delayed) else 0.0
+            result.append(entry)
+        result.sort(key=lambda entry: entry["total"], reverse=True)
+        return result
+
+    def iteration_summary(self):
+        import numpy as np  # 确保已安装：pip install numpy
+
+        rows = self.iterations.rows()
+        if not rows:
+            return {"count": 0}
+        data = np.array(rows, dtype=np.float64)
+        summary = {"count": len(rows)}
+        for column, name in ((2, "duration"), (3, "overhead")):
+            p50, p95 = np.percentile(data[:, column], (50, 95))
+            summary[f"{name}_p50"] = float(p50)
+            summary[f"{name}_p95"] = float(p95)
+            summary[f"{name}_max"] = float(data[:, column].max())
+        return summary
+
+    def export_csv(self, path):
+        """
+        导出逐步记录（每步一行）。
+        """
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(STEP_FIELDS)
+            for row in self.steps.rows():
+                writer.writerow((*row[:5], RESULT_NAMES[row[5]], *row[6:]))
+
+    def export_json(self, path, stats=None):
+        """
+        导出完整报告：运行统计、逐步汇总、每轮开销和逐步记录。
+        """
+        report = {
+            "stats": stats.as_dict() if stats is not None else None,
+            "summary": self.summary(),
+            "iterations": self.iteration_summary(),
+            "dropped": self.steps.dropped,
+            "step_fields": STEP_FIELDS,
+            "steps": self.steps.rows(),
+            "iteration_fields": ITERATION_FIELDS,
+            "iteration_rows": self.iterations.rows(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False)
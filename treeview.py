@@ -0,0 +1,329 @@
+import tkinter as tk
+from tkinter import ttk
+
+from plan import FLOW_ANCHOR, FLOW_END_REPEAT, FLOW_JUMP, FLOW_JUMP_IF, FLOW_JUMP_UNLESS, FLOW_LABEL, FLOW_REPEAT
+
+
+def flow_text(item):
+    label = item.get("label") or ""
+    flow = item.get("flow")
+    if flow == FLOW_LABEL:
+        return f"标签 {label}"
+    if flow == FLOW_JUMP:
+        return f"跳转 → {label}"
+    if flow == FLOW_JUMP_IF:
+        return f"一致 → {label}"
+    if flow == FLOW_JUMP_UNLESS:
+        return f"不一致 → {label}"
+    if flow == FLOW_REPEAT:
+        return f"重复 {item.get('repeat_count', 1)} 次"
+    if flow == FLOW_END_REPEAT:
+        return "重复结束"
+    if flow == FLOW_ANCHOR:
+        return "锚点"
+    return ""
+
+
+def format_row(item):
+    """
+    把列表项转换为 Treeview 中显示的一行。
+    """
+    coordinates = f"({item['coordinates'][0]}, {item['coordinates'][1]})"
+    if item.get("relative", False) and item.get("flow") != FLOW_ANCHOR:
+        coordinates = f"锚点 + {coordinates}"
+    if item['color']:
+        color = f"({item['color'][0]}, {item['color'][1]}, {item['color'][2]})"
+    else:
+        color = ""
+    judge_color = "是" if item.get("judge_color", True) else "否"
+    flow = item.get("flow")
+    if flow:
+        # 流程控制步骤在“是否点击”一列显示类型和目标
+        click = flow_text(item)
+    elif item.get("click", False):
+        click = "✔"
+    else:
+        click = "移动" if item.get("move", False) else ""
+    delay = "✔" if item.get("delay", False) else ""
+    delay_time = item.get("delay_time", 0)
+    remarks = item.get("remarks", "")
+    return coordinates, color, judge_color, click, delay, delay_time, remarks
+
+
+class VirtualTreeview:
+    """
+    虚拟列表：Treeview 只创建当前可见的行，滚动条按整个列表计算。
+    每个列表项（按对象身份）对应一个固定的 iid，refresh() 只对可见窗口做增量修改：
+    新出现的行插入，消失的行删除，位置变化的行移动，内容变化的行更新，其它行不动。
+    选中状态按列表项身份保存，滚动、移动后依然保留。
+    """
+
+    def __init__(self, tree, scrollbar, get_items):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.get_items = get_items
+        self.first = 0
+        self.visible = 1
+        self.iids = {}      # id(列表项) -> iid
+        self.values = {}    # iid -> 当前显示的内容
+        self.selected = set()  # 选中列表项的 id
+        self.next_iid = 0
+        self.updating = False
+        self.extending = False  # 最近一次点击或按键是否按住 Shift / Ctrl（扩展选择）
+
+        style_height = ttk.Style().lookup("Treeview", "rowheight")
+        self.row_height = int(style_height) if style_height else 20
+
+        scrollbar.config(command=self.on_scrollbar)
+        tree.bind("<Configure>", self.on_configure)
+        tree.bind("<MouseWheel>", self.on_mousewheel)
+        tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        tree.bind("<Button-5>", lambda event: self.scroll(3))
+        tree.bind("<Up>", self.on_key_up)
+        tree.bind("<Down>", self.on_key_down)
+        # <<TreeviewSelect>> 不带修饰键状态，在按下时记录
+        tree.bind("<ButtonPress-1>", self.remember_modifiers, add="+")
+        tree.bind("<KeyPress>", self.remember_modifiers, add="+")
+        tree.bind("<<TreeviewSelect>>", self.on_select)
+
+    def reset(self):
+        # 列表被整体替换（重新加载）时清空所有映射
+        self.tree.delete(*self.tree.get_children())
+        self.iids.clear()
+        self.values.clear()
+        self.selected.clear()
+        self.first = 0
+        self.refresh()
+
+    def iid_for(self, item, used):
+        iid = self.iids.get(id(item))
+        # 同一个对象在列表中出现多次时，后出现的位置分配新的 iid
+        if iid is None or iid in used:
+            iid = f"row{self.next_iid}"
+            self.next_iid += 1
+            self.iids[id(item)] = iid
+        return iid
+
+    def refresh(self):
+        items = self.get_items()
+        total = len(items)
+        self.first = max(0, min(self.first, total - self.visible))
+        window = items[self.first:self.first + self.visible]
+
+        desired = []
+        used = set()
+        for item in window:
+            iid = self.iid_for(item, used)
+            used.add(iid)
+            desired.append((iid, item))
+
+        self.updating = True
+        try:
+            tree = self.tree
+            stale = [iid for iid in tree.get_children() if iid not in used]
+            if stale:
+                tree.delete(*stale)
+                for iid in stale:
+                    self.values.pop(iid, None)
+            for position, (iid, item) in enumerate(desired):
+                values = format_row(item)
+                if iid not in self.values:
+                    tree.insert("", position, iid=iid, values=values)
+                else:
+                    if self.values[iid] != values:
+                        tree.item(iid, values=values)
+                    if tree.index(iid) != position:
+                        tree.move(iid, "", position)
+                self.values[iid] = values
+            selection = [iid for iid, item in desired if id(item) in self.selected]
+            tree.selection_set(selection)
+        finally:
+            self.updating = False
+
+        # 清理已不在列表中的映射
+        if len(self.iids) > 2 * total + self.visible:
+            alive = {id(item) for item in items}
+            self.iids = {key: iid for key, iid in self.iids.items() if key in alive}
+            self.selected &= alive
+
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def remember_modifiers(self, event):
+        self.extending = bool(event.state & 0x0005)
+
+    def on_select(self, event=None):
+        if self.updating:
+            return
+        items = self.get_items()
+        window = items[self.first:self.first + self.visible]
+        selection = set(self.tree.selection())
+        if not self.extending:
+            # 普通点击或方向键：选中内容只有窗口中的选择，滚出窗口的旧选择一并取消
+            self.selected = {id(item) for item in window if self.iids.get(id(item)) in selection}
+            return
+        # Shift / Ctrl 扩展选择：窗口外的选中项保持不变
+        for item in window:
+            key = id(item)
+            if self.iids.get(key) in selection:
+                self.selected.add(key)
+            else:
+                self.selected.discard(key)
+
+    def selected_indices(self):
+        """
+        返回所有选中项在列表中的下标（升序）。
+        """
+        if not self.selected:
+            return []
+        selected = self.selected
+        return [index for index, item in enumerate(self.get_items()) if id(item) in selected]
+
+    def select_indices(self, indices):
+        items = self.get_items()
+        self.selected = {id(items[index]) for index in indices if 0 <= index < len(items)}
+        self.refresh()
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.refresh()
+
+    def see(self, index):
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible:
+            self.first = index - self.visible + 1
+        self.refresh()
+
+    def index_at(self, y):
+        """
+        返回 y 处的行在整个列表中的下标；在最后一行下方的空白处时返回列表长度，其它情况返回 None。
+        """
+        row = self.tree.identify_row(y)
+        if row:
+            return self.first + self.tree.index(row)
+        if self.tree.identify_region(0, y) == "nothing" and y > 0:
+            return len(self.get_items())
+        return None
+
+    def enable_drag(self, on_drop):
+        """
+        拖放排序：按住选中的行拖到其它行上松开时调用 on_drop(indices, target)，
+        target 为插入位置（原列表中第 target 项之前）。拖到列表上下边缘时自动滚动，可以拖到任意距离。
+        """
+        self.on_drop = on_drop
+        self.drag = None
+        self.drag_timer = None
+        self.tree.bind("<ButtonPress-1>", self.on_drag_start, add="+")
+        self.tree.bind("<B1-Motion>", self.on_drag_motion)
+        self.tree.bind("<ButtonRelease-1>", self.on_drag_end)
+
+    def on_drag_start(self, event):
+        self.drag = None
+        # 按住 Shift / Ctrl 时是多选操作，点在表头上是调整列宽
+        if event.state & 0x0005 or self.tree.identify_region(event.x, event.y) != "cell":
+            return
+        index = self.index_at(event.y)
+        if index is None:
+            return
+        kept = id(self.get_items()[index]) in self.selected
+        self.drag = {"start": index, "y": event.y, "edge": 0, "kept": kept}
+        if kept:
+            # 点在已选中的行上时保留多选，松开时没有拖动再只选中这一行
+            return "break"
+
+    def on_drag_motion(self, event):
+        drag = self.drag
+        if drag is None:
+            return
+        if abs(event.y - drag["y"]) < 4 and "moved" not in drag:
+            return "break"
+        if "moved" not in drag:
+            drag["moved"] = True
+            self.tree.config(cursor="sb_v_double_arrow")
+        drag["y"] = event.y
+        height = self.tree.winfo_height()
+        drag["edge"] = -1 if event.y < self.row_height * 1.5 else 1 if event.y > height - self.row_height // 2 else 0
+        if drag["edge"] and self.drag_timer is None:
+            self.auto_scroll()
+        return "break"
+
+    def auto_scroll(self):
+        drag = self.drag
+        if drag is None or not drag["edge"]:
+            self.drag_timer = None
+            return
+        self.scroll(drag["edge"])
+        self.drag_timer = self.tree.after(50, self.auto_scroll)
+
+    def on_drag_end(self, event):
+        drag, self.drag = self.drag, None
+        if self.drag_timer is not None:
+            self.tree.after_cancel(self.drag_timer)
+            self.drag_timer = None
+        if drag is None:
+            return
+        if "moved" not in drag:
+            if drag["kept"]:
+                self.select_indices([drag["start"]])
+            return
+        self.tree.config(cursor="")
+        total = len(self.get_items())
+        if event.y < 0:
+            row = self.first
+        elif event.y >= self.tree.winfo_height():
+            row = min(self.first + self.visible, total)
+        else:
+            row = self.index_at(event.y)
+        indices = self.selected_indices()
+        if row is None or not indices or row in indices:
+            return "break"
+        # 往上拖时放在目标行之前，往下拖时放在目标行之后
+        target = row if row < indices[0] or row >= total else row + 1
+        self.on_drop(indices, target)
+        return "break"
+
+    def scroll(self, rows):
+        self.first += rows
+        self.first = max(0, self.first)
+        self.refresh()
+
+    def on_scrollbar(self, action, value, unit=None):
+        total = len(self.get_items())
+        if action == tk.MOVETO:
+            self.first = int(float(value) * total)
+            self.refresh()
+        elif action == tk.SCROLL:
+            step = self.visible if unit == tk.PAGES else 1
+            self.scroll(int(value) * step)
+
+    def on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def on_configure(self, event):
+        # 表头大约占一行高度
+        visible = max(1, event.height // self.row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.tree.config(height=visible)
+            self.refresh()
+
+    def on_key_up(self, event):
+        self.remember_modifiers(event)
+        focus = self.tree.focus()
+        if focus and self.tree.index(focus) == 0 and self.first > 0:
+            self.scroll(-1)
+            self.tree.focus(self.tree.get_children()[0])
+            return "break"
+
+    def on_key_down(self, event):
+        self.remember_modifiers(event)
+        focus = self.tree.focus()
+        children = self.tree.get_children()
+        if focus and children and focus == children[-1] and self.first + self.visible < len(self.get_items()):
+            self.scroll(1)
+            self.tree.focus(self.tree.get_children()[-1])
+            return "break"